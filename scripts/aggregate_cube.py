@@ -0,0 +1,154 @@
+"""
+집계 큐브 파일 (로컬 조회 서비스용)
+- 전처리 결과 JSON({prefix}_sales_summary.json / {prefix}_inventory_summary.json)을
+  (지표, 브랜드, 아이템탭, 월, 채널, operation_group) 6차원 float64 배열 1개로 변환
+- 배열은 .npy, 축 라벨은 같은 이름의 .axes.json 으로 저장
+- 조회 쪽은 np.load(mmap_mode="r")로 열어서 필요한 구간만 디스크에서 읽음
+
+사용법:
+    python scripts/aggregate_cube.py                 # 기본 대분류
+    python scripts/aggregate_cube.py --all-categories
+"""
+
+import argparse
+import io
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from output_layout import LAYOUTS, load_summary, open_summary
+from preprocess_common import TARGET_CATEGORY, output_prefix, write_atomic
+
+# ========== 설정 ==========
+OUTPUT_PATH = Path(__file__).parent.parent / "public" / "data"
+CUBE_PATH = Path(__file__).parent.parent / "data" / "cube"
+
+# 큐브 지표 → 전처리 결과 데이터셋
+CUBE_METRICS = {
+    "sales": "sales",
+    "inventory": "inventory",
+}
+
+CUBE_AXES = ["metric", "brand", "item_tab", "month", "channel", "op_group"]
+OP_GROUPS = ["core", "outlet"]
+
+
+def cube_files(category: str = TARGET_CATEGORY, cube_path: Path = CUBE_PATH) -> Tuple[Path, Path]:
+    """(배열 파일, 축 라벨 파일) 경로"""
+    stem = f"{output_prefix(category)}_cube"
+    return cube_path / f"{stem}.npy", cube_path / f"{stem}.axes.json"
+
+
+def load_summaries(category: str, output_path: Path = OUTPUT_PATH, layout: str = "single") -> Dict[str, Dict]:
+    """지표별 전처리 결과 (Arrow 산출물이 맞으면 산출물, 아니면 JSON / 없는 파일은 건너뜀)"""
+    summaries = {}
+    for metric, dataset in CUBE_METRICS.items():
+        store = open_summary(output_path, category, dataset, layout)
+        if not store.exists():
+            print(f"[WARNING] 파일이 존재하지 않습니다: {store.path}")
+            continue
+        summaries[metric] = load_summary(store)
+    return summaries
+
+
+def build_cube(summaries: Dict[str, Dict]) -> Tuple[np.ndarray, Dict[str, List[str]]]:
+    """
+    지표별 summary JSON → (6차원 배열, 축 라벨)
+    값 필드 이름 {채널}_{core|outlet} 을 채널 / operation_group 축으로 분리, 없는 칸은 0
+    """
+    labels: Dict[str, Dict[str, None]] = {axis: {} for axis in CUBE_AXES}
+    labels["op_group"] = dict.fromkeys(OP_GROUPS)
+    cells: List[Tuple[Tuple[str, ...], float]] = []
+
+    for metric, summary in summaries.items():
+        labels["metric"][metric] = None
+        for month in summary.get("months", []):
+            labels["month"][month] = None
+        for brand, tabs in summary["brands"].items():
+            labels["brand"][brand] = None
+            for item_tab, months in tabs.items():
+                labels["item_tab"][item_tab] = None
+                for month, fields in months.items():
+                    labels["month"][month] = None
+                    for field, value in fields.items():
+                        channel, op_group = field.rsplit("_", 1)
+                        if op_group not in OP_GROUPS:
+                            continue
+                        labels["channel"][channel] = None
+                        cells.append(((metric, brand, item_tab, month, channel, op_group), float(value)))
+
+    axes = {axis: list(values) for axis, values in labels.items()}
+    axes["month"] = sorted(axes["month"])
+    index = {axis: {label: i for i, label in enumerate(values)} for axis, values in axes.items()}
+
+    cube = np.zeros([len(axes[axis]) for axis in CUBE_AXES], dtype=np.float64)
+    for key, value in cells:
+        cube[tuple(index[axis][label] for axis, label in zip(CUBE_AXES, key))] = value
+    return cube, axes
+
+
+def write_cube(
+    category: str = TARGET_CATEGORY,
+    output_path: Path = OUTPUT_PATH,
+    cube_path: Path = CUBE_PATH,
+    layout: str = "single"
+) -> Path:
+    """전처리 결과 JSON → 큐브 파일 저장 (원자적 쓰기)"""
+    summaries = load_summaries(category, output_path, layout)
+    if not summaries:
+        raise FileNotFoundError(f"{category}: 전처리 결과 JSON이 없습니다 ({output_path})")
+
+    cube, axes = build_cube(summaries)
+    cube_path.mkdir(parents=True, exist_ok=True)
+    array_file, axes_file = cube_files(category, cube_path)
+
+    buffer = io.BytesIO()
+    np.save(buffer, cube)
+    write_atomic(array_file, buffer.getvalue())
+    axes_payload = {"axes": CUBE_AXES, "labels": axes, "category": category}
+    write_atomic(axes_file, json.dumps(axes_payload, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    print(f"[DONE] 큐브 저장: {array_file} {cube.shape} ({cube.nbytes:,} bytes)")
+    return array_file
+
+
+def load_cube(category: str = TARGET_CATEGORY, cube_path: Path = CUBE_PATH) -> Tuple[np.ndarray, Dict[str, List[str]]]:
+    """큐브 파일을 메모리 맵으로 열기 (읽기 전용)"""
+    array_file, axes_file = cube_files(category, cube_path)
+    with open(axes_file, "r", encoding="utf-8") as f:
+        axes = json.load(f)["labels"]
+    return np.load(array_file, mmap_mode="r"), axes
+
+
+def categories_in_outputs(output_path: Path = OUTPUT_PATH, layout: str = "single") -> List[str]:
+    """출력 폴더의 판매 결과 파일 이름에서 대분류 목록 (접두어 → 대분류 역변환)"""
+    from preprocess_common import CATEGORY_OUTPUT_PREFIX
+
+    suffix = "_sales_months" if layout == "monthly" else "_sales_summary.json"
+    prefix_to_category = {prefix: category for category, prefix in CATEGORY_OUTPUT_PREFIX.items()}
+    categories = []
+    for path in sorted(output_path.glob(f"*{suffix}")):
+        prefix = path.name[: -len(suffix)]
+        if prefix in prefix_to_category:
+            categories.append(prefix_to_category[prefix])
+        elif prefix.startswith("category_"):
+            categories.append(prefix[len("category_"):])
+    return categories
+
+
+def main():
+    parser = argparse.ArgumentParser(description="전처리 결과 JSON → 집계 큐브 파일")
+    parser.add_argument("--all-categories", action="store_true", help="출력 폴더의 모든 대분류")
+    parser.add_argument("--category", default=TARGET_CATEGORY)
+    parser.add_argument("--layout", choices=LAYOUTS, default="single", help="전처리 결과 저장 방식")
+    args = parser.parse_args()
+
+    categories = categories_in_outputs(layout=args.layout) if args.all_categories else [args.category]
+    for category in categories:
+        write_cube(category, layout=args.layout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+DuckDB 집계 백엔드 (--backend duckdb)
+- 월별 CSV 전체를 쿼리 1개로 읽어서 pandas 청크 루프와 같은 리프 큐브를 반환
+- 브랜드/대분류 필터, operation_group 파생을 SQL로 표현
+- 멀티스레드 + 메모리 한도 초과 시 임시 디렉터리로 spill (out-of-core)
+- duckdb 미설치 환경에서는 pandas 백엔드만 사용 가능 (pip install duckdb)
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from preprocess_common import AMOUNT_SCALE, CATEGORY_ITEM_TABS, CORE_SEASONS, TARGET_CATEGORY, VALID_BRANDS
+from rollup import LEAF_DIMENSIONS, empty_leaf
+
+# ========== 설정 ==========
+DUCKDB_THREADS: Optional[int] = None  # None이면 CPU 코어 수
+DUCKDB_MEMORY_LIMIT = "4GB"
+DUCKDB_TEMP_DIR: Optional[Path] = None  # None이면 DuckDB 기본값
+
+# pandas.read_csv 기본 결측 문자열 (pandas 백엔드와 같은 값을 NULL로 처리)
+PANDAS_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+def _sql_str(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _sql_list(values) -> str:
+    return ", ".join(_sql_str(v) for v in sorted(values))
+
+
+def build_leaf_query(month_files: Dict[str, Path], amount_col: str, all_categories: bool) -> str:
+    """
+    리프 큐브 쿼리 생성
+    결과 컬럼: LEAF_DIMENSIONS + amount (rollup.aggregate_leaf와 동일, int64 최소 단위)
+    """
+    files = _sql_list(str(path) for path in month_files.values())
+    month_case = " ".join(
+        f"WHEN filename = {_sql_str(path)} THEN {_sql_str(month)}" for month, path in month_files.items()
+    )
+    category_filter = "" if all_categories else f'AND "产品大分类" = {_sql_str(TARGET_CATEGORY)}'
+    core_season_pattern = _sql_str("|".join(CORE_SEASONS))
+
+    return f"""
+        WITH src AS (
+            SELECT
+                "产品大分类" AS category,
+                "产品品牌" AS brand,
+                coalesce("产品中分类", '') AS item_cat,
+                CASE {month_case} END AS month,
+                coalesce("Channel 2", '') AS channel,
+                trim(coalesce("运营基准", '')) AS op_basis,
+                coalesce("产品季节", '') AS season,
+                CAST(round(coalesce(TRY_CAST("{amount_col}" AS DOUBLE), 0.0) * {AMOUNT_SCALE}) AS BIGINT) AS amount
+            FROM read_csv(
+                [{files}],
+                header = true,
+                all_varchar = true,
+                filename = true,
+                union_by_name = true,
+                nullstr = [{", ".join(_sql_str(v) for v in PANDAS_NA_VALUES)}]
+            )
+            WHERE "产品品牌" IN ({_sql_list(VALID_BRANDS)})
+              AND "产品大分类" IS NOT NULL
+              {category_filter}
+        )
+        SELECT
+            category, brand, item_cat, month, channel,
+            CASE
+                WHEN op_basis IN ('INTRO', 'FOCUS', '26SS') THEN 'core'
+                WHEN op_basis = '' AND regexp_matches(trim(season), {core_season_pattern}) THEN 'core'
+                ELSE 'outlet'
+            END AS op_group,
+            season,
+            CAST(sum(amount) AS BIGINT) AS amount
+        FROM src
+        GROUP BY ALL
+    """
+
+
+def unexpected_from_leaf(leaf: pd.DataFrame) -> Dict[str, Set[str]]:
+    """리프 큐브의 (대분류, 중분류) 조합에서 예상치 못한 중분류 추출"""
+    unexpected: Dict[str, Set[str]] = {}
+    pairs = leaf.loc[leaf["item_cat"] != "", ["category", "item_cat"]].drop_duplicates()
+    for category, item_cat in pairs.itertuples(index=False):
+        valid_items = CATEGORY_ITEM_TABS.get(category)
+        if valid_items is not None and item_cat not in valid_items:
+            unexpected.setdefault(category, set()).add(item_cat)
+    return unexpected
+
+
+def scan_leaf(
+    month_files: Dict[str, Path],
+    amount_col: str,
+    all_categories: bool = False
+) -> Tuple[pd.DataFrame, Dict[str, Set[str]]]:
+    """
+    월별 CSV를 DuckDB 쿼리 1개로 집계
+
+    Args:
+        month_files: {연월: CSV 경로} (존재하는 파일만)
+        amount_col: 금액 컬럼 (吊牌金额 / 预计库存金额)
+        all_categories: True면 대분류 필터 없이 대분류를 차원으로 유지
+
+    Returns:
+        (리프 큐브, 대분류별 예상치 못한 중분류)
+    """
+    import duckdb
+
+    if not month_files:
+        return empty_leaf(), {}
+
+    con = duckdb.connect()
+    try:
+        if DUCKDB_THREADS:
+            con.execute(f"SET threads = {int(DUCKDB_THREADS)}")
+        con.execute(f"SET memory_limit = {_sql_str(DUCKDB_MEMORY_LIMIT)}")
+        if DUCKDB_TEMP_DIR:
+            con.execute(f"SET temp_directory = {_sql_str(DUCKDB_TEMP_DIR)}")
+        leaf = con.execute(build_leaf_query(month_files, amount_col, all_categories)).df()
+    finally:
+        con.close()
+
+    leaf = leaf[LEAF_DIMENSIONS + ["amount"]]
+    return leaf, unexpected_from_leaf(leaf)
+
+
+def existing_month_files(data_path: Path, months: List[str]) -> Dict[str, Path]:
+    """존재하는 월 파일만 {연월: 경로}로 반환 (없는 파일은 경고)"""
+    month_files: Dict[str, Path] = {}
+    for month in months:
+        file_path = data_path / f"{month}.csv"
+        if not file_path.exists():
+            print(f"[WARNING] 파일이 존재하지 않습니다: {file_path}")
+            continue
+        month_files[month] = file_path
+    return month_files
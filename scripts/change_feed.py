@@ -0,0 +1,109 @@
+"""
+변경 셀 피드 (전처리 실행마다 바뀐 집계 셀만 기록)
+- 결과 JSON을 쓰기 직전에 이전 값과 새 값을 (브랜드, 아이템탭, 월, 필드) 행으로 펼쳐서 한 번에 비교
+- 바뀐 셀만 public/data/changes/{실행시각}_{full|merge}.json 에 데이터셋별로 저장
+- 하위 캐시 / 숫자 검증은 이 파일에 있는 셀만 무효화·재검증하면 됨
+
+파일 구조:
+    {"runAt", "mode", "months", "datasets": {"accessory_sales": {"columns": [...], "cells": [[...], ...]}}}
+    cells 행: [브랜드, 아이템탭, 월, 필드, 이전 값(없으면 null), 새 값(없으면 null)]
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from preprocess_common import output_prefix, write_atomic
+
+# ========== 설정 ==========
+CHANGE_FEED_DIR = "changes"  # 출력 폴더 아래
+CHANGE_FEED_KEEP = 100  # 보관할 실행 수 (오래된 파일부터 삭제)
+VALUE_TOLERANCE = 1e-6  # 미리보기 추정치처럼 반올림하지 않는 값의 부동소수 오차
+
+CELL_KEYS = ["brand", "item_tab", "month", "field"]
+
+
+def flatten_summary(summary: Optional[Dict], months: Optional[List[str]] = None) -> pd.DataFrame:
+    """summary JSON → (brand, item_tab, month, field, value) 행 (months 지정 시 해당 월만)"""
+    if not summary:
+        return pd.DataFrame(columns=CELL_KEYS + ["value"])
+    wanted = None if months is None else set(months)
+    rows = [
+        (brand, item_tab, month, field, value)
+        for brand, tabs in summary.get("brands", {}).items()
+        for item_tab, by_month in tabs.items()
+        for month, fields in by_month.items()
+        if wanted is None or month in wanted
+        for field, value in fields.items()
+    ]
+    return pd.DataFrame(rows, columns=CELL_KEYS + ["value"])
+
+
+def diff_cells(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    펼친 두 summary 비교 → 바뀐 셀 (old / new 컬럼, 한쪽에만 있으면 NaN)
+    """
+    merged = old.merge(new, on=CELL_KEYS, how="outer", suffixes=("_old", "_new"))
+    old_values = merged["value_old"].to_numpy(dtype=np.float64)
+    new_values = merged["value_new"].to_numpy(dtype=np.float64)
+    same = np.isclose(old_values, new_values, rtol=0, atol=VALUE_TOLERANCE) | (np.isnan(old_values) & np.isnan(new_values))
+    changed = merged.loc[~same, CELL_KEYS + ["value_old", "value_new"]]
+    return changed.rename(columns={"value_old": "old", "value_new": "new"}).sort_values(CELL_KEYS, ignore_index=True)
+
+
+class ChangeFeed:
+    """실행 1회 동안 데이터셋별 변경 셀을 모았다가 마지막에 파일 1개로 저장"""
+
+    def __init__(self, mode: str, months: List[str]):
+        self.mode = mode
+        self.months = list(months)
+        self.changes: Dict[str, pd.DataFrame] = {}
+
+    def record(
+        self,
+        category: str,
+        dataset: str,
+        old: Optional[Dict],
+        new: Dict,
+        months: Optional[List[str]] = None
+    ) -> None:
+        """old / new summary 비교 결과 추가 (months 지정 시 해당 월만 비교)"""
+        name = f"{output_prefix(category)}_{dataset}"
+        changed = diff_cells(flatten_summary(old, months), flatten_summary(new, months))
+        if name in self.changes:
+            changed = pd.concat([self.changes[name], changed], ignore_index=True)
+        self.changes[name] = changed
+
+    def write(self, output_path: Path) -> Optional[Path]:
+        """변경 셀 파일 저장 (바뀐 셀이 없어도 실행 기록으로 저장)"""
+        feed_dir = output_path / CHANGE_FEED_DIR
+        feed_dir.mkdir(parents=True, exist_ok=True)
+        run_at = datetime.now()
+
+        datasets = {}
+        for name, changed in sorted(self.changes.items()):
+            cells = changed.astype(object).where(changed.notna(), None)
+            datasets[name] = {
+                "columns": CELL_KEYS + ["old", "new"],
+                "changed": len(cells),
+                "cells": cells.values.tolist(),
+            }
+        payload = {
+            "runAt": run_at.isoformat(timespec="seconds"),
+            "mode": self.mode,
+            "months": self.months,
+            "datasets": datasets,
+        }
+        feed_file = feed_dir / f"{run_at:%Y%m%d-%H%M%S-%f}_{self.mode}.json"
+        write_atomic(feed_file, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+        for stale in sorted(feed_dir.glob("*.json"))[:-CHANGE_FEED_KEEP]:
+            stale.unlink()
+
+        summary = ", ".join(f"{name} {info['changed']:,}" for name, info in datasets.items()) or "없음"
+        print(f"[DONE] 변경 셀 피드 저장: {feed_file} ({summary})")
+        return feed_file
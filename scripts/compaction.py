@@ -0,0 +1,258 @@
+"""
+월별 partial 계층 압축 (긴 이력용)
+- 마감된 연도(12개월 partial이 모두 있고 마지막 월의 연도보다 이전)는 연도 블록 1개로 합침
+    {partials}/blocks/{dataset}_{YYYY}.block.npz  (한 번 쓰면 바뀌지 않음, 원래 월 partial은 삭제)
+    keys    : 월을 뺀 리프 차원 키 테이블
+    monthly : 키 × 12개월 금액 (int64 최소 단위), present : 키 × 12개월 리프 행 존재 여부 (월별 리프 큐브 그대로 복원)
+- 블록끼리는 독립적이라 연도별로 따로 만들고 지울 수 있음
+- 최근(마감 전) 연도는 월 partial 그대로 유지
+- 조회 (CompactedHistory.leaf): 월별 리프 큐브 (블록 연도 1개 = 파일 1개)
+
+사용법:
+    python scripts/work_queue.py compact [--all-categories]
+"""
+
+import io
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from partials import PARTIAL_SUFFIX, Partial, merge_partials, read_partial
+from preprocess_common import write_atomic
+from rollup import LEAF_DIMENSIONS, empty_leaf
+
+# ========== 설정 ==========
+BLOCKS_DIRNAME = "blocks"
+BLOCK_SUFFIX = ".block.npz"
+BLOCK_FORMAT_VERSION = 2
+
+KEY_DIMENSIONS = [dim for dim in LEAF_DIMENSIONS if dim != "month"]
+MONTHS_PER_YEAR = 12
+
+
+def year_months(year: int) -> List[str]:
+    return [f"{year}.{m:02d}" for m in range(1, MONTHS_PER_YEAR + 1)]
+
+
+def block_file(partials_dir: Path, dataset: str, year: int) -> Path:
+    return partials_dir / BLOCKS_DIRNAME / f"{dataset}_{year}{BLOCK_SUFFIX}"
+
+
+def month_partials(partials_dir: Path, dataset: str) -> Dict[str, Path]:
+    """{월: partial 경로} (월 1개짜리 partial만, 파일 이름 기준)"""
+    pattern = re.compile(rf"^{re.escape(dataset)}_(\d{{4}}\.\d{{2}}){re.escape(PARTIAL_SUFFIX)}$")
+    found = {}
+    for path in partials_dir.glob(f"{dataset}_*{PARTIAL_SUFFIX}"):
+        match = pattern.match(path.name)
+        if match:
+            found[match.group(1)] = path
+    return found
+
+
+def year_blocks(partials_dir: Path, dataset: str) -> Dict[int, Path]:
+    pattern = re.compile(rf"^{re.escape(dataset)}_(\d{{4}}){re.escape(BLOCK_SUFFIX)}$")
+    found = {}
+    for path in (partials_dir / BLOCKS_DIRNAME).glob(f"{dataset}_*{BLOCK_SUFFIX}"):
+        match = pattern.match(path.name)
+        if match:
+            found[int(match.group(1))] = path
+    return found
+
+
+def drop_blocks(partials_dir: Path, dataset: str, years: Set[int]) -> List[int]:
+    """
+    해당 연도 블록 삭제
+    블록에 합쳐진 월 partial 은 이미 없으므로 삭제한 연도는 12개월 모두 다시 집계해야 함
+
+    Returns:
+        삭제한 블록 연도 목록
+    """
+    dropped = []
+    for year, path in sorted(year_blocks(partials_dir, dataset).items()):
+        if year in years:
+            path.unlink()
+            dropped.append(year)
+    return dropped
+
+
+class YearBlock:
+    """연도 블록 1개 (키 테이블 + 월별 금액 / 존재 여부)"""
+
+    def __init__(self, meta: Dict, keys: pd.DataFrame, monthly: np.ndarray, present: np.ndarray):
+        self.meta = meta
+        self.keys = keys
+        self.monthly = monthly
+        self.present = present
+
+    @property
+    def year(self) -> int:
+        return self.meta["year"]
+
+    @classmethod
+    def read(cls, path: Path) -> "YearBlock":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("format") != BLOCK_FORMAT_VERSION:
+                raise ValueError(f"지원하지 않는 블록 포맷: {path} (format={meta.get('format')})")
+            keys = pd.DataFrame({dim: data[f"key_{dim}"].astype(object) for dim in KEY_DIMENSIONS})
+            return cls(meta, keys, data["monthly"], data["present"])
+
+    @classmethod
+    def build(
+        cls,
+        dataset: str,
+        year: int,
+        leaf: pd.DataFrame,
+        unexpected: Dict[str, Dict[str, List[str]]],
+        all_categories: bool
+    ) -> "YearBlock":
+        """1년치 월별 리프 큐브 → 블록"""
+        keys = leaf[KEY_DIMENSIONS].drop_duplicates().reset_index(drop=True)
+
+        rows = leaf.merge(keys.reset_index(), on=KEY_DIMENSIONS, how="left")["index"].to_numpy()
+        cols = leaf["month"].str[5:7].astype(int).to_numpy() - 1
+        monthly = np.zeros((len(keys), MONTHS_PER_YEAR), dtype=np.int64)
+        present = np.zeros((len(keys), MONTHS_PER_YEAR), dtype=bool)
+        np.add.at(monthly, (rows, cols), leaf["amount"].to_numpy(dtype=np.int64))
+        present[rows, cols] = True
+
+
+        meta = {
+            "format": BLOCK_FORMAT_VERSION,
+            "dataset": dataset,
+            "year": year,
+            "allCategories": all_categories,
+            "unexpected": unexpected,
+        }
+        return cls(meta, keys, monthly, present)
+
+    def write(self, path: Path) -> None:
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            meta=np.array(json.dumps(self.meta, ensure_ascii=False)),
+            monthly=self.monthly,
+            present=self.present,
+            **{f"key_{dim}": self.keys[dim].to_numpy(dtype=str) for dim in KEY_DIMENSIONS},
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, buffer.getvalue())
+
+    def month_leaf(self, months: List[str]) -> pd.DataFrame:
+        """블록 → 해당 월들의 리프 큐브 (원래 리프 행만)"""
+        frames = []
+        for month in months:
+            col = int(month[5:7]) - 1
+            rows = np.flatnonzero(self.present[:, col])
+            frame = self.keys.iloc[rows].reset_index(drop=True)
+            frame["month"] = month
+            frame["amount"] = self.monthly[rows, col]
+            frames.append(frame)
+        if not frames:
+            return empty_leaf()
+        return pd.concat(frames, ignore_index=True)[LEAF_DIMENSIONS + ["amount"]]
+
+
+def compact(partials_dir: Path, dataset: str, all_categories: bool = False) -> List[int]:
+    """
+    마감된 연도의 월 partial → 연도 블록 (partial이 빠진 연도는 월 단위로 남겨 둠)
+
+    Returns:
+        새로 만든 블록 연도 목록
+    """
+    partials = month_partials(partials_dir, dataset)
+    blocks = year_blocks(partials_dir, dataset)
+    if not partials:
+        return []
+    latest_year = int(max(partials)[:4])
+    if blocks and YearBlock.read(blocks[max(blocks)]).meta["allCategories"] != all_categories:
+        raise ValueError(f"대분류 모드가 다른 블록이 있습니다: {blocks[max(blocks)]}")
+    years = sorted({int(month[:4]) for month in partials} - set(blocks))
+
+    built = []
+    for year in years:
+        if year >= latest_year:
+            break
+        months = year_months(year)
+        missing = [m for m in months if m not in partials]
+        if missing:
+            print(f"[WARNING] {dataset} {year}년 partial 누락으로 압축하지 않음 (월 단위 유지): {missing}")
+            continue
+        parts, unexpected = [], {}
+        for month in months:
+            part = read_partial(partials[month])
+            if part["allCategories"] != all_categories:
+                raise ValueError(f"대분류 모드가 다른 partial이 섞여 있습니다: {partials[month]}")
+            parts.append((part["leaf"], part["unexpected"]))
+            unexpected[month] = {category: sorted(items) for category, items in part["unexpected"].items()}
+        leaf, _ = merge_partials(parts)
+
+        block = YearBlock.build(dataset, year, leaf, unexpected, all_categories)
+        block.write(block_file(partials_dir, dataset, year))
+        for month in months:
+            partials[month].unlink()
+        print(f"[DONE] {dataset} {year}년 블록 저장: 월 partial 12개 → 키 {len(block.keys):,}개")
+        built.append(year)
+    return built
+
+
+class CompactedHistory:
+    """연도 블록 + 최근 월 partial 로 이루어진 데이터셋 이력 (읽기 전용)"""
+
+    def __init__(self, partials_dir: Path, dataset: str, all_categories: bool = False):
+        self.dataset = dataset
+        self.all_categories = all_categories
+        self.blocks = year_blocks(partials_dir, dataset)
+        self.partials = {
+            month: path for month, path in month_partials(partials_dir, dataset).items()
+            if int(month[:4]) not in self.blocks
+        }
+        self._cache: Dict[int, YearBlock] = {}
+
+    def months(self) -> List[str]:
+        block_months = [m for year in self.blocks for m in year_months(year)]
+        return sorted(block_months + list(self.partials))
+
+    def block(self, year: int) -> YearBlock:
+        if year not in self._cache:
+            block = YearBlock.read(self.blocks[year])
+            if block.meta["allCategories"] != self.all_categories:
+                raise ValueError(f"대분류 모드가 다른 블록이 섞여 있습니다: {self.blocks[year]}")
+            self._cache[year] = block
+        return self._cache[year]
+
+    def _read_partial(self, month: str) -> Dict:
+        part = read_partial(self.partials[month])
+        if part["allCategories"] != self.all_categories:
+            raise ValueError(f"대분류 모드가 다른 partial이 섞여 있습니다: {self.partials[month]}")
+        return part
+
+    def leaf(self, months: Optional[List[str]] = None) -> Tuple[Partial, List[str]]:
+        """
+        월별 리프 큐브 (months 없으면 전체)
+
+        Returns:
+            ((리프 큐브, 예상치 못한 중분류), 포함된 월 목록)
+        """
+        available = set(self.months())
+        months = sorted(available if months is None else available & set(months))
+        parts: List[Partial] = []
+        by_year: Dict[int, List[str]] = {}
+        for month in months:
+            if int(month[:4]) in self.blocks:
+                by_year.setdefault(int(month[:4]), []).append(month)
+            else:
+                part = self._read_partial(month)
+                parts.append((part["leaf"], part["unexpected"]))
+        for year, year_months_ in by_year.items():
+            block = self.block(year)
+            unexpected: Dict[str, Set[str]] = {}
+            for month in year_months_:
+                for category, items in block.meta["unexpected"][month].items():
+                    unexpected.setdefault(category, set()).update(items)
+            parts.append((block.month_leaf(year_months_), unexpected))
+        return merge_partials(parts), months
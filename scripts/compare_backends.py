@@ -0,0 +1,113 @@
+"""
+집계 백엔드 차이 검증 (pandas 청크 루프 vs DuckDB / 줄 사전 필터)
+- 같은 월 파일을 두 백엔드로 집계해서 리프 큐브와 최종 JSON 값을 비교
+- 금액은 int64 최소 단위로 합산하므로 허용 오차 없이 정확히 같아야 함
+- 차이가 있으면 종료코드 1
+
+사용법:
+    python scripts/compare_backends.py
+    python scripts/compare_backends.py --months 2025.10 2025.11 --all-categories
+    python scripts/compare_backends.py --backend prefilter
+    python scripts/compare_backends.py --retail-path E:\\extract\\retail --inventory-path E:\\extract\\inventory
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+import preprocess_sales as sales
+from preprocess_common import split_by_category
+from preprocess_inventory import scan_inventory_months
+from rollup import INVENTORY_CHANNEL_GROUPS, LEAF_DIMENSIONS, SALES_CHANNEL_GROUPS, rollup_to_agg_dict
+
+
+def compare_leaves(name: str, left: pd.DataFrame, right: pd.DataFrame, other: str = "duckdb") -> List[str]:
+    """리프 큐브 비교 (키 집합 + 최소 단위 금액)"""
+    merged = left.merge(right, on=LEAF_DIMENSIONS, how="outer", suffixes=("_pandas", f"_{other}"), indicator=True)
+    errors = []
+    only = merged[merged["_merge"] != "both"]
+    if not only.empty:
+        errors.append(f"[{name}] 한쪽에만 있는 리프 키 {len(only):,}개: {only[LEAF_DIMENSIONS].head(5).to_dict('records')}")
+    both = merged[merged["_merge"] == "both"]
+    diff = (both["amount_pandas"] != both[f"amount_{other}"]).to_numpy()
+    if diff.any():
+        errors.append(f"[{name}] 금액이 다른 리프 키 {int(diff.sum()):,}개: {both[diff].head(5).to_dict('records')}")
+    return errors
+
+
+def compare_json(name: str, left: Dict, right: Dict, path: str = "", other: str = "duckdb") -> List[str]:
+    """최종 JSON 값 비교 (원 단위 반올림 값이 정확히 같아야 함)"""
+    if isinstance(left, dict) and isinstance(right, dict):
+        errors = []
+        for key in sorted(set(left) | set(right), key=str):
+            if key not in left or key not in right:
+                errors.append(f"[{name}] 키 불일치: {path}/{key}")
+                continue
+            errors.extend(compare_json(name, left[key], right[key], f"{path}/{key}", other))
+        return errors
+    if isinstance(left, list) and isinstance(right, list):
+        return [] if sorted(map(str, left)) == sorted(map(str, right)) else [f"[{name}] 목록 불일치: {path}"]
+    return [] if left == right else [f"[{name}] 값 불일치: {path} pandas={left} {other}={right}"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pandas / DuckDB (또는 줄 사전 필터) 집계 백엔드 결과 비교")
+    parser.add_argument("--months", nargs="+", default=sales.ANALYSIS_MONTHS, metavar="YYYY.MM")
+    parser.add_argument("--all-categories", action="store_true")
+    parser.add_argument("--backend", choices=["duckdb", "prefilter"], default="duckdb", help="pandas 와 비교할 백엔드")
+    parser.add_argument("--retail-path", type=Path, default=sales.RETAIL_DATA_PATH, help="판매 월 파일 폴더")
+    parser.add_argument("--inventory-path", type=Path, default=sales.INVENTORY_DATA_PATH, help="재고 월 파일 폴더")
+    args = parser.parse_args()
+
+    errors: List[str] = []
+    leaves = {}
+    for backend in ["pandas", args.backend]:
+        print(f"\n[{backend}] 집계 중...")
+        retail_leaf, retail_unexpected = sales.scan_retail_months(
+            args.retail_path, args.months, args.all_categories, backend
+        )
+        inv_leaf, inv_unexpected = scan_inventory_months(
+            args.inventory_path, args.months, args.all_categories, backend
+        )
+        leaves[backend] = (retail_leaf, retail_unexpected, inv_leaf, inv_unexpected)
+
+    pandas_result, other_result = leaves["pandas"], leaves[args.backend]
+    errors.extend(compare_leaves("판매 리프", pandas_result[0], other_result[0], args.backend))
+    errors.extend(compare_leaves("재고 리프", pandas_result[2], other_result[2], args.backend))
+    if pandas_result[1] != other_result[1] or pandas_result[3] != other_result[3]:
+        errors.append("[예상치 못한 중분류] 백엔드 간 결과가 다릅니다")
+
+    # 최종 JSON 비교 (pandas 백엔드와 같은 변환 함수 사용)
+    outputs = {}
+    for backend, (retail_leaf, retail_unexpected, inv_leaf, inv_unexpected) in leaves.items():
+        sales_by_category = split_by_category(rollup_to_agg_dict(retail_leaf, SALES_CHANNEL_GROUPS))
+        inv_by_category = split_by_category(rollup_to_agg_dict(inv_leaf, INVENTORY_CHANNEL_GROUPS))
+        outputs[backend] = {
+            category: {
+                "sales": sales.convert_sales_to_json_structure(
+                    sales_by_category.get(category, {}), retail_unexpected.get(category, set()), category
+                ),
+                "inventory": sales.convert_inventory_to_json_structure(
+                    inv_by_category.get(category, {}), sales_by_category.get(category, {}),
+                    inv_unexpected.get(category, set()), category
+                ),
+            }
+            for category in set(sales_by_category) | set(inv_by_category)
+        }
+    errors.extend(compare_json("JSON", outputs["pandas"], outputs[args.backend], other=args.backend))
+
+    print()
+    print("=" * 60)
+    if errors:
+        print(f"[ERROR] 백엔드 결과 불일치 {len(errors)}건")
+        for error in errors[:50]:
+            print(f"   - {error}")
+        sys.exit(1)
+    print(f"[DONE] 백엔드 결과 일치 (월 {len(args.months)}개, 판매 리프 {len(pandas_result[0]):,}, 재고 리프 {len(pandas_result[2]):,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+관리 합계 (control totals) 기록 + 게시 전 정합성 검사
+- 전처리 청크 루프에서 월 파일마다 사이드카 data/control_totals/{dataset}_{월}.json 기록 (원천 CSV를 다시 읽지 않음)
+    stages: 필터 단계별 행 수 / 원금액 합계 (read → brand → category, filter_chunk 단계와 같음)
+    cells : 필터 후 (대분류, 브랜드, 중분류, 채널) 금액 합계 (리프 큐브에서 계산)
+    금액은 리프 큐브와 같은 int64 최소 단위 (amountScale), 검사할 때 원 단위로 환산
+- 검사 (validate_summary, 요약 JSON 1개 기준 벡터 연산)
+    1. 채널: FRS + OR = 전체 (판매) / FRS + HQ_OR = 전체 (재고)
+    2. 아이템탭: 정상 아이템탭 합계 + 비정상 중분류 금액(사이드카) = 전체 탭
+    3. 원천: 전체 탭 채널그룹별 금액 = 사이드카 cells 합계
+    4. 사이드카: category 단계 금액 = cells 합계 (정수 → 정확히 일치), 필터 단계 행 수는 줄어들기만 함
+  게시 값은 원 단위 반올림이라 반올림한 항 수 × 0.5 까지 허용
+- 사이드카에 원천 CSV 크기 / 수정 시각을 기록, 읽을 때 원천이 바뀌었으면 (다른 백엔드로 재집계한 월 등) 오래된 사이드카로 보고 무시
+- 사이드카가 없는 월 (DuckDB 백엔드, 기록 이전 실행)은 1번만 검사
+  단, 이번 실행에서 청크 루프로 읽은 월 (required_months)은 사이드카가 없거나 오래되면 불일치로 처리
+
+사용법 (이미 게시된 JSON 검사):
+    python scripts/control_totals.py [--dataset sales inventory] [--category 饰品] [--layout monthly]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from preprocess_common import AMOUNT_SCALE, TARGET_CATEGORY, is_valid_item, to_minor_units, write_atomic
+from rollup import BRAND_TOTAL, INVENTORY_CHANNEL_GROUPS, SALES_CHANNEL_GROUPS
+from stage_artifacts import source_stamp
+
+# ========== 설정 ==========
+CONTROL_TOTALS_PATH = Path(__file__).parent.parent / "data" / "control_totals"
+OUTPUT_PATH = Path(__file__).parent.parent / "public" / "data"
+FILTER_STAGES = ["read", "brand", "category"]
+CELL_COLUMNS = ["category", "brand", "item_cat", "channel"]
+RELATIVE_TOLERANCE = 1e-9  # 부동소수 합산 순서 차이 (amountScale 없는 이전 사이드카)
+
+# 데이터셋 → (채널그룹 매핑, 채널 합계 검사 필드 (전체 = 나머지 합))
+DATASET_CHANNELS = {
+    "sales": (SALES_CHANNEL_GROUPS, ["FRS", "OR"]),
+    "inventory": (INVENTORY_CHANNEL_GROUPS, ["FRS", "HQ_OR"]),
+}
+OP_GROUPS = ["core", "outlet"]
+
+
+class ControlTotals:
+    """월 파일 1개의 관리 합계 (filter_chunk 의 record 콜백 + 리프 큐브로 누적)"""
+
+    def __init__(self, dataset: str, month: str, amount_col: str, all_categories: bool = False, source_file: Optional[Path] = None):
+        self.dataset = dataset
+        self.month = month
+        self.amount_col = amount_col
+        self.all_categories = all_categories
+        self.source_file = source_file  # 원천 CSV (크기 / 수정 시각을 기록해 재집계 여부 판단)
+        self.stages = {stage: {"rows": 0, "amount": 0} for stage in FILTER_STAGES}
+        self.cells: List[pd.DataFrame] = []
+        self.prefilter: Optional[Dict] = None  # 줄 사전 필터 통계 (--backend prefilter, read 단계 이전에 건너뛴 줄)
+
+    def record(self, stage: str, chunk: pd.DataFrame) -> None:
+        """필터 단계 통과 행 수 / 금액 누적"""
+        totals = self.stages[stage]
+        totals["rows"] += len(chunk)
+        totals["amount"] += int(to_minor_units(chunk[self.amount_col]).sum())
+
+    def add_leaf(self, leaf: pd.DataFrame) -> None:
+        """리프 큐브 → (대분류, 브랜드, 중분류, 채널) 금액"""
+        if not leaf.empty:
+            self.cells.append(leaf.groupby(CELL_COLUMNS, as_index=False, sort=False)["amount"].sum())
+
+    def payload(self) -> Dict:
+        cells = pd.concat(self.cells, ignore_index=True) if self.cells else pd.DataFrame(columns=CELL_COLUMNS + ["amount"])
+        cells = cells.groupby(CELL_COLUMNS, as_index=False)["amount"].sum()
+        return {
+            "dataset": self.dataset,
+            "month": self.month,
+            "allCategories": self.all_categories,
+            "amountScale": AMOUNT_SCALE,
+            "source": source_stamp(self.source_file) if self.source_file else None,
+            "stages": self.stages,
+            "prefilter": self.prefilter,
+            "cells": cells[CELL_COLUMNS + ["amount"]].values.tolist(),
+        }
+
+    def write(self, path: Optional[Path] = None) -> Path:
+        path = path or CONTROL_TOTALS_PATH
+        path.mkdir(parents=True, exist_ok=True)
+        target_file = sidecar_file(self.dataset, self.month, path)
+        write_atomic(target_file, json.dumps(self.payload(), ensure_ascii=False).encode("utf-8"))
+        return target_file
+
+
+def sidecar_file(dataset: str, month: str, path: Optional[Path] = None) -> Path:
+    return (path or CONTROL_TOTALS_PATH) / f"{dataset}_{month}.json"
+
+
+def sidecar_months(data_path: Path, months: List[str], backend: str) -> List[str]:
+    """사이드카가 있어야 하는 월 (청크 루프 백엔드로 읽는 월 파일, DuckDB 백엔드는 기록하지 않음)"""
+    if backend == "duckdb":
+        return []
+    return [month for month in months if (data_path / f"{month}.csv").exists()]
+
+
+def is_stale(sidecar: Dict) -> bool:
+    """기록한 원천 CSV 가 없어졌거나 크기 / 수정 시각이 바뀌었으면 True (원천 기록 이전 사이드카는 그대로 사용)"""
+    stamp = sidecar.get("source")
+    if not stamp:
+        return False
+    source = Path(stamp["path"])
+    return not source.exists() or source_stamp(source) != stamp
+
+
+def load_sidecars(dataset: str, months: List[str], category: str, path: Optional[Path] = None) -> Tuple[pd.DataFrame, List[Dict]]:
+    """
+    월별 사이드카 → (해당 대분류 cells 테이블 + month 컬럼, 대분류를 포함하는 사이드카 목록)
+    기본 대분류만 기록한 사이드카는 다른 대분류 검사에 쓰지 않음
+    원천 CSV 가 바뀐 (오래된) 사이드카는 없는 것으로 처리
+    """
+    frames, sidecars = [], []
+    for month in months:
+        target_file = sidecar_file(dataset, month, path)
+        if not target_file.exists():
+            continue
+        with open(target_file, "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        if is_stale(sidecar):
+            print(f"[WARNING] 원천 CSV 가 바뀐 사이드카 무시: {target_file}")
+            continue
+        if not sidecar["allCategories"] and category != TARGET_CATEGORY:
+            continue
+        sidecars.append(sidecar)
+        cells = pd.DataFrame(sidecar["cells"], columns=CELL_COLUMNS + ["amount"])
+        cells["amount"] = cells["amount"] / sidecar.get("amountScale", 1)
+        frames.append(cells[cells["category"] == category].assign(month=month))
+    cells = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=CELL_COLUMNS + ["amount", "month"])
+    return cells, sidecars
+
+
+def summary_frame(brands: Dict) -> pd.DataFrame:
+    """brands → 아이템탭 → 월 → 필드 트리 → (brand, item_tab, month) × 필드 테이블"""
+    rows = [
+        (brand, item_tab, month, fields)
+        for brand, tabs in brands.items()
+        for item_tab, by_month in tabs.items()
+        for month, fields in by_month.items()
+    ]
+    if not rows:
+        return pd.DataFrame(columns=["brand", "item_tab", "month"])
+    keys = pd.DataFrame([row[:3] for row in rows], columns=["brand", "item_tab", "month"])
+    values = pd.DataFrame([row[3] for row in rows]).fillna(0.0)
+    return pd.concat([keys, values], axis=1)
+
+
+def _mismatches(label: str, frame: pd.DataFrame, actual: np.ndarray, expected: np.ndarray, terms: float) -> List[str]:
+    """|actual - expected| > 반올림 허용치 인 행 → 오류 문자열"""
+    tolerance = 0.5 * terms + RELATIVE_TOLERANCE * np.abs(expected)
+    bad = np.flatnonzero(np.abs(actual - expected) > tolerance)
+    return [
+        f"{label}: {frame['brand'].iat[i]} / {frame['item_tab'].iat[i] if 'item_tab' in frame else '전체'} / "
+        f"{frame['month'].iat[i]} 게시 {actual[i]:,.0f} ≠ 기대 {expected[i]:,.0f}"
+        for i in bad
+    ]
+
+
+def validate_summary(
+    dataset: str,
+    category: str,
+    brands: Dict,
+    sidecar_path: Optional[Path] = None,
+    required_months: Optional[Iterable[str]] = None
+) -> List[str]:
+    """
+    요약 JSON brands 트리 정합성 검사 → 오류 목록 (빈 목록이면 통과)
+    required_months: 사이드카가 반드시 있어야 하는 월 (없거나 오래되면 오류, 나머지 월은 경고만)
+    """
+    channel_groups, parts = DATASET_CHANNELS[dataset]
+    table = summary_frame(brands)
+    if table.empty:
+        return []
+    errors: List[str] = []
+
+    # 1. 채널 합계 (필드 단위, 반올림 항 3개)
+    for op in OP_GROUPS:
+        total = table.get(f"전체_{op}", pd.Series(0.0, index=table.index)).to_numpy(dtype=float)
+        summed = sum(table.get(f"{part}_{op}", pd.Series(0.0, index=table.index)).to_numpy(dtype=float) for part in parts)
+        errors += _mismatches(f"채널 합계 {'+'.join(parts)}=전체 ({op})", table, summed, total, len(parts) + 1)
+
+    months = sorted(table["month"].unique())
+    cells, sidecars = load_sidecars(dataset, months, category, sidecar_path)
+
+    # 4. 사이드카 자체 (필터 단계)
+    for sidecar in sidecars:
+        stages = sidecar["stages"]
+        rows = [stages[stage]["rows"] for stage in FILTER_STAGES]
+        if any(later > earlier for earlier, later in zip(rows, rows[1:])):
+            errors.append(f"사이드카 {sidecar['month']}: 필터 단계 행 수가 늘어남 {rows}")
+        scale = sidecar.get("amountScale", 1)
+        cell_total = sum(amount for *_, amount in sidecar["cells"])
+        if abs(cell_total - stages["category"]["amount"]) > (0 if "amountScale" in sidecar else 0.5 + RELATIVE_TOLERANCE * abs(cell_total)):
+            errors.append(
+                f"사이드카 {sidecar['month']}: 필터 후 금액 {stages['category']['amount'] / scale:,.0f} ≠ cells 합계 {cell_total / scale:,.0f}"
+            )
+
+    covered = {sidecar["month"] for sidecar in sidecars}
+    missing = [month for month in months if month not in covered]
+    required = set(required_months or [])
+    errors += [f"사이드카 {month}: 청크 루프로 읽은 월인데 관리 합계 사이드카가 없거나 오래됨" for month in missing if month in required]
+    optional = [month for month in missing if month not in required]
+    if optional:
+        print(f"[WARNING] {dataset} 관리 합계 사이드카 없음 (채널 합계만 검사): {optional}")
+    if cells.empty:
+        return errors
+
+    # 채널그룹별 기대 금액 (브랜드 합계 키는 전 브랜드 합)
+    mapping = pd.DataFrame(
+        [(channel, group) for channel, groups in channel_groups.items() for group in groups],
+        columns=["channel", "channel_group"],
+    )
+    cells = cells.merge(mapping, on="channel", how="inner")
+    if BRAND_TOTAL in brands:
+        cells = pd.concat([cells, cells.assign(brand=BRAND_TOTAL)], ignore_index=True)
+    cells["valid"] = [is_valid_item(category, item_cat) for item_cat in cells["item_cat"]]
+    group_names = list(dict.fromkeys(mapping["channel_group"]))
+
+    by_tab = table[table["month"].isin(covered)].set_index(["brand", "item_tab", "month"])
+    for group in group_names:
+        published = sum(by_tab.get(f"{group}_{op}", 0.0) for op in OP_GROUPS)
+        if not isinstance(published, pd.Series):
+            continue
+        group_cells = cells[cells["channel_group"] == group]
+        keys = ["brand", "month"]
+
+        # 3. 원천 금액 = 전체 탭 (반올림 항 2개)
+        total_tab = published.xs("전체", level="item_tab").rename("published").reset_index()
+        expected = group_cells.groupby(keys)["amount"].sum().rename("expected").reset_index()
+        merged = total_tab.merge(expected, on=keys, how="left").fillna({"expected": 0.0})
+        errors += _mismatches(f"원천 합계 {group}", merged, merged["published"].to_numpy(), merged["expected"].to_numpy(), 2)
+
+        # 2. 아이템탭 합계 + 비정상 중분류 = 전체 탭
+        tabs = published.drop("전체", level="item_tab")
+        tab_sum = tabs.groupby(level=keys).sum().rename("tabs")
+        tab_count = tabs.groupby(level=keys).size().rename("count")
+        invalid = group_cells[~group_cells["valid"]].groupby(keys)["amount"].sum().rename("invalid")
+        merged = total_tab.merge(tab_sum.reset_index(), on=keys, how="left").merge(tab_count.reset_index(), on=keys, how="left")
+        merged = merged.merge(invalid.reset_index(), on=keys, how="left").fillna({"tabs": 0.0, "count": 0, "invalid": 0.0})
+        errors += _mismatches(
+            f"아이템탭 합계 {group}", merged,
+            (merged["tabs"] + merged["invalid"]).to_numpy(), merged["published"].to_numpy(),
+            2 + 2 * int(merged["count"].max()),
+        )
+    return errors
+
+
+def abort_on_control_mismatch(
+    dataset: str,
+    summaries: Dict[str, Dict],
+    sidecar_path: Optional[Path] = None,
+    required_months: Optional[Iterable[str]] = None
+) -> None:
+    """
+    게시 직전 검사 - 대분류별 brands 트리 중 하나라도 어긋나면 아무것도 쓰지 않고 종료
+    required_months: 이번 실행에서 청크 루프로 읽은 월 (sidecar_months)
+    """
+    required_months = list(required_months or [])
+    failed = False
+    for category, brands in summaries.items():
+        errors = validate_summary(dataset, category, brands, sidecar_path, required_months)
+        if errors:
+            failed = True
+            print(f"[ERROR] {category} {dataset} 관리 합계 불일치 {len(errors)}건:")
+            for error in errors[:20]:
+                print(f"   - {error}")
+    if failed:
+        print("[ERROR] 정합성 검사 실패로 게시를 중단합니다.")
+        sys.exit(1)
+    print(f"[DONE] {dataset} 관리 합계 검사 통과: {sorted(summaries)}")
+
+
+def month_brands_tree(month_brands: Dict[str, Dict]) -> Dict:
+    """병합용 {월: {브랜드: {탭: 필드}}} → {브랜드: {탭: {월: 필드}}}"""
+    brands: Dict = {}
+    for month, by_brand in month_brands.items():
+        for brand, tabs in by_brand.items():
+            for item_tab, fields in tabs.items():
+                brands.setdefault(brand, {}).setdefault(item_tab, {})[month] = fields
+    return brands
+
+
+def main() -> None:
+    from output_layout import LAYOUTS, open_summary
+
+    parser = argparse.ArgumentParser(description="게시된 요약 JSON 관리 합계 검사")
+    parser.add_argument("--dataset", nargs="+", choices=list(DATASET_CHANNELS), default=list(DATASET_CHANNELS))
+    parser.add_argument("--category", nargs="+", default=[TARGET_CATEGORY])
+    parser.add_argument("--layout", choices=LAYOUTS, default="single")
+    args = parser.parse_args()
+
+    failed = False
+    for dataset in args.dataset:
+        for category in args.category:
+            store = open_summary(OUTPUT_PATH, category, dataset, args.layout)
+            if not store.exists():
+                print(f"[WARNING] 요약 JSON 없음: {store.path}")
+                continue
+            errors = validate_summary(dataset, category, store.read().get("brands", {}))
+            if errors:
+                failed = True
+                print(f"[ERROR] {store.path}: 불일치 {len(errors)}건")
+                for error in errors[:50]:
+                    print(f"   - {error}")
+            else:
+                print(f"[DONE] 검사 통과: {store.path}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+파생 지표 (전년 대비 / 전월 대비 / 최근 N개월 합계)
+- summary JSON(브랜드 → 아이템탭 → 월 → 필드)을 (브랜드, 아이템탭, 필드, 월) 배열 1개로 바꾼 뒤
+  월 축 기준으로 한 번에 계산
+    yoyDelta / yoyRatio : 당월 - 전년 동월 / 당월 ÷ 전년 동월
+    mom                 : 당월 ÷ 전월 - 1
+    trailing{N}         : 최근 N개월 합계 (누적합 차이로 계산)
+- 결과는 {prefix}_{dataset}_derived.json (월 배열 단위 시계열)
+- 월 병합 시에는 영향받는 월(병합 월, +1/+2개월, +12개월)만 다시 계산해서 기존 파일에 반영
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from output_layout import open_summary
+from preprocess_common import output_prefix, write_atomic
+
+# ========== 설정 ==========
+TRAILING_WINDOWS = [1, 2, 3]  # 재고주수 기간 슬라이더와 같은 값
+YOY_LAG = 12
+DERIVED_METRICS = ["yoyDelta", "yoyRatio", "mom"] + [f"trailing{w}" for w in TRAILING_WINDOWS]
+RATIO_DIGITS = 6
+
+
+def shift_month(month: str, offset: int) -> str:
+    """"2025.11" + offset 개월"""
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 + offset
+    return f"{index // 12}.{index % 12 + 1:02d}"
+
+
+def month_calendar(first: str, last: str) -> List[str]:
+    """first ~ last 사이 빠짐없는 월 목록"""
+    months = [first]
+    while months[-1] < last:
+        months.append(shift_month(months[-1], 1))
+    return months
+
+
+def affected_months(changed: Iterable[str]) -> List[str]:
+    """월 변경 시 다시 계산해야 하는 월 (당월, 최근 N개월 합계 / 전월 대비, 전년 대비)"""
+    lags = {0, 1, YOY_LAG} | set(range(max(TRAILING_WINDOWS)))
+    return sorted({shift_month(month, lag) for month in changed for lag in lags})
+
+
+def summary_to_array(summary: Dict, calendar: List[str]) -> Tuple[np.ndarray, List[Tuple[str, str, str]]]:
+    """
+    summary → (행: (브랜드, 아이템탭, 필드), 열: calendar 월) float64 배열, 없는 칸은 NaN
+    """
+    position = {month: i for i, month in enumerate(calendar)}
+    rows: Dict[Tuple[str, str, str], int] = {}
+    cells: List[Tuple[int, int, float]] = []
+    for brand, tabs in summary["brands"].items():
+        for item_tab, by_month in tabs.items():
+            for month, fields in by_month.items():
+                if month not in position:
+                    continue
+                for field, value in fields.items():
+                    row = rows.setdefault((brand, item_tab, field), len(rows))
+                    cells.append((row, position[month], value))
+
+    values = np.full((len(rows), len(calendar)), np.nan)
+    if cells:
+        row_idx, col_idx, cell_values = zip(*cells)
+        values[list(row_idx), list(col_idx)] = cell_values
+    return values, list(rows)
+
+
+def derive(values: np.ndarray, targets: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    values: (행, 월) 배열 / targets: 계산할 월 위치
+    이전 월이 배열 밖이면 NaN
+    """
+    n_months = values.shape[1]
+
+    def lagged(lag: int) -> np.ndarray:
+        source = targets - lag
+        out = np.full((values.shape[0], len(targets)), np.nan)
+        valid = source >= 0
+        out[:, valid] = values[:, source[valid]]
+        return out
+
+    current = values[:, targets]
+    prev_year = lagged(YOY_LAG)
+    prev_month = lagged(1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = {
+            "yoyDelta": current - prev_year,
+            "yoyRatio": np.where(prev_year != 0, current / prev_year, np.nan),
+            "mom": np.where(prev_month != 0, current / prev_month - 1, np.nan),
+        }
+
+    # 최근 N개월 합계 = 누적합[t] - 누적합[t-N] (사이에 빈 월이 있으면 NaN)
+    # (NaN은 0으로 누적하고, 빈 월 개수도 누적해서 구간 안에 빈 월이 있으면 NaN 처리)
+    zeros = np.zeros((values.shape[0], 1))
+    cumsum = np.concatenate([zeros, np.cumsum(np.nan_to_num(values), axis=1)], axis=1)
+    missing = np.concatenate([zeros, np.cumsum(np.isnan(values), axis=1)], axis=1)
+    for window in TRAILING_WINDOWS:
+        start = targets + 1 - window
+        out = np.full((values.shape[0], len(targets)), np.nan)
+        valid = (start >= 0) & (targets < n_months)
+        end, begin = targets[valid] + 1, start[valid]
+        sums = cumsum[:, end] - cumsum[:, begin]
+        out[:, valid] = np.where(missing[:, end] - missing[:, begin] > 0, np.nan, sums)
+        result[f"trailing{window}"] = out
+    return result
+
+
+def _to_json_list(values: np.ndarray, metric: str) -> List:
+    digits = RATIO_DIGITS if metric in ("yoyRatio", "mom") else 2
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def derived_file(output_path: Path, category: str, dataset: str) -> Path:
+    return output_path / f"{output_prefix(category)}_{dataset}_derived.json"
+
+
+def build_derived(summary: Dict, calendar: List[str], targets: List[str]) -> Dict:
+    """
+    calendar 월 범위로 배열을 만들고 targets 월만 계산
+    Returns: {(브랜드, 아이템탭, 필드): {지표: {월: 값}}}
+    """
+    values, rows = summary_to_array(summary, calendar)
+    position = {month: i for i, month in enumerate(calendar)}
+    target_pos = np.array([position[m] for m in targets], dtype=np.int64)
+    derived = derive(values, target_pos)
+    return {
+        row: {metric: dict(zip(targets, _to_json_list(derived[metric][i], metric))) for metric in DERIVED_METRICS}
+        for i, row in enumerate(rows)
+    }
+
+
+def write_derived(
+    output_path: Path,
+    category: str,
+    dataset: str,
+    layout: str = "single",
+    changed_months: Optional[List[str]] = None
+) -> Path:
+    """
+    파생 지표 파일 저장
+    changed_months가 있고 기존 파일이 있으면 영향받는 월만 다시 계산 (필요한 월 파일만 읽음)
+
+    파일 구조: {"months": [...], "metrics": [...], "series": {브랜드: {아이템탭: {필드: {지표: [월별 값]}}}}}
+    """
+    store = open_summary(output_path, category, dataset, layout)
+    target_file = derived_file(output_path, category, dataset)
+    existing = None
+    if changed_months and target_file.exists():
+        with open(target_file, "r", encoding="utf-8") as f:
+            existing = json.load(f)
+        if existing.get("metrics") != DERIVED_METRICS:
+            existing = None
+
+    if existing is None:
+        summary = store.read()
+        months = sorted(summary["months"])
+        calendar = month_calendar(months[0], months[-1]) if months else []
+        targets = calendar
+        series_months = calendar
+    else:
+        all_months = sorted(set(existing["months"]) | set(changed_months))
+        series_months = month_calendar(all_months[0], all_months[-1])
+        targets = [m for m in affected_months(changed_months) if m in set(series_months)]
+        # 계산에 필요한 이전 월까지만 읽음
+        lookback_start = shift_month(targets[0], -max(YOY_LAG, max(TRAILING_WINDOWS)))
+        calendar = month_calendar(lookback_start, targets[-1])
+        summary = store.read([m for m in calendar if m in set(series_months)])
+
+    computed = build_derived(summary, calendar, targets) if targets else {}
+
+    # 기존 시계열을 새 월 축으로 옮긴 뒤 계산한 월만 덮어씀
+    series: Dict = {}
+    if existing is not None:
+        old_pos = {month: i for i, month in enumerate(existing["months"])}
+        for brand, tabs in existing["series"].items():
+            for item_tab, fields in tabs.items():
+                for field, metrics in fields.items():
+                    series.setdefault(brand, {}).setdefault(item_tab, {})[field] = {
+                        metric: [metrics[metric][old_pos[m]] if m in old_pos else None for m in series_months]
+                        for metric in DERIVED_METRICS
+                    }
+    new_pos = {month: i for i, month in enumerate(series_months)}
+    for (brand, item_tab, field), metrics in computed.items():
+        slot = series.setdefault(brand, {}).setdefault(item_tab, {}).setdefault(
+            field, {metric: [None] * len(series_months) for metric in DERIVED_METRICS}
+        )
+        for metric, by_month in metrics.items():
+            for month, value in by_month.items():
+                slot[metric][new_pos[month]] = value
+
+    result = {"months": series_months, "metrics": DERIVED_METRICS, "series": series}
+    write_atomic(target_file, json.dumps(result, ensure_ascii=False).encode("utf-8"))
+    mode = "전체" if existing is None else f"증분 {len(targets)}개월"
+    print(f"[DONE] 파생 지표 저장 ({mode}): {target_file}")
+    return target_file
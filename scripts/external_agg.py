@@ -0,0 +1,131 @@
+"""
+디스크 분할 집계 (SKU 단위처럼 키가 수천만 개인 groupby sum)
+- 청크별 groupby 결과를 메모리 버퍼에 모으다가 한도를 넘으면
+  키 해시로 파티션을 나눠 run 파일(spill_dir/part-{파티션}-run-{번호}.pkl)로 내려씀
+- 마지막에 파티션 1개씩 (run 파일 + 남은 버퍼) 읽어서 다시 합산
+  → 같은 키는 항상 같은 파티션이라 파티션끼리는 합칠 필요 없음, 최대 메모리 ≈ 파티션 1개
+- 한도(memory_limit_mb)가 None이면 내려쓰지 않고 메모리에서만 집계 (기존 동작과 동일)
+
+사용:
+    with ExternalAggregator(keys, ["amount"], spill_dir, memory_limit_mb=1024) as agg:
+        for chunk in ...:
+            agg.add(chunk_grouped)
+        for p in range(agg.partition_count()):
+            frame = agg.partition(p)
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# ========== 설정 ==========
+SPILL_PARTITIONS = 32
+SPILL_MEMORY_LIMIT_MB = 1024
+
+
+def partition_ids(frame: pd.DataFrame, keys: List[str], partitions: int) -> np.ndarray:
+    """키 컬럼 해시 → 파티션 번호 (프로세스가 달라도 같은 키는 같은 번호)"""
+    hashes = pd.util.hash_pandas_object(frame[keys], index=False).to_numpy()
+    return (hashes % np.uint64(partitions)).astype(np.int64)
+
+
+class ExternalAggregator:
+    """키 컬럼 기준 합계를 메모리 한도 안에서 계산 (넘치면 해시 파티션 run 파일로 내려씀)"""
+
+    def __init__(
+        self,
+        keys: List[str],
+        values: List[str],
+        spill_dir: Optional[Path] = None,
+        memory_limit_mb: Optional[float] = None,
+        partitions: int = SPILL_PARTITIONS
+    ):
+        self.keys = list(keys)
+        self.values = list(values)
+        self.spill_root = Path(spill_dir) if spill_dir is not None else None
+        self.memory_limit = None if memory_limit_mb is None else memory_limit_mb * 1024 * 1024
+        self.partitions = partitions
+        self.buffer: List[pd.DataFrame] = []
+        self.buffer_bytes = 0
+        self.runs: List[List[Path]] = [[] for _ in range(partitions)]
+        self.run_count = 0
+        self.spilled_bytes = 0
+        self.work_dir: Optional[Path] = None
+
+    def __enter__(self) -> "ExternalAggregator":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def spilled(self) -> bool:
+        return self.run_count > 0
+
+    def _combine(self, frames: List[pd.DataFrame]) -> pd.DataFrame:
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=self.keys + self.values)
+        combined = pd.concat(frames, ignore_index=True)
+        return combined.groupby(self.keys, as_index=False, sort=False)[self.values].sum()
+
+    def add(self, frame: pd.DataFrame) -> None:
+        """청크 집계 결과 추가 (한도를 넘으면 버퍼를 합산한 뒤 내려씀)"""
+        if frame.empty:
+            return
+        self.buffer.append(frame[self.keys + self.values])
+        if self.memory_limit is None:
+            return
+        self.buffer_bytes += int(frame.memory_usage(deep=True).sum())
+        if self.buffer_bytes > self.memory_limit:
+            self.spill()
+
+    def spill(self) -> None:
+        """버퍼 합산 → 파티션별 run 파일 1개씩"""
+        if not self.buffer:
+            return
+        if self.spill_root is None:
+            raise ValueError("spill_dir 없이 메모리 한도를 넘었습니다")
+        if self.work_dir is None:
+            self.spill_root.mkdir(parents=True, exist_ok=True)
+            self.work_dir = Path(tempfile.mkdtemp(prefix="spill-", dir=self.spill_root))
+
+        combined = self._combine(self.buffer)
+        self.buffer, self.buffer_bytes = [], 0
+        ids = partition_ids(combined, self.keys, self.partitions)
+        for p in np.unique(ids):
+            run_file = self.work_dir / f"part-{p:03d}-run-{self.run_count:05d}.pkl"
+            combined[ids == p].to_pickle(run_file)
+            self.runs[p].append(run_file)
+            self.spilled_bytes += run_file.stat().st_size
+        self.run_count += 1
+
+    def partition_count(self) -> int:
+        """내려쓴 적이 없으면 1 (메모리 버퍼 전체가 파티션 1개)"""
+        return self.partitions if self.spilled else 1
+
+    def partition(self, p: int, count: Optional[int] = None) -> pd.DataFrame:
+        """
+        파티션 p 의 최종 합계
+        count: 파티션 수 (여러 집계기를 같은 파티션끼리 조인할 때 맞춰서 지정, 기본 partition_count())
+        """
+        count = self.partition_count() if count is None else count
+        if self.spilled and count != self.partitions:
+            raise ValueError(f"내려쓴 파티션 수({self.partitions})와 다릅니다: {count}")
+
+        frames = [pd.read_pickle(run_file) for run_file in self.runs[p]] if self.spilled else []
+        for frame in self.buffer:
+            frames.append(frame if count == 1 else frame[partition_ids(frame, self.keys, count) == p])
+        return self._combine(frames)
+
+    def close(self) -> None:
+        """run 파일 정리"""
+        if self.work_dir is not None:
+            if self.spilled:
+                print(f"[DONE] 디스크 분할 집계: run {self.run_count}회, {self.spilled_bytes / 1024 / 1024:,.1f} MB")
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.work_dir = None
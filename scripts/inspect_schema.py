@@ -0,0 +1,265 @@
+"""
+원천 CSV 스키마 점검 스크립트 (debug_inventory.py / debug_usecols.py 대체)
+- 헤더 + 파일 전체에서 무작위로 뽑은 바이트 구간만 읽어서 수 초 안에 종료
+- 컬럼 위치, 추론 dtype, 차원 컬럼 근사 카디널리티, 주력/아울렛 비율, 예상치 못한 중분류 리포트
+- 필수 컬럼이 없거나 금액 컬럼이 숫자가 아니면 종료코드 1 (전체 실행 전 fail-fast)
+
+사용법:
+    python scripts/inspect_schema.py inventory D:\\data\\inventory\\2025.11.csv
+    python scripts/inspect_schema.py retail D:\\data\\retail\\2025.11.csv --samples 128
+"""
+
+import argparse
+import csv
+import io
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from preprocess_common import (
+    INVENTORY_COLUMNS, RETAIL_COLUMNS, TARGET_CATEGORY, VALID_BRANDS, VALID_ITEM_CATEGORIES, determine_operation_group,
+)
+
+# ========== 설정 ==========
+DEFAULT_SAMPLES = 64  # 샘플링할 바이트 구간 수
+DEFAULT_SAMPLE_BYTES = 256 * 1024  # 구간당 바이트 수
+
+# 데이터셋별 필수 컬럼 / 금액 컬럼 / 인코딩
+DATASET_SCHEMAS = {
+    "retail": {
+        "columns": RETAIL_COLUMNS,
+        "amount_column": "吊牌金额",
+        "encoding": "utf-8",
+    },
+    "inventory": {
+        "columns": INVENTORY_COLUMNS,
+        "amount_column": "预计库存金额",
+        "encoding": "utf-8-sig",
+    },
+}
+
+# 카디널리티를 리포트할 차원 컬럼
+DIMENSION_COLUMNS = ["Channel 2", "产品品牌", "产品大分类", "产品中分类", "运营基准", "产品季节"]
+
+
+def read_header(file_path: Path, encoding: str) -> List[str]:
+    """첫 줄만 읽어서 컬럼 목록 반환"""
+    with open(file_path, "r", encoding=encoding, newline="") as f:
+        return next(csv.reader([f.readline()]))
+
+
+def find_schema_drift(file_paths: List[Path], required_columns: List[str], encoding: str) -> Dict[str, List[str]]:
+    """
+    각 파일 헤더에 필수 컬럼이 모두 있는지 확인 (헤더만 읽으므로 즉시 종료)
+
+    Returns:
+        {파일경로: 누락 컬럼 목록} - 문제 없는 파일은 포함하지 않음
+    """
+    drift: Dict[str, List[str]] = {}
+    for file_path in file_paths:
+        if not file_path.exists():
+            continue
+        header = set(read_header(file_path, encoding))
+        missing = [col for col in required_columns if col not in header]
+        if missing:
+            drift[str(file_path)] = missing
+    return drift
+
+
+def abort_on_schema_drift(file_paths: List[Path], required_columns: List[str], encoding: str) -> None:
+    """전처리 시작 전 헤더 점검 - 컬럼이 바뀐 파일이 있으면 전체 실행 전에 종료"""
+    drift = find_schema_drift(file_paths, required_columns, encoding)
+    if not drift:
+        return
+    print("[ERROR] 원천 CSV 컬럼 구성이 변경되었습니다. 전처리를 중단합니다.")
+    for path, missing in drift.items():
+        print(f"   - {path}: 누락 {missing}")
+    print("   python scripts/inspect_schema.py <retail|inventory> <파일> 로 상세 확인")
+    sys.exit(1)
+
+
+def sample_byte_ranges(
+    file_path: Path,
+    n_samples: int = DEFAULT_SAMPLES,
+    sample_bytes: int = DEFAULT_SAMPLE_BYTES,
+    seed: Optional[int] = None,
+) -> bytes:
+    """
+    헤더 + 무작위 바이트 구간에서 잘린 앞/뒤 줄을 버린 완전한 줄들만 모아서 반환
+    파일이 샘플 총량보다 작으면 파일 전체를 읽음
+    """
+    file_size = file_path.stat().st_size
+    rng = random.Random(seed)
+
+    with open(file_path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        data_size = file_size - data_start
+
+        if data_size <= n_samples * sample_bytes:
+            return header + f.read()
+
+        # 구간 시작 위치를 정렬해서 순차 seek
+        offsets = sorted(rng.randrange(data_start, file_size - sample_bytes) for _ in range(n_samples))
+        blocks = [header]
+        for offset in offsets:
+            f.seek(offset)
+            block = f.read(sample_bytes)
+            # 첫 줄은 중간부터 시작할 수 있으므로 버림 (data_start에서 시작한 경우 제외)
+            if offset != data_start:
+                block = block[block.find(b"\n") + 1:]
+            # 마지막 줄은 잘렸을 수 있으므로 버림
+            block = block[:block.rfind(b"\n") + 1]
+            blocks.append(block)
+
+    return b"".join(blocks)
+
+
+def infer_dtype(series: pd.Series) -> str:
+    """샘플 값으로 dtype 추론 (int64 / float64 / str / empty)"""
+    values = series.dropna()
+    if values.empty:
+        return "empty"
+    numeric = pd.to_numeric(values.str.replace(",", ""), errors="coerce")
+    if numeric.notna().all():
+        return "int64" if (numeric % 1 == 0).all() else "float64"
+    return "str"
+
+
+def estimate_cardinality(series: pd.Series) -> int:
+    """
+    샘플 빈도로 전체 고유값 수 근사 (Chao1 추정량)
+    S = 관측 고유값 + f1^2 / (2 * f2), f1/f2 = 샘플에서 1회/2회 등장한 값 수
+    """
+    counts = series.dropna().value_counts()
+    observed = len(counts)
+    f1 = int((counts == 1).sum())
+    f2 = int((counts == 2).sum())
+    if f1 == 0:
+        return observed
+    if f2 == 0:
+        return observed + f1 * (f1 - 1) // 2
+    return observed + round(f1 * f1 / (2 * f2))
+
+
+def inspect_file(
+    file_path: Path,
+    dataset: str,
+    n_samples: int = DEFAULT_SAMPLES,
+    sample_bytes: int = DEFAULT_SAMPLE_BYTES,
+    seed: Optional[int] = None,
+) -> Dict:
+    """샘플 기반 스키마 리포트 생성"""
+    schema = DATASET_SCHEMAS[dataset]
+    required = schema["columns"]
+    amount_col = schema["amount_column"]
+
+    header = read_header(file_path, schema["encoding"])
+    missing = [col for col in required if col not in header]
+
+    raw = sample_byte_ranges(file_path, n_samples, sample_bytes, seed)
+    df = pd.read_csv(io.BytesIO(raw), encoding=schema["encoding"], dtype=str, on_bad_lines="skip")
+
+    report = {
+        "file": str(file_path),
+        "dataset": dataset,
+        "fileBytes": file_path.stat().st_size,
+        "sampledBytes": len(raw),
+        "sampledRows": len(df),
+        "columnCount": len(header),
+        "positions": {col: (header.index(col) if col in header else None) for col in required},
+        "missingColumns": missing,
+        "dtypes": {col: infer_dtype(df[col]) for col in required if col in df.columns},
+        "cardinality": {},
+        "operationGroups": {},
+        "unexpectedCategories": [],
+        "errors": [],
+    }
+
+    if missing:
+        report["errors"].append(f"필수 컬럼 누락: {missing}")
+    if amount_col in report["dtypes"] and report["dtypes"][amount_col] not in ("int64", "float64"):
+        report["errors"].append(f"금액 컬럼이 숫자가 아님: {amount_col} ({report['dtypes'][amount_col]})")
+    if missing:
+        return report
+
+    for col in DIMENSION_COLUMNS:
+        report["cardinality"][col] = {
+            "sampleDistinct": int(df[col].nunique()),
+            "estimated": estimate_cardinality(df[col]),
+        }
+
+    # 브랜드 / 대분류 필터 후 주력/아울렛 비율과 예상치 못한 중분류
+    target = df[df["产品品牌"].isin(VALID_BRANDS) & (df["产品大分类"] == TARGET_CATEGORY)]
+    if not target.empty:
+        op_group = [determine_operation_group(op, season) for op, season in zip(target["运营基准"], target["产品季节"])]
+        amount = pd.to_numeric(target[amount_col].str.replace(",", ""), errors="coerce").fillna(0.0)
+        by_group = amount.groupby(pd.Series(op_group, index=target.index)).agg(["count", "sum"])
+        total_amount = by_group["sum"].sum()
+        for group, row in by_group.iterrows():
+            report["operationGroups"][group] = {
+                "rows": int(row["count"]),
+                "amountShare": round(row["sum"] / total_amount, 4) if total_amount else 0.0,
+            }
+        mid_categories = set(target["产品中分类"].dropna().unique())
+        report["unexpectedCategories"] = sorted(mid_categories - VALID_ITEM_CATEGORIES)
+
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print("=" * 60)
+    print(f"스키마 점검: {report['file']} ({report['dataset']})")
+    print("=" * 60)
+    print(f"파일 크기: {report['fileBytes']:,} bytes / 샘플: {report['sampledBytes']:,} bytes, {report['sampledRows']:,} rows")
+    print(f"컬럼 수: {report['columnCount']}")
+
+    print("\n[컬럼 위치 / dtype]")
+    for col, pos in report["positions"].items():
+        dtype = report["dtypes"].get(col, "-")
+        print(f"  {'MISSING' if pos is None else pos:>7}  {col}  ({dtype})")
+
+    if report["cardinality"]:
+        print("\n[차원 컬럼 카디널리티 (샘플 / 추정)]")
+        for col, card in report["cardinality"].items():
+            print(f"  {col}: {card['sampleDistinct']:,} / ~{card['estimated']:,}")
+
+    if report["operationGroups"]:
+        print(f"\n[주력/아울렛 비율 ({TARGET_CATEGORY}, 대상 브랜드)]")
+        for group, stat in sorted(report["operationGroups"].items()):
+            print(f"  {group}: {stat['rows']:,} rows, 금액 비중 {stat['amountShare']:.1%}")
+
+    if report["unexpectedCategories"]:
+        print(f"\n[WARNING] 예상치 못한 중분류: {report['unexpectedCategories']}")
+
+    for error in report["errors"]:
+        print(f"\n[ERROR] {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="원천 CSV 스키마 점검")
+    parser.add_argument("dataset", choices=sorted(DATASET_SCHEMAS))
+    parser.add_argument("files", nargs="+", type=Path)
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument("--sample-bytes", type=int, default=DEFAULT_SAMPLE_BYTES)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    failed = False
+    for file_path in args.files:
+        if not file_path.exists():
+            print(f"[ERROR] 파일 없음: {file_path}")
+            failed = True
+            continue
+        report = inspect_file(file_path, args.dataset, args.samples, args.sample_bytes, args.seed)
+        print_report(report)
+        failed = failed or bool(report["errors"])
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+예상 기말재고 타임라인 (재고 실적 + 입고(실제/예정) + 판매 예상 조인)
+- 재고자산 / 입고예정 / 실제입고 / 판매매출 결과 JSON을 공통 월 축 1개로 맞춘 뒤
+  (브랜드, 아이템탭, 월) 배열로 계산
+    실적 구간: 기말재고 = 전체_core + 전체_outlet
+    예상 구간: 기말재고 = 최근 실적 기말재고 + 누적(입고 - 예상 판매), 0 미만 방지
+- 예상 판매는 전년 동월 × 성장률 (src/lib/forecast.ts 와 동일), 입고는 실제입고가 있으면 실제, 없으면 입고예정
+- 음수 방지가 있는 누적은 누적합 + 누적 최소값으로 계산 (월 반복 없음)
+- 결과: public/data/{prefix}_inventory_timeline.json
+
+사용법:
+    python scripts/inventory_timeline.py [--growth-rate 105]
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from derived_metrics import month_calendar, shift_month
+from output_layout import LAYOUTS, load_summary, open_summary
+from preprocess_common import CATEGORY_ITEM_TABS, TARGET_CATEGORY, output_prefix, write_atomic
+from preprocess_forecast_inventory import to_full_year_month
+from rollup import BRAND_TOTAL
+
+# ========== 설정 ==========
+OUTPUT_PATH = Path(__file__).parent.parent / "public" / "data"
+FORECAST_INVENTORY_FILE = "accessory_forecast_inventory_summary.json"
+ACTUAL_ARRIVAL_FILE = "accessory_actual_arrival_summary.json"
+
+GROWTH_RATE = 105  # 화면 성장률 기본값 (%)
+FORECAST_MONTHS_COUNT = 6  # 실적 이후 예상 개월 수
+
+TIMELINE_FIELDS = [
+    "closingActual",     # 실적 기말재고
+    "arrivalActual",     # 실제입고
+    "arrivalForecast",   # 입고예정
+    "salesActual",       # 판매 실적
+    "salesForecast",     # 예상 판매 (전년 동월 × 성장률)
+    "closingProjected",  # 실적 + 예상 기말재고
+]
+
+
+def month_total(fields: Optional[Dict]) -> float:
+    """실적 월 전체 = 전체_core + 전체_outlet"""
+    if not fields:
+        return 0.0
+    return float(fields.get("전체_core", 0) or 0) + float(fields.get("전체_outlet", 0) or 0)
+
+
+def full_month(month: str) -> str:
+    """입고예정 원본 월 이름("25.12")도 "2025.12" 형식으로"""
+    return to_full_year_month(month) if len(month) == 5 else month
+
+
+def project_closing(start: np.ndarray, net_flow: np.ndarray) -> np.ndarray:
+    """
+    월별 기말재고 = max(전월 기말재고 + 순유입, 0) 을 마지막 축 기준으로 한 번에 계산
+    start: 시작 기말재고 (net_flow 마지막 축을 뺀 모양), net_flow: 월별 (입고 - 판매)
+
+    누적합 S 에 대해 기말재고[t] = S[t] + max(start, -min(S[0..t]))
+    (0에서 멈춘 만큼 이후 월을 끌어올리는 것과 같음)
+    """
+    cumulative = np.cumsum(net_flow, axis=-1)
+    floor = np.maximum(start[..., None], -np.minimum.accumulate(cumulative, axis=-1))
+    return cumulative + floor
+
+
+def _load_json(path: Path) -> Dict:
+    if not path.exists():
+        print(f"[WARNING] 파일이 존재하지 않습니다 (0으로 계산): {path}")
+        return {"brands": {}, "months": []}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    # 월 키 형식 통일
+    data["brands"] = {
+        brand: {full_month(month): items for month, items in by_month.items()}
+        for brand, by_month in data.get("brands", {}).items()
+    }
+    data["months"] = sorted(full_month(month) for month in data.get("months", []))
+    return data
+
+
+def load_inputs(category: str, output_path: Path, layout: str) -> Dict:
+    """판매 / 재고 summary (Arrow 산출물이 맞으면 산출물, 아니면 JSON) + 입고예정 / 실제입고 JSON"""
+    inputs = {}
+    for dataset in ("sales", "inventory"):
+        store = open_summary(output_path, category, dataset, layout)
+        if not store.exists():
+            raise FileNotFoundError(f"{category}: 전처리 결과가 없습니다 ({store.path})")
+        inputs[dataset] = load_summary(store)
+    inputs["forecast"] = _load_json(output_path / FORECAST_INVENTORY_FILE)
+    inputs["arrival"] = _load_json(output_path / ACTUAL_ARRIVAL_FILE)
+    return inputs
+
+
+def _arrival_array(data: Dict, brands: List[str], item_tabs: List[str], calendar: List[str]) -> np.ndarray:
+    """입고 JSON(브랜드 → 월 → 아이템) → (브랜드, 아이템탭, 월) 배열, 전체 탭은 아이템 합계 (없으면 NaN)"""
+    position = {month: i for i, month in enumerate(calendar)}
+    components = [tab for tab in item_tabs if tab != "전체"]
+    values = np.full((len(brands), len(item_tabs), len(calendar)), np.nan)
+    for b, brand in enumerate(brands):
+        for month, items in data["brands"].get(brand, {}).items():
+            if month not in position:
+                continue
+            for t, tab in enumerate(item_tabs):
+                keys = components if tab == "전체" else [tab]
+                values[b, t, position[month]] = sum(float(items.get(key, 0) or 0) for key in keys)
+    return values
+
+
+def _summary_array(summary: Dict, brands: List[str], item_tabs: List[str], calendar: List[str]) -> np.ndarray:
+    """summary JSON → (브랜드, 아이템탭, 월) 전체 금액 배열 (없는 월은 NaN)"""
+    values = np.full((len(brands), len(item_tabs), len(calendar)), np.nan)
+    for b, brand in enumerate(brands):
+        tabs = summary["brands"].get(brand, {})
+        for t, tab in enumerate(item_tabs):
+            by_month = tabs.get(tab, {})
+            for m, month in enumerate(calendar):
+                if month in by_month:
+                    values[b, t, m] = month_total(by_month[month])
+    return values
+
+
+def build_timeline(inputs: Dict, brands: List[str], item_tabs: List[str], growth_rate: float = GROWTH_RATE) -> Dict:
+    """
+    Returns: {"months", "forecastFrom", "fields": {필드: (브랜드, 아이템탭, 월) 배열}}
+    """
+    sales, inventory = inputs["sales"], inputs["inventory"]
+    inventory_latest = max(inventory["months"])
+    horizon = shift_month(inventory_latest, FORECAST_MONTHS_COUNT)
+    all_months = (
+        list(inventory["months"]) + list(sales["months"])
+        + inputs["forecast"]["months"] + inputs["arrival"]["months"] + [horizon]
+    )
+    calendar = month_calendar(min(all_months), max(all_months))
+    month_index = np.arange(len(calendar))
+    forecast_start = calendar.index(shift_month(inventory_latest, 1))
+
+    closing_actual = _summary_array(inventory, brands, item_tabs, calendar)
+    sales_actual = _summary_array(sales, brands, item_tabs, calendar)
+    arrival_actual = _arrival_array(inputs["arrival"], brands, item_tabs, calendar)
+    arrival_forecast = _arrival_array(inputs["forecast"], brands, item_tabs, calendar)
+
+    # 예상 판매: 탭별 마지막 판매 실적 월 이후 FORECAST_MONTHS_COUNT 개월, 전년 동월 × 성장률
+    has_sales = ~np.isnan(sales_actual)
+    latest_sales = np.where(has_sales, month_index, -1).max(axis=-1, keepdims=True)
+    prev_year = np.full_like(sales_actual, np.nan)
+    prev_year[..., 12:] = sales_actual[..., :-12]
+    in_forecast = (month_index > latest_sales) & (month_index <= latest_sales + FORECAST_MONTHS_COUNT) & (latest_sales >= 0)
+    sales_forecast = np.where(in_forecast, np.floor(np.nan_to_num(prev_year) * growth_rate / 100 + 0.5), np.nan)
+
+    # 예상 구간 순유입 = 입고(실제 우선, 없으면 예정) - 판매(실적 우선, 없으면 예상)
+    window = slice(forecast_start, forecast_start + FORECAST_MONTHS_COUNT)
+    arrival = np.where(np.isnan(arrival_actual), np.nan_to_num(arrival_forecast), arrival_actual)
+    outflow = np.where(has_sales, sales_actual, np.nan_to_num(sales_forecast))
+    net_flow = arrival[..., window] - outflow[..., window]
+
+    start = closing_actual[..., forecast_start - 1]
+    closing_projected = closing_actual.copy()
+    projected = project_closing(np.nan_to_num(start), net_flow)
+    closing_projected[..., window] = np.where(np.isnan(start)[..., None], np.nan, projected)
+
+    return {
+        "months": calendar,
+        "forecastFrom": calendar[forecast_start],
+        "fields": {
+            "closingActual": closing_actual,
+            "arrivalActual": arrival_actual,
+            "arrivalForecast": arrival_forecast,
+            "salesActual": sales_actual,
+            "salesForecast": sales_forecast,
+            "closingProjected": closing_projected,
+        },
+    }
+
+
+def timeline_file(output_path: Path, category: str) -> Path:
+    return output_path / f"{output_prefix(category)}_inventory_timeline.json"
+
+
+def write_timeline(
+    category: str = TARGET_CATEGORY,
+    output_path: Path = OUTPUT_PATH,
+    layout: str = "single",
+    growth_rate: float = GROWTH_RATE
+) -> Path:
+    """
+    타임라인 파일 저장
+    파일 구조: {"months", "forecastFrom", "growthRate", "fields", "brands": {브랜드: {아이템탭: {필드: [월별 값, 없으면 null]}}}}
+    """
+    inputs = load_inputs(category, output_path, layout)
+    brands = [brand for brand in inputs["inventory"]["brands"] if brand != BRAND_TOTAL]
+    item_tabs = ["전체"] + CATEGORY_ITEM_TABS.get(category, [])
+    timeline = build_timeline(inputs, brands, item_tabs, growth_rate)
+
+    series = {
+        brand: {
+            tab: {
+                field: [None if np.isnan(v) else round(float(v), 2) for v in timeline["fields"][field][b, t]]
+                for field in TIMELINE_FIELDS
+            }
+            for t, tab in enumerate(item_tabs)
+        }
+        for b, brand in enumerate(brands)
+    }
+    payload = {
+        "months": timeline["months"],
+        "forecastFrom": timeline["forecastFrom"],
+        "growthRate": growth_rate,
+        "fields": TIMELINE_FIELDS,
+        "brands": series,
+    }
+    target_file = timeline_file(output_path, category)
+    write_atomic(target_file, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    print(f"[DONE] 예상 기말재고 타임라인 저장: {target_file} ({timeline['months'][0]} ~ {timeline['months'][-1]}, 예상 {timeline['forecastFrom']}~)")
+    return target_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="재고 실적 + 입고 + 판매 예상 → 예상 기말재고 타임라인")
+    parser.add_argument("--category", default=TARGET_CATEGORY)
+    parser.add_argument("--layout", choices=LAYOUTS, default="single", help="전처리 결과 저장 방식")
+    parser.add_argument("--growth-rate", type=float, default=GROWTH_RATE, help="예상 판매 성장률 (%%)")
+    args = parser.parse_args()
+
+    write_timeline(args.category, layout=args.layout, growth_rate=args.growth_rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+바이트 단위 줄 사전 필터 (CSV 파싱 전 단계, --backend prefilter)
+- 원천 CSV를 바이트 블록으로 읽어서 통과할 수 없는 줄을 pd.read_csv 토큰화 전에 버림
+    기본 모드: 대분류(饰品) 바이트열과 유효 브랜드 바이트열을 모두 포함하는 줄만 통과
+    전체 대분류 모드: 유효 브랜드 바이트열을 포함하는 줄만 통과
+- 바이트열 포함 여부만 보므로 통과 줄은 상위집합 → 파싱 후 filter_chunk 정확 검사로 결과 동일
+- 헤더 줄은 그대로 통과, 블록 경계는 마지막 줄바꿈 기준 (잘린 줄은 다음 블록으로 이월)
+- 원천 추출에 따옴표 안 줄바꿈이 없다는 전제 (있으면 --backend pandas 사용)
+"""
+
+import codecs
+import io
+from pathlib import Path
+from typing import Dict, List
+
+from preprocess_common import TARGET_CATEGORY, VALID_BRANDS
+
+# ========== 설정 ==========
+BLOCK_BYTES = 16 * 1024 * 1024  # 원천 파일 읽기 블록 크기
+DENSE_RATIO = 0.15  # 첫 그룹 토큰이 줄 수 대비 이 비율보다 많으면 find 대신 split 후 검사 (find 는 찾은 줄마다 비용)
+
+
+def encode_tokens(values, encoding: str) -> List[bytes]:
+    """
+    문자열 → 파일 인코딩 바이트열 (utf-8-sig 등 BOM 제거)
+    다른 토큰을 부분 문자열로 포함하는 토큰은 뺌 (MLB KIDS ⊃ MLB → MLB만 찾으면 충분)
+    """
+    tokens = {value.encode(encoding).removeprefix(codecs.BOM_UTF8) for value in values}
+    return sorted(t for t in tokens if not any(o != t and o in t for o in tokens))
+
+
+def line_token_groups(all_categories: bool, encoding: str) -> List[List[bytes]]:
+    """통과 조건: 그룹마다 토큰 1개 이상 포함 (첫 그룹으로 후보 줄을 찾으므로 가장 드문 그룹을 앞에)"""
+    brands = encode_tokens(VALID_BRANDS, encoding)
+    if all_categories:
+        return [brands]
+    return [encode_tokens([TARGET_CATEGORY], encoding), brands]
+
+
+def filter_lines(block: bytes, groups: List[List[bytes]]) -> List[bytes]:
+    """
+    줄바꿈으로 끝나는 블록에서 통과 줄만 추출 (줄바꿈 제외)
+    첫 그룹 토큰이 드물면 bytes.find 로 위치를 찾아 해당 줄만 꺼내고, 흔하면 전체 줄을 나눠서 검사
+    나머지 그룹은 후보 줄에서만 검사
+    """
+    hits = sum(block.count(token) for token in groups[0])
+    if hits > DENSE_RATIO * block.count(b"\n"):
+        lines = block.split(b"\n")
+        lines.pop()
+        checks = groups
+    else:
+        spans: Dict[int, int] = {}
+        for token in groups[0]:
+            pos = block.find(token)
+            while pos != -1:
+                start = block.rfind(b"\n", 0, pos) + 1
+                end = block.find(b"\n", pos)
+                spans[start] = end
+                pos = block.find(token, end)
+        lines = [block[start:spans[start]] for start in sorted(spans)]
+        checks = groups[1:]
+    for group in checks:
+        lines = [line for line in lines if any(token in line for token in group)]
+    return lines
+
+
+class LinePrefilter(io.RawIOBase):
+    """pd.read_csv 에 넘기는 읽기 전용 바이너리 스트림 (헤더 + 통과 줄만)"""
+
+    def __init__(self, file_path: Path, encoding: str, all_categories: bool = False, block_bytes: int = BLOCK_BYTES):
+        super().__init__()
+        self.file_path = Path(file_path)
+        self.groups = line_token_groups(all_categories, encoding)
+        self.block_bytes = block_bytes
+        self.raw = open(file_path, "rb")
+        self.pending = self.raw.readline()  # 헤더
+        self.offset = 0
+        self.carry = b""
+        self.eof = False
+        self.lines_total = 0
+        self.lines_kept = 0
+        self.bytes_total = len(self.pending)
+        self.bytes_kept = len(self.pending)
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self) -> None:
+        """통과 줄이 나올 때까지 다음 블록 필터링"""
+        while not self.pending and not self.eof:
+            data = self.raw.read(self.block_bytes)
+            if data:
+                data = self.carry + data
+                cut = data.rfind(b"\n") + 1
+                block, self.carry = data[:cut], data[cut:]
+                if not block:
+                    continue
+            else:
+                self.eof = True
+                block, self.carry = self.carry, b""
+                if block and not block.endswith(b"\n"):
+                    block += b"\n"
+            lines = filter_lines(block, self.groups)
+            self.pending = b"\n".join(lines) + b"\n" if lines else b""
+            self.lines_total += block.count(b"\n")
+            self.lines_kept += len(lines)
+            self.bytes_total += len(block)
+            self.bytes_kept += len(self.pending)
+
+    def readinto(self, buffer) -> int:
+        if self.offset == len(self.pending):
+            self.pending, self.offset = b"", 0
+            self._fill()
+        size = min(len(buffer), len(self.pending) - self.offset)
+        buffer[:size] = self.pending[self.offset:self.offset + size]
+        self.offset += size
+        return size
+
+    def close(self) -> None:
+        self.raw.close()
+        super().close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "linesTotal": self.lines_total,
+            "linesSkipped": self.lines_total - self.lines_kept,
+            "bytesTotal": self.bytes_total,
+            "bytesSkipped": self.bytes_total - self.bytes_kept,
+        }
+
+    def report(self) -> Dict[str, int]:
+        """건너뛴 줄 수 / 바이트 출력 후 통계 반환"""
+        stats = self.stats()
+        print(
+            f"   사전 필터: {stats['linesSkipped']:,} / {stats['linesTotal']:,}줄 건너뜀, "
+            f"{stats['bytesSkipped'] / 1024 ** 2:,.1f} / {stats['bytesTotal'] / 1024 ** 2:,.1f} MB 파싱 생략"
+        )
+        return stats
@@ -0,0 +1,252 @@
+"""
+전처리 결과 JSON 저장 방식 (--layout)
+- single: 기존 방식, 데이터셋마다 {prefix}_{dataset}_summary.json 파일 1개
+- monthly: 데이터셋마다 폴더 1개에 월별 파일 + 월 목록 인덱스
+    public/data/{prefix}_{dataset}_months/index.json
+    public/data/{prefix}_{dataset}_months/2025.11.json
+  월 병합/재작성 시 해당 월 파일과 인덱스만 다시 씀 (전체 이력 크기와 무관)
+  프론트엔드는 index.json을 읽고 차트에 필요한 월 파일만 가져가면 됨
+- 두 방식 모두 임시 파일 → os.replace 로 원자적 쓰기
+- feed(change_feed.ChangeFeed)를 넘기면 쓰기 전 이전 값과 비교해서 바뀐 셀을 기록
+- 쓸 때마다 같은 값을 Arrow 산출물로도 씀 (stage_artifacts, 다음 단계는 load_summary 로 JSON 대신 memory map 으로 읽음)
+
+월 파일 구조:   {"month": "2025.11", "brands": {브랜드: {아이템탭: 필드}}}
+인덱스 구조:    {"months", "files", "etags", "itemTabs", "unexpectedCategories", "monthMeta": {"daysInMonth"}}
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from preprocess_common import output_prefix, write_atomic
+from stage_artifacts import is_current, merge_summary_artifact, read_summary, write_summary_artifact
+
+# ========== 설정 ==========
+LAYOUTS = ["single", "monthly"]
+INDEX_FILE = "index.json"
+
+# (브랜드 → 아이템탭 → 필드) 월 1개 분량
+MonthBrands = Dict[str, Dict[str, Dict]]
+
+
+def _dump(data: Dict, indent: Optional[int] = 2) -> bytes:
+    return json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")
+
+
+def _as_summary(month_brands: Dict[str, MonthBrands]) -> Dict:
+    """{월: 브랜드 → 아이템탭 → 필드} → summary 구조 (변경 비교용)"""
+    brands: Dict = {}
+    for month, by_brand in month_brands.items():
+        for brand, tabs in by_brand.items():
+            for item_tab, fields in tabs.items():
+                brands.setdefault(brand, {}).setdefault(item_tab, {})[month] = fields
+    return {"brands": brands, "months": sorted(month_brands)}
+
+
+def summary_file(output_path: Path, category: str, dataset: str) -> Path:
+    return output_path / f"{output_prefix(category)}_{dataset}_summary.json"
+
+
+def partition_dir(output_path: Path, category: str, dataset: str) -> Path:
+    return output_path / f"{output_prefix(category)}_{dataset}_months"
+
+
+class SingleFileSummary:
+    """기존 단일 JSON 파일"""
+
+    def __init__(self, output_path: Path, category: str, dataset: str):
+        self.category, self.dataset = category, dataset
+        self.path = summary_file(output_path, category, dataset)
+        self.source = self.path  # Arrow 산출물의 원본 식별 기준
+        self._data: Optional[Dict] = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _load(self) -> Dict:
+        if self._data is None:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+        return self._data
+
+    def item_tabs(self) -> Dict[str, Set[str]]:
+        return {brand: set(tabs) for brand, tabs in self._load()["brands"].items()}
+
+    def read(self, months: Optional[List[str]] = None) -> Dict:
+        data = self._load()
+        if months is None:
+            return data
+        wanted = set(months)
+        return {
+            **data,
+            "brands": {
+                brand: {tab: {m: v for m, v in by_month.items() if m in wanted} for tab, by_month in tabs.items()}
+                for brand, tabs in data["brands"].items()
+            },
+            "months": [m for m in data["months"] if m in wanted],
+        }
+
+    def write(self, summary: Dict, feed=None) -> None:
+        if feed is not None:
+            feed.record(self.category, self.dataset, self._load() if self.exists() else None, summary)
+        write_atomic(self.path, _dump(summary))
+        self._data = summary
+        write_summary_artifact(self.category, self.dataset, summary, self.source)
+
+    def merge_months(
+        self,
+        month_brands: Dict[str, MonthBrands],
+        month_meta: Optional[Dict[str, Dict]] = None,
+        feed=None
+    ) -> None:
+        """기존 파일 전체를 읽어서 해당 월만 바꾼 뒤 전체를 다시 씀"""
+        data = self._load()
+        if feed is not None:
+            months = sorted(month_brands)
+            feed.record(self.category, self.dataset, self.read(months), _as_summary(month_brands), months)
+        for month, brands in month_brands.items():
+            for brand, tabs in brands.items():
+                brand_data = data["brands"].setdefault(brand, {})
+                for item_tab, fields in tabs.items():
+                    brand_data.setdefault(item_tab, {})[month] = fields
+        for key, values in (month_meta or {}).items():
+            data.setdefault(key, {}).update(values)
+        data["months"] = sorted(set(data["months"]) | set(month_brands))
+        self.write(data)
+
+
+class MonthlySummary:
+    """월별 파일 + 인덱스"""
+
+    def __init__(self, output_path: Path, category: str, dataset: str):
+        self.category, self.dataset = category, dataset
+        self.path = partition_dir(output_path, category, dataset)
+        self.index_path = self.path / INDEX_FILE
+        self.source = self.index_path  # Arrow 산출물의 원본 식별 기준
+        self._index: Optional[Dict] = None
+
+    def exists(self) -> bool:
+        return self.index_path.exists()
+
+    def _load_index(self) -> Dict:
+        if self._index is None:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+        return self._index
+
+    def item_tabs(self) -> Dict[str, Set[str]]:
+        return {brand: set(tabs) for brand, tabs in self._load_index()["itemTabs"].items()}
+
+    def read_month(self, month: str) -> MonthBrands:
+        file_name = self._load_index()["files"][month]
+        with open(self.path / file_name, "r", encoding="utf-8") as f:
+            return json.load(f)["brands"]
+
+    def read(self, months: Optional[List[str]] = None) -> Dict:
+        """월 파일을 모아서 단일 파일과 같은 구조로 반환 (months 지정 시 해당 월만 읽음)"""
+        index = self._load_index()
+        wanted = [m for m in index["months"] if months is None or m in set(months)]
+        summary: Dict = {"brands": {}, "unexpectedCategories": index["unexpectedCategories"], "months": wanted}
+        for key, values in index.get("monthMeta", {}).items():
+            summary[key] = {m: v for m, v in values.items() if m in wanted}
+        for month in wanted:
+            for brand, tabs in self.read_month(month).items():
+                for item_tab, fields in tabs.items():
+                    summary["brands"].setdefault(brand, {}).setdefault(item_tab, {})[month] = fields
+        return summary
+
+    def _write_month(self, month: str, brands: MonthBrands) -> str:
+        """월 파일 1개 쓰기 → etag 반환"""
+        data = _dump({"month": month, "brands": brands})
+        write_atomic(self.path / f"{month}.json", data)
+        return hashlib.sha1(data).hexdigest()[:12]
+
+    def _write_index(self, index: Dict) -> None:
+        write_atomic(self.index_path, _dump(index))
+        self._index = index
+
+    def write(self, summary: Dict, feed=None) -> None:
+        """단일 파일 구조 → 전체 월 파일 + 인덱스"""
+        if feed is not None:
+            feed.record(self.category, self.dataset, self.read() if self.exists() else None, summary)
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_keys = [key for key in summary if key not in ("brands", "months", "unexpectedCategories")]
+        index = {
+            "months": [],
+            "files": {},
+            "etags": {},
+            "itemTabs": {brand: list(tabs) for brand, tabs in summary["brands"].items()},
+            "unexpectedCategories": summary.get("unexpectedCategories", []),
+            "monthMeta": {key: {} for key in meta_keys},
+        }
+        for month in summary["months"]:
+            brands = {
+                brand: {tab: by_month[month] for tab, by_month in tabs.items() if month in by_month}
+                for brand, tabs in summary["brands"].items()
+            }
+            index["etags"][month] = self._write_month(month, brands)
+            index["files"][month] = f"{month}.json"
+            for key in meta_keys:
+                if month in summary[key]:
+                    index["monthMeta"][key][month] = summary[key][month]
+        index["months"] = sorted(index["files"])
+        # 이전 실행에만 있던 월 파일 정리
+        for stale in self.path.glob("*.json"):
+            if stale.name != INDEX_FILE and stale.stem not in index["files"]:
+                stale.unlink()
+        self._write_index(index)
+        write_summary_artifact(self.category, self.dataset, summary, self.source)
+
+    def merge_months(
+        self,
+        month_brands: Dict[str, MonthBrands],
+        month_meta: Optional[Dict[str, Dict]] = None,
+        feed=None
+    ) -> None:
+        """해당 월 파일만 쓰고 인덱스 갱신 (다른 월 파일은 읽지도 않음)"""
+        index = self._load_index()
+        artifact_current = is_current(self.category, self.dataset, self.source)
+        if feed is not None:
+            months = sorted(month_brands)
+            feed.record(self.category, self.dataset, self.read(months), _as_summary(month_brands), months)
+        for month, brands in month_brands.items():
+            index["etags"][month] = self._write_month(month, brands)
+            index["files"][month] = f"{month}.json"
+            for brand, tabs in brands.items():
+                known = index["itemTabs"].setdefault(brand, [])
+                known.extend(tab for tab in tabs if tab not in known)
+        for key, values in (month_meta or {}).items():
+            index.setdefault("monthMeta", {}).setdefault(key, {}).update(values)
+        index["months"] = sorted(index["files"])
+        self._write_index(index)
+        merge_summary_artifact(
+            self.category, self.dataset, month_brands, month_meta, self.source, artifact_current, self.read
+        )
+
+
+def open_summary(output_path: Path, category: str, dataset: str, layout: str = "single"):
+    """layout에 맞는 저장소 객체 (single / monthly)"""
+    if layout == "monthly":
+        return MonthlySummary(output_path, category, dataset)
+    return SingleFileSummary(output_path, category, dataset)
+
+
+def load_summary(store) -> Dict:
+    """전체 summary (Arrow 산출물이 JSON과 맞으면 산출물에서, 아니면 JSON 에서)"""
+    summary = read_summary(store.category, store.dataset, store.source)
+    return summary if summary is not None else store.read()
+
+
+def write_summary(
+    output_path: Path,
+    category: str,
+    dataset: str,
+    summary: Dict,
+    layout: str = "single",
+    feed=None
+) -> Path:
+    """전체 실행 결과 저장 → 저장 위치 반환"""
+    store = open_summary(output_path, category, dataset, layout)
+    store.write(summary, feed)
+    return store.path
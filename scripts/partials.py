@@ -0,0 +1,85 @@
+"""
+부분 집계(partial) 파일 포맷
+- 작업 단위(데이터셋 × 월) 1개의 리프 큐브 + 예상치 못한 중분류를 gzip JSON 1개로 저장
+- 금액은 리프 큐브와 같은 int64 최소 단위 정수 (format 2)
+- 병합은 리프 큐브 concat + 같은 키 합산 / 중분류 집합 합집합 → 순서·묶음과 관계없이 같은 결과 (결합법칙)
+- 여러 머신이 공유 드라이브에 쓴 partial을 마지막에 한 번에 병합 (scripts/work_queue.py)
+"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+import pandas as pd
+
+from preprocess_common import write_atomic
+from rollup import LEAF_DIMENSIONS, combine_leaves
+
+# ========== 설정 ==========
+PARTIAL_FORMAT_VERSION = 2
+PARTIAL_SUFFIX = ".partial.json.gz"
+
+Partial = Tuple[pd.DataFrame, Dict[str, Set[str]]]
+
+
+def partial_file_name(dataset: str, month: str) -> str:
+    """작업 단위별 partial 파일 이름 (예: retail_2025.11.partial.json.gz)"""
+    return f"{dataset}_{month}{PARTIAL_SUFFIX}"
+
+
+def write_partial(
+    path: Path,
+    dataset: str,
+    months: List[str],
+    leaf: pd.DataFrame,
+    unexpected: Dict[str, Set[str]],
+    all_categories: bool = False
+) -> None:
+    """리프 큐브 → partial 파일 (원자적 쓰기)"""
+    payload = {
+        "format": PARTIAL_FORMAT_VERSION,
+        "dataset": dataset,
+        "months": sorted(months),
+        "allCategories": all_categories,
+        "dimensions": LEAF_DIMENSIONS,
+        "columns": {dim: leaf[dim].tolist() for dim in LEAF_DIMENSIONS},
+        "amount": leaf["amount"].astype("int64").tolist(),
+        "unexpected": {category: sorted(items) for category, items in unexpected.items()},
+    }
+    data = gzip.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    write_atomic(path, data)
+
+
+def read_partial(path: Path) -> Dict:
+    """
+    partial 파일 읽기
+
+    Returns:
+        {"dataset", "months", "allCategories", "leaf": DataFrame, "unexpected": {대분류: set}}
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        payload = json.load(f)
+    if payload.get("format") != PARTIAL_FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 partial 포맷: {path} (format={payload.get('format')})")
+    if payload["dimensions"] != LEAF_DIMENSIONS:
+        raise ValueError(f"리프 차원이 다른 partial: {path} ({payload['dimensions']})")
+
+    leaf = pd.DataFrame(payload["columns"], columns=LEAF_DIMENSIONS)
+    leaf["amount"] = pd.Series(payload["amount"], dtype="int64")
+    return {
+        "dataset": payload["dataset"],
+        "months": payload["months"],
+        "allCategories": payload["allCategories"],
+        "leaf": leaf,
+        "unexpected": {category: set(items) for category, items in payload["unexpected"].items()},
+    }
+
+
+def merge_partials(partials: List[Partial]) -> Partial:
+    """(리프 큐브, 예상치 못한 중분류) 목록 병합 - 입력 순서와 무관"""
+    unexpected: Dict[str, Set[str]] = {}
+    for _, part_unexpected in partials:
+        for category, items in part_unexpected.items():
+            unexpected.setdefault(category, set()).update(items)
+    return combine_leaves([leaf for leaf, _ in partials]), unexpected
@@ -0,0 +1,361 @@
+"""
+전처리 파이프라인 실행기 (단계 의존 관계 DAG + 입력 지문 캐시)
+- 단계마다 스크립트, 인자, 선행 단계, 입력 파일, 출력 파일을 선언 (build_stages)
+    sales     → preprocess_sales.py            (판매/재고 CSV → 판매·재고 요약 JSON)
+    inventory → preprocess_inventory.py        (재고 CSV + 판매 요약 JSON의 OR 매출, sales 뒤에 실행)
+    forecast  → preprocess_forecast_inventory.py
+    arrival   → preprocess_actual_arrival.py
+    timeline / scenario_grid → 요약 JSON + 입고예정 + 실제 입고 JSON
+- 선행 단계가 끝난 단계는 동시에 실행 (--jobs), 단계 출력은 data/pipeline/logs/{단계}.log
+- 실행 직전에 입력 지문을 계산해서 직전 성공 실행과 같고 출력 파일이 모두 있으면 건너뜀
+    원천 CSV: 크기 + 수정 시각 (대용량이라 내용은 읽지 않음)
+    다른 단계의 출력 JSON: 내용 해시 (같은 내용으로 다시 써도 뒤 단계는 그대로 건너뜀)
+    스크립트: 단계 스크립트와 그 스크립트가 import 하는 scripts/ 모듈 내용 해시
+- 끝나면 단계별 소요 시간과 임계 경로 (가장 긴 의존 사슬) 출력
+
+사용법:
+    python scripts/pipeline.py                      # 바뀐 단계만 다시 실행
+    python scripts/pipeline.py timeline --jobs 2    # timeline 과 그 선행 단계만
+    python scripts/pipeline.py --dry-run            # 실행할 단계만 표시
+    python scripts/pipeline.py --force sales        # 캐시 무시
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from preprocess_common import TARGET_CATEGORY, output_prefix, write_atomic
+
+# ========== 설정 ==========
+SCRIPTS_PATH = Path(__file__).parent
+REPO_PATH = SCRIPTS_PATH.parent
+PIPELINE_PATH = REPO_PATH / "data" / "pipeline"
+CACHE_FILE = PIPELINE_PATH / "cache.json"
+LOG_PATH = PIPELINE_PATH / "logs"
+DEFAULT_JOBS = 3
+LOG_TAIL_LINES = 20  # 실패한 단계 로그에서 출력할 줄 수
+
+
+def build_stages(all_categories: bool = False) -> Dict[str, Dict]:
+    """
+    단계 선언 (각 스크립트의 설정 값으로 입력/출력 경로 결정)
+    outputs 항목은 glob 패턴 가능 (--all-categories 처럼 대분류 수를 미리 모를 때)
+    """
+    import preprocess_actual_arrival as arrival
+    import preprocess_forecast_inventory as forecast
+    import preprocess_inventory as inventory
+    import preprocess_sales as sales
+    from inventory_timeline import ACTUAL_ARRIVAL_FILE, FORECAST_INVENTORY_FILE, timeline_file
+    from scenario_grid import grid_file
+
+    category_args = ["--all-categories"] if all_categories else []
+    prefix = "*" if all_categories else output_prefix(TARGET_CATEGORY)
+    sales_json = sales.OUTPUT_PATH / f"{prefix}_sales_summary.json"
+    inventory_json = sales.OUTPUT_PATH / f"{prefix}_inventory_summary.json"
+    forecast_json = forecast.OUTPUT_PATH / FORECAST_INVENTORY_FILE
+    arrival_json = arrival.OUTPUT_PATH / ACTUAL_ARRIVAL_FILE
+    target_sales_json = sales.OUTPUT_PATH / f"{output_prefix(TARGET_CATEGORY)}_sales_summary.json"
+    target_inventory_json = sales.OUTPUT_PATH / f"{output_prefix(TARGET_CATEGORY)}_inventory_summary.json"
+
+    retail_csvs = [sales.RETAIL_DATA_PATH / f"{m}.csv" for m in sales.ANALYSIS_MONTHS]
+    inventory_csvs = [sales.INVENTORY_DATA_PATH / f"{m}.csv" for m in sales.ANALYSIS_MONTHS]
+    summary_inputs = [target_sales_json, target_inventory_json, forecast_json, arrival_json]
+
+    return {
+        "sales": {
+            "script": "preprocess_sales.py",
+            "args": category_args,
+            "deps": [],
+            "inputs": retail_csvs + inventory_csvs,
+            "outputs": [sales_json, inventory_json],
+        },
+        "inventory": {
+            "script": "preprocess_inventory.py",
+            "args": category_args,
+            "deps": ["sales"],  # load_sales_or_data 가 판매 요약 JSON의 OR 매출을 읽음
+            "inputs": [inventory.INVENTORY_DATA_PATH / f"{m}.csv" for m in inventory.ANALYSIS_MONTHS] + [sales_json],
+            "outputs": [inventory_json],
+        },
+        "forecast": {
+            "script": "preprocess_forecast_inventory.py",
+            "args": [],
+            "deps": [],
+            "inputs": [forecast.FORECAST_DATA_PATH / f"{m}.csv" for m in forecast.FORECAST_MONTH_FILES],
+            "outputs": [forecast_json],
+        },
+        "arrival": {
+            "script": "preprocess_actual_arrival.py",
+            "args": [],
+            "deps": [],
+            "inputs": [arrival.ACTUAL_ARRIVAL_DATA_PATH / f"{m}.csv" for m in arrival.ACTUAL_MONTH_FILES],
+            "outputs": [arrival_json],
+        },
+        "timeline": {
+            "script": "inventory_timeline.py",
+            "args": [],
+            "deps": ["inventory", "forecast", "arrival"],
+            "inputs": summary_inputs,
+            "outputs": [timeline_file(sales.OUTPUT_PATH, TARGET_CATEGORY)],
+        },
+        "scenario_grid": {
+            "script": "scenario_grid.py",
+            "args": [],
+            "deps": ["inventory", "forecast", "arrival"],
+            "inputs": summary_inputs,
+            "outputs": [grid_file(sales.OUTPUT_PATH, TARGET_CATEGORY)],
+        },
+    }
+
+
+def select_stages(stages: Dict[str, Dict], targets: Optional[List[str]]) -> List[str]:
+    """대상 단계 + 선행 단계 전체를 위상 순서로 (순환 의존이면 ValueError)"""
+    for name in targets or []:
+        if name not in stages:
+            raise ValueError(f"알 수 없는 단계: {name} (가능: {', '.join(stages)})")
+
+    order: List[str] = []
+    visiting: Set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"순환 의존: {name}")
+        visiting.add(name)
+        for dep in stages[name]["deps"]:
+            visit(dep)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in targets or list(stages):
+        visit(name)
+    return order
+
+
+def expand(paths: List[Path]) -> List[Path]:
+    """glob 패턴 항목은 실제 파일 목록으로 (없는 파일은 그대로 유지)"""
+    result = []
+    for path in paths:
+        if any(ch in path.name for ch in "*?["):
+            result.extend(sorted(path.parent.glob(path.name)))
+        else:
+            result.append(path)
+    return result
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: Path, by_content: bool) -> str:
+    """내용 해시 (by_content) 또는 크기:수정 시각, 없는 파일은 "missing" """
+    if not path.exists():
+        return "missing"
+    if by_content:
+        return _hash_file(path)
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def code_files(script: str) -> List[Path]:
+    """단계 스크립트 + 그 스크립트가 (간접적으로) import 하는 scripts/ 모듈"""
+    found: List[Path] = []
+    pending = [SCRIPTS_PATH / script]
+    while pending:
+        path = pending.pop()
+        if path in found or not path.exists():
+            continue
+        found.append(path)
+        for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            pending.extend(SCRIPTS_PATH / f"{name.split('.')[0]}.py" for name in names)
+    return sorted(found)
+
+
+def is_produced(path: Path, output_patterns: List[Path]) -> bool:
+    """다른 단계의 출력 파일인지 (출력 선언이 glob 패턴이어도 비교)"""
+    return any(path.parent == pattern.parent and fnmatch(path.name, pattern.name) for pattern in output_patterns)
+
+
+def stage_fingerprint(stage: Dict, output_patterns: List[Path]) -> str:
+    """인자 + 입력 파일 + 코드 지문 → 해시 (다른 단계 출력 파일은 내용 해시로 비교)"""
+    state = {
+        "args": stage["args"],
+        "inputs": {
+            str(path): file_fingerprint(path, is_produced(path, output_patterns))
+            for path in expand(stage["inputs"])
+        },
+        "code": {path.name: file_fingerprint(path, True) for path in code_files(stage["script"])},
+    }
+    return hashlib.sha1(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def outputs_exist(stage: Dict) -> bool:
+    for path in stage["outputs"]:
+        matched = expand([path])
+        if not matched or not all(p.exists() for p in matched):
+            return False
+    return True
+
+
+def load_cache() -> Dict:
+    if not CACHE_FILE.exists():
+        return {"stages": {}}
+    with open(CACHE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_cache(cache: Dict) -> None:
+    PIPELINE_PATH.mkdir(parents=True, exist_ok=True)
+    write_atomic(CACHE_FILE, json.dumps(cache, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def run_stage(name: str, stage: Dict) -> Dict:
+    """스크립트 1개 실행 (출력은 로그 파일로), 소요 시간 / 종료 코드 반환"""
+    LOG_PATH.mkdir(parents=True, exist_ok=True)
+    log_file = LOG_PATH / f"{name}.log"
+    command = [sys.executable, str(SCRIPTS_PATH / stage["script"])] + stage["args"]
+    start = time.perf_counter()
+    with open(log_file, "w", encoding="utf-8") as log:
+        returncode = subprocess.run(command, cwd=REPO_PATH, stdout=log, stderr=subprocess.STDOUT).returncode
+    return {"seconds": time.perf_counter() - start, "returncode": returncode, "log": log_file}
+
+
+def critical_path(stages: Dict[str, Dict], order: List[str], seconds: Dict[str, float]) -> List[str]:
+    """단계별 소요 시간 기준 가장 긴 의존 사슬 (건너뛴 단계는 0초)"""
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for name in order:
+        deps = [dep for dep in stages[name]["deps"] if dep in finish]
+        slowest = max(deps, key=finish.get, default=None)
+        previous[name] = slowest
+        finish[name] = (finish[slowest] if slowest else 0.0) + seconds.get(name, 0.0)
+    if not finish:
+        return []
+    path = [max(finish, key=finish.get)]
+    while previous[path[-1]]:
+        path.append(previous[path[-1]])
+    return path[::-1]
+
+
+def run_pipeline(
+    targets: Optional[List[str]] = None,
+    jobs: int = DEFAULT_JOBS,
+    force: bool = False,
+    dry_run: bool = False,
+    all_categories: bool = False
+) -> bool:
+    """DAG 실행 (성공하면 True)"""
+    stages = build_stages(all_categories)
+    order = select_stages(stages, targets)
+    output_patterns = [path for stage in stages.values() for path in stage["outputs"]]
+    cache = load_cache()
+    status: Dict[str, str] = {}
+    seconds: Dict[str, float] = {}
+
+    print("=" * 60)
+    print(f"파이프라인: {' → '.join(order)} (동시 실행 {jobs})")
+    print("=" * 60)
+
+    def decide(name: str) -> Optional[str]:
+        """실행하지 않을 이유 (None이면 실행)"""
+        stage = stages[name]
+        deps = [status[dep] for dep in stage["deps"]]
+        if any(state in ("failed", "blocked") for state in deps):
+            return "blocked"
+        if dry_run and any(state == "run" for state in deps):
+            return None
+        fingerprint = stage_fingerprint(stage, output_patterns)
+        stage["fingerprint"] = fingerprint
+        cached = cache["stages"].get(name, {})
+        if not force and cached.get("fingerprint") == fingerprint and outputs_exist(stage):
+            return "cached"
+        return None
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        running = {}
+        while len(status) < len(order):
+            for name in order:
+                if name in status or name in running.values():
+                    continue
+                if not all(dep in status for dep in stages[name]["deps"]):
+                    continue
+                reason = decide(name)
+                if reason:
+                    status[name] = reason
+                    print(f"[{name}] {'입력 변경 없음, 건너뜀' if reason == 'cached' else '선행 단계 실패로 건너뜀'}")
+                elif dry_run:
+                    status[name] = "run"
+                    print(f"[{name}] 실행 대상")
+                else:
+                    print(f"[{name}] 실행: {stages[name]['script']} {' '.join(stages[name]['args'])}".rstrip())
+                    running[executor.submit(run_stage, name, stages[name])] = name
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                result = future.result()
+                seconds[name] = result["seconds"]
+                if result["returncode"] == 0:
+                    status[name] = "done"
+                    cache["stages"][name] = {
+                        "fingerprint": stages[name]["fingerprint"],
+                        "seconds": round(result["seconds"], 2),
+                        "finishedAt": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    }
+                    save_cache(cache)
+                    print(f"[DONE] {name} ({result['seconds']:.1f}초)")
+                else:
+                    status[name] = "failed"
+                    print(f"[ERROR] {name} 실패 (종료코드 {result['returncode']}), 로그: {result['log']}")
+                    lines = result["log"].read_text(encoding="utf-8", errors="replace").splitlines()
+                    for line in lines[-LOG_TAIL_LINES:]:
+                        print(f"   {line}")
+    wall = time.perf_counter() - wall_start
+
+    print()
+    print("=" * 60)
+    print("단계별 결과")
+    print("=" * 60)
+    for name in order:
+        print(f"  {name:<15} {status[name]:<8} {seconds.get(name, 0.0):8.1f}초")
+    if not dry_run and not seconds:
+        print("실행한 단계 없음 (모든 단계 입력 변경 없음)")
+    elif not dry_run:
+        path = critical_path(stages, order, seconds)
+        path_seconds = sum(seconds.get(name, 0.0) for name in path)
+        print(f"임계 경로: {' → '.join(path)} ({path_seconds:.1f}초)")
+        print(f"전체 {wall:.1f}초 / 단계 합계 {sum(seconds.values()):.1f}초")
+    return not any(state in ("failed", "blocked") for state in status.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="전처리 파이프라인 (의존 관계 + 변경된 단계만 실행)")
+    parser.add_argument("targets", nargs="*", help="실행할 단계 (선행 단계 포함, 기본 전체)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="동시에 실행할 단계 수")
+    parser.add_argument("--force", action="store_true", help="입력 지문 캐시 무시")
+    parser.add_argument("--dry-run", action="store_true", help="실행할 단계만 표시")
+    parser.add_argument("--all-categories", action="store_true", help="판매/재고 단계를 모든 대분류로 실행")
+    args = parser.parse_args()
+    ok = run_pipeline(args.targets or None, args.jobs, args.force, args.dry_run, args.all_categories)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,212 @@
+"""
+판매/재고 전처리 공통 설정 및 함수
+- 브랜드 / 대분류 / 중분류 설정
+- 대분류별 출력 네임스페이스 (전체 대분류 모드)
+- operation_group 판단, 청크 필터
+- 금액 고정소수점 단위 (리프 큐브 / partial / 블록 / 관리 합계는 int64 최소 단위로 합산, 게시할 때만 원 단위 반올림)
+- 원자적 파일 쓰기 (공유 드라이브에서 읽는 쪽이 쓰다 만 파일을 보지 않도록)
+"""
+
+import calendar
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+# ========== 설정 ==========
+# 브랜드 필터 (BRAND_ORDER: JSON 출력 순서, set 순회 순서는 PYTHONHASHSEED 에 따라 실행마다 달라짐)
+BRAND_ORDER = ["MLB", "MLB KIDS", "DISCOVERY"]
+VALID_BRANDS = set(BRAND_ORDER)
+
+# 대분류 필터 (기본 모드)
+TARGET_CATEGORY = "饰品"
+
+# 정상 중분류 값 (기본 대분류)
+VALID_ITEM_CATEGORIES = {"Shoes", "Headwear", "Bag", "Acc_etc"}
+
+# 시즌 문자열 (operation_group 판단용)
+CORE_SEASONS = ["24FW", "25SS", "25FW", "26SS"]
+
+# 판매 / 재고 원천 CSV 사용 컬럼 (전처리 usecols, inspect_schema 필수 컬럼)
+RETAIL_COLUMNS = [
+    "Channel 2",
+    "产品品牌",
+    "产品大分类",
+    "产品中分类",
+    "运营基准",
+    "产品季节",
+    "吊牌金额"
+]
+INVENTORY_COLUMNS = [
+    "Channel 2",
+    "产品品牌",
+    "产品大分类",
+    "产品中分类",
+    "运营基准",
+    "产品季节",
+    "预计库存金额"
+]
+
+# SKU 컬럼 (원천 CSV 컬럼 → 웨어하우스 컬럼 이름, SKU 단위 집계용)
+# 원천 추출 양식이 바뀌면 여기만 수정
+SKU_COLUMNS: Dict[str, str] = {
+    "产品代码": "prdt_cd",
+    "颜色": "color_cd",
+    "尺码": "size_cd",
+}
+SALES_QTY_COLUMN = "销售数量"
+STOCK_QTY_COLUMN = "预计库存数量"
+STORE_COLUMN = "门店代码"
+
+# 금액 최소 단위 (원천 금액 × AMOUNT_SCALE 을 int64 로 반올림해서 합산)
+# 정수 합은 청크 / 프로세스 / 병합 순서와 관계없이 같으므로 직렬·병렬·증분 실행 결과가 바이트 단위로 같음
+AMOUNT_SCALE = 100
+
+# 대분류별 아이템 탭 (전체 제외, 출력 순서대로)
+# 여기 없는 대분류는 관측된 중분류를 모두 아이템 탭으로 사용
+CATEGORY_ITEM_TABS: Dict[str, List[str]] = {
+    "饰品": ["Shoes", "Headwear", "Bag", "Acc_etc"],
+}
+
+# 대분류별 출력 파일 접두어 (public/data/{prefix}_sales_summary.json)
+CATEGORY_OUTPUT_PREFIX: Dict[str, str] = {
+    "饰品": "accessory",
+}
+
+
+def determine_operation_group(op_basis: str, season: str) -> str:
+    """
+    운영기준(运营基准)과 제품시즌(产品季节)을 기반으로 operation_group 결정
+
+    주력(core):
+    - 运营基准이 "INTRO" 또는 "FOCUS"
+    - 또는 运营基准이 빈값이고, 产品季节에 24FW/25SS/25FW/26SS 포함
+
+    아울렛(outlet):
+    - 그 외 모두
+    """
+    op_basis = str(op_basis).strip() if pd.notna(op_basis) else ""
+    season = str(season).strip() if pd.notna(season) else ""
+
+    # 运营基准이 INTRO, FOCUS, 26SS이면 주력
+    if op_basis in ["INTRO", "FOCUS", "26SS"]:
+        return "core"
+
+    # 运营基准이 빈값이고 시즌 문자열 포함하면 주력
+    if op_basis == "":
+        for core_season in CORE_SEASONS:
+            if core_season in season:
+                return "core"
+
+    # 그 외 모두 아울렛
+    return "outlet"
+
+
+def determine_operation_group_vectorized(op_basis: pd.Series, season: pd.Series) -> np.ndarray:
+    """determine_operation_group과 같은 규칙을 청크 전체에 한 번에 적용"""
+    op_basis = op_basis.fillna("").astype(str).str.strip()
+    season = season.fillna("").astype(str).str.strip()
+    has_core_season = season.str.contains("|".join(CORE_SEASONS), regex=True)
+    is_core = op_basis.isin(["INTRO", "FOCUS", "26SS"]) | ((op_basis == "") & has_core_season)
+    return np.where(is_core, "core", "outlet")
+
+
+def get_days_in_month(year: int, month: int) -> int:
+    """해당 월의 일수 반환 (윤년 처리 포함)"""
+    return calendar.monthrange(year, month)[1]
+
+
+def to_minor_units(amount: pd.Series) -> pd.Series:
+    """
+    원천 금액 → int64 최소 단위 (빈 값은 0)
+    x.5 는 0에서 먼 쪽으로 반올림 (DuckDB round 와 같은 규칙 → 백엔드와 관계없이 같은 정수)
+    """
+    scaled = amount.fillna(0.0).to_numpy(dtype=np.float64) * AMOUNT_SCALE
+    whole = np.trunc(scaled)
+    rounded = np.where(np.abs(scaled - whole) == 0.5, whole + np.sign(scaled), np.rint(scaled))
+    return pd.Series(rounded.astype(np.int64), index=amount.index)
+
+
+def from_minor_units(amount) -> int:
+    """최소 단위 합계 → 게시용 원 단위 정수 (반올림은 출력할 때 한 번만)"""
+    return round(amount / AMOUNT_SCALE)
+
+
+def output_prefix(category: str) -> str:
+    """대분류의 출력 파일 접두어 (설정에 없으면 category_{대분류})"""
+    return CATEGORY_OUTPUT_PREFIX.get(category, f"category_{category}")
+
+
+def is_valid_item(category: str, item_cat) -> bool:
+    """중분류가 해당 대분류의 정상 아이템 탭인지 (설정 없는 대분류는 모든 중분류 허용)"""
+    if pd.isna(item_cat) or item_cat == "":
+        return False
+    valid_items = CATEGORY_ITEM_TABS.get(category)
+    return valid_items is None or item_cat in valid_items
+
+
+def item_tabs_for(category: str, observed: Optional[Set[str]] = None) -> List[str]:
+    """
+    출력할 아이템 탭 목록 ("전체" 포함)
+    설정 없는 대분류는 observed(집계에서 관측된 아이템 탭)를 정렬해서 사용
+    """
+    if category in CATEGORY_ITEM_TABS:
+        return ["전체"] + CATEGORY_ITEM_TABS[category]
+    return ["전체"] + sorted((observed or set()) - {"전체"})
+
+
+def filter_chunk(
+    chunk: pd.DataFrame,
+    all_categories: bool,
+    record: Optional[Callable[[str, pd.DataFrame], None]] = None
+) -> pd.DataFrame:
+    """
+    브랜드 필터 + 대분류 필터
+    전체 대분류 모드에서는 대분류를 버리지 않고 집계 차원으로 유지
+    record: 단계별 통과 청크를 받는 콜백 ("read" / "brand" / "category", 관리 합계 기록용)
+    """
+    if record:
+        record("read", chunk)
+    chunk = chunk[chunk["产品品牌"].isin(VALID_BRANDS)]
+    if record:
+        record("brand", chunk)
+    if chunk.empty or all_categories:
+        chunk = chunk.dropna(subset=["产品大分类"])
+    else:
+        chunk = chunk[chunk["产品大分类"] == TARGET_CATEGORY]
+    if record:
+        record("category", chunk)
+    return chunk
+
+
+def collect_unexpected_categories(chunk: pd.DataFrame, unexpected: Dict[str, Set[str]]) -> None:
+    """대분류별로 예상치 못한 중분류 값 수집 (설정 없는 대분류는 검사하지 않음)"""
+    pairs = chunk[["产品大分类", "产品中分类"]].dropna().drop_duplicates()
+    for category, item_cat in pairs.itertuples(index=False):
+        valid_items = CATEGORY_ITEM_TABS.get(category)
+        if valid_items is not None and item_cat not in valid_items:
+            unexpected.setdefault(category, set()).add(item_cat)
+
+
+def split_by_category(agg_dict: Dict[tuple, float]) -> Dict[str, Dict[tuple, float]]:
+    """(category, brand, item_tab, month, channel, op_group) 키를 대분류별 5-튜플 키로 분리"""
+    result: Dict[str, Dict[tuple, float]] = {}
+    for (category, *rest), value in agg_dict.items():
+        result.setdefault(category, {})[tuple(rest)] = value
+    return result
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """같은 폴더의 임시 파일에 쓴 뒤 os.replace로 교체 (중간에 죽어도 기존 파일 유지)"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
@@ -6,10 +6,26 @@
 
 import pandas as pd
 import json
-from collections import defaultdict
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, Set, Tuple, Any
-import calendar
+from typing import Dict, List, Set, Tuple, Any
+
+from preprocess_common import (
+    INVENTORY_COLUMNS, VALID_BRANDS, TARGET_CATEGORY, from_minor_units, get_days_in_month, output_prefix,
+    item_tabs_for, filter_chunk, collect_unexpected_categories, split_by_category,
+)
+from change_feed import ChangeFeed
+from control_totals import ControlTotals, abort_on_control_mismatch, month_brands_tree, sidecar_months
+from derived_metrics import write_derived
+from inspect_schema import abort_on_schema_drift
+from line_prefilter import LinePrefilter
+from output_layout import LAYOUTS, open_summary, write_summary
+from preview import discard_preview, estimate, load_preview_fields, scan_preview_months, write_preview
+from rollup import (
+    INVENTORY_CHANNEL_GROUPS, aggregate_leaf, combine_leaves, output_brands,
+    rollup_to_agg_dict, write_season_breakdown,
+)
+from stage_artifacts import read_summary_table
 
 # ========== 설정 ==========
 CHUNK_SIZE = 200_000
@@ -24,63 +40,57 @@ ANALYSIS_MONTHS = [
     "2025.07", "2025.08", "2025.09", "2025.10", "2025.11"
 ]
 
-VALID_BRANDS = {"MLB", "MLB KIDS", "DISCOVERY"}
-TARGET_CATEGORY = "饰品"
-VALID_ITEM_CATEGORIES = {"Shoes", "Headwear", "Bag", "Acc_etc"}
-CORE_SEASONS = ["24FW", "25SS", "25FW", "26SS"]
 
-INVENTORY_COLUMNS = [
-    "Channel 2", "产品品牌", "产品大分类", "产品中分类",
-    "运营基准", "产品季节", "预计库存金额"
-]
+def sales_json_path(category: str = TARGET_CATEGORY) -> Path:
+    """대분류별 판매 JSON 경로 (기본 대분류는 SALES_JSON_PATH)"""
+    if category == TARGET_CATEGORY:
+        return SALES_JSON_PATH
+    return OUTPUT_PATH / f"{output_prefix(category)}_sales_summary.json"
 
 
-def determine_operation_group(op_basis: str, season: str) -> str:
+def load_sales_or_data(
+    category: str = TARGET_CATEGORY,
+    layout: str = "single",
+    months: List[str] = None
+) -> Dict[Tuple, float]:
     """
-    주력/아울렛 상품 구분
-    1. 운영기준이 INTRO, FOCUS, 26SS면 → 주력
-    2. 운영기준이 미지정("")이면 → 시즌코드(24FW, 25SS, 25FW, 26SS)로 판단
-    3. 그 외 → 아울렛
+    판매 JSON에서 OR 매출 데이터 추출 (원 단위로 저장되어 있음)
+    판매 단계의 Arrow 산출물이 JSON과 맞으면 필요한 컬럼/월만 memory map 으로 읽음 (stage_artifacts)
+    없으면 JSON: layout="monthly"면 months에 해당하는 월 파일만 읽음
     """
-    op_basis = str(op_basis).strip() if pd.notna(op_basis) else ""
-    season = str(season).strip() if pd.notna(season) else ""
-    
-    # 1. 운영기준이 INTRO/FOCUS/26SS면 → 주력
-    if op_basis in ["INTRO", "FOCUS", "26SS"]:
-        return "core"
-    
-    # 2. 운영기준이 미지정("")이면 → 시즌코드로 판단
-    if op_basis == "":
-        for core_season in CORE_SEASONS:
-            if core_season in season:
-                return "core"
-    
-    # 3. 그 외 → 아울렛
-    return "outlet"
-
-
-def get_days_in_month(year: int, month: int) -> int:
-    return calendar.monthrange(year, month)[1]
-
-
-def load_sales_or_data() -> Dict[Tuple, float]:
-    """판매 JSON에서 OR 매출 데이터 추출 (원 단위로 저장되어 있음)"""
     sales_or_dict: Dict[Tuple, float] = {}
+    months = months or ANALYSIS_MONTHS
+    
+    if layout == "monthly":
+        store = open_summary(OUTPUT_PATH, category, "sales", layout)
+        source = store.index_path
+    else:
+        source = sales_json_path(category)
+    if not source.exists():
+        print(f"[WARNING] 판매 JSON 파일이 없습니다: {source}")
+        return sales_or_dict
     
-    if not SALES_JSON_PATH.exists():
-        print(f"[WARNING] 판매 JSON 파일이 없습니다: {SALES_JSON_PATH}")
+    or_columns = [f"OR_{op_group}" for op_group in ["core", "outlet"]]
+    table = read_summary_table(category, "sales", source, or_columns, months)
+    if table is not None:
+        table = table[table["brand"].isin(VALID_BRANDS)]
+        for op_group, column in zip(["core", "outlet"], or_columns):
+            amounts = table[column].astype(object).where(table[column].notna(), 0).tolist()
+            for brand, item_tab, month, amount_won in zip(table["brand"], table["item_tab"], table["month"], amounts):
+                sales_or_dict[(brand, item_tab, month, "OR", op_group)] = amount_won
         return sales_or_dict
     
-    with open(SALES_JSON_PATH, 'r', encoding='utf-8') as f:
-        sales_data = json.load(f)
+    if layout == "monthly":
+        sales_data = store.read(months)
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            sales_data = json.load(f)
     
     for brand in VALID_BRANDS:
         if brand not in sales_data.get("brands", {}):
             continue
-        for item_tab in ["전체", "Shoes", "Headwear", "Bag", "Acc_etc"]:
-            if item_tab not in sales_data["brands"][brand]:
-                continue
-            for month in ANALYSIS_MONTHS:
+        for item_tab in sales_data["brands"][brand]:
+            for month in months:
                 if month not in sales_data["brands"][brand][item_tab]:
                     continue
                 month_data = sales_data["brands"][brand][item_tab][month]
@@ -93,82 +103,113 @@ def load_sales_or_data() -> Dict[Tuple, float]:
     return sales_or_dict
 
 
-def process_inventory_data() -> Tuple[Dict[Tuple, float], Set[str]]:
-    agg_dict: Dict[Tuple, float] = defaultdict(float)
-    unexpected_categories: Set[str] = set()
+def aggregate_inventory_file(
+    file_path: Path,
+    year_month: str,
+    unexpected_categories: Dict[str, Set[str]],
+    all_categories: bool = False,
+    control: ControlTotals = None,
+    prefilter: bool = False
+) -> pd.DataFrame:
+    """
+    재고 CSV 1개를 청크 단위로 읽어서 리프 큐브로 집계
+    (아이템탭 전체 / 채널그룹 등 상위 레벨은 rollup 단계에서 계산)
+    prefilter: 파싱 전에 바이트 단위로 통과할 수 없는 줄을 버림 (line_prefilter 참고)
+    """
+    leaves: List[pd.DataFrame] = []
+    
+    with LinePrefilter(file_path, 'utf-8-sig', all_categories) if prefilter else nullcontext(file_path) as source:
+        for chunk in pd.read_csv(
+            source,
+            chunksize=CHUNK_SIZE,
+            encoding='utf-8-sig',
+            usecols=INVENTORY_COLUMNS,
+            dtype={
+                "Channel 2": str, "产品品牌": str, "产品大分类": str,
+                "产品中分类": str, "运营基准": str, "产品季节": str,
+                "预计库存金额": float
+            }
+        ):
+            # 브랜드 / 대분류 필터
+            chunk = filter_chunk(chunk, all_categories, control.record if control else None)
+            if chunk.empty:
+                continue
+            
+            collect_unexpected_categories(chunk, unexpected_categories)
+            
+            leaves.append(aggregate_leaf(chunk, "预计库存金额", year_month))
     
-    for month in ANALYSIS_MONTHS:
-        file_path = INVENTORY_DATA_PATH / f"{month}.csv"
+    if prefilter:
+        stats = source.report()
+        if control:
+            control.prefilter = stats
+    
+    leaf = combine_leaves(leaves)
+    if control:
+        control.add_leaf(leaf)
+    return leaf
+
+
+def scan_inventory_months(
+    data_path: Path,
+    months: List[str],
+    all_categories: bool = False,
+    backend: str = "pandas",
+    strict: bool = False
+) -> Tuple[pd.DataFrame, Dict[str, Set[str]]]:
+    """
+    월별 재고 CSV → 리프 큐브 (전체 실행 / 병합 공통)
+    backend="duckdb"면 전체 월 파일을 DuckDB 쿼리 1개로 집계, "prefilter"면 청크 루프 앞에 바이트 단위 줄 사전 필터
+    strict=True면 없는 파일 / 처리 오류를 건너뛰지 않고 예외로 올림 (작업 큐처럼 월 1개 단위로 실패를 기록할 때)
+    """
+    if backend == "duckdb":
+        from backend_duckdb import existing_month_files, scan_leaf
+        print("DuckDB 백엔드로 처리 중...")
+        return scan_leaf(existing_month_files(data_path, months), "预计库存金额", all_categories)
+    
+    leaves: List[pd.DataFrame] = []
+    unexpected_categories: Dict[str, Set[str]] = {}
+    
+    for month in months:
+        file_path = data_path / f"{month}.csv"
         
         if not file_path.exists():
+            if strict:
+                raise FileNotFoundError(f"파일이 존재하지 않습니다: {file_path}")
             print(f"[WARNING] 파일 없음: {file_path}")
             continue
         
         print(f"처리 중: {file_path}")
         
         try:
-            for chunk in pd.read_csv(
-                file_path,
-                chunksize=CHUNK_SIZE,
-                encoding='utf-8-sig',
-                usecols=INVENTORY_COLUMNS,
-                dtype={
-                    "Channel 2": str, "产品品牌": str, "产品大分类": str,
-                    "产品中分类": str, "运营基准": str, "产品季节": str,
-                    "预计库存金额": float
-                }
-            ):
-                chunk = chunk[chunk["产品品牌"].isin(VALID_BRANDS)]
-                if chunk.empty:
-                    continue
-                
-                chunk = chunk[chunk["产品大分类"] == TARGET_CATEGORY]
-                if chunk.empty:
-                    continue
-                
-                for cat in set(chunk["产品中分类"].dropna().unique()):
-                    if cat not in VALID_ITEM_CATEGORIES:
-                        unexpected_categories.add(cat)
-                
-                chunk["operation_group"] = chunk.apply(
-                    lambda row: determine_operation_group(row["运营基准"], row["产品季节"]), 
-                    axis=1
-                )
-                
-                year_month = f"{month[:4]}.{month[5:7]}"
-                
-                for _, row in chunk.iterrows():
-                    brand = row["产品品牌"]
-                    item_cat = row["产品中分类"]
-                    channel = row["Channel 2"]
-                    op_group = row["operation_group"]
-                    amount = row["预计库存金额"] if pd.notna(row["预计库存金额"]) else 0.0
-                    
-                    if channel not in ["FRS", "HQ", "OR"]:
-                        continue
-                    
-                    item_tabs = ["전체", item_cat] if item_cat in VALID_ITEM_CATEGORIES else ["전체"]
-                    
-                    for item_tab in item_tabs:
-                        key_total = (brand, item_tab, year_month, "전체", op_group)
-                        agg_dict[key_total] += amount
-                        
-                        if channel == "FRS":
-                            key_frs = (brand, item_tab, year_month, "FRS", op_group)
-                            agg_dict[key_frs] += amount
-                        
-                        if channel in ["HQ", "OR"]:
-                            key_hq_or = (brand, item_tab, year_month, "HQ_OR", op_group)
-                            agg_dict[key_hq_or] += amount
-        
+            control = ControlTotals("inventory", month, "预计库存金额", all_categories, file_path)
+            leaves.append(aggregate_inventory_file(file_path, month, unexpected_categories, all_categories, control, backend == "prefilter"))
+            control.write()
         except Exception as e:
+            if strict:
+                raise
             print(f"[ERROR] {file_path}: {e}")
             continue
     
-    return dict(agg_dict), unexpected_categories
+    return combine_leaves(leaves), unexpected_categories
+
+
+def process_inventory_data(all_categories: bool = False, backend: str = "pandas") -> Tuple[pd.DataFrame, Dict[str, Set[str]]]:
+    return scan_inventory_months(INVENTORY_DATA_PATH, ANALYSIS_MONTHS, all_categories, backend)
+
 
+def inventory_month_data(inv_agg: Dict, sales_or: Dict, brand: str, item_tab: str, month: str) -> Dict[str, Any]:
+    """(브랜드, 아이템탭, 월) 1칸의 재고 JSON 필드 생성"""
+    md = {}
+    for op in ["core", "outlet"]:
+        md[f"전체_{op}"] = from_minor_units(inv_agg.get((brand, item_tab, month, "전체", op), 0))
+        md[f"FRS_{op}"] = from_minor_units(inv_agg.get((brand, item_tab, month, "FRS", op), 0))
+        md[f"HQ_OR_{op}"] = from_minor_units(inv_agg.get((brand, item_tab, month, "HQ_OR", op), 0))
+        md[f"OR_sales_{op}"] = sales_or.get((brand, item_tab, month, "OR", op), 0)
+    return md
 
-def convert_to_json(inv_agg: Dict, sales_or: Dict, unexpected: Set) -> Dict:
+
+def convert_to_json(inv_agg: Dict, sales_or: Dict, unexpected: Set, category: str = TARGET_CATEGORY) -> Dict:
     result = {
         "brands": {},
         "unexpectedCategories": sorted(list(unexpected)),
@@ -180,57 +221,93 @@ def convert_to_json(inv_agg: Dict, sales_or: Dict, unexpected: Set) -> Dict:
         year, month_num = int(month[:4]), int(month[5:7])
         result["daysInMonth"][month] = get_days_in_month(year, month_num)
     
-    for brand in VALID_BRANDS:
+    item_tabs = item_tabs_for(category, {key[1] for key in inv_agg})
+    for brand in output_brands(inv_agg):
         result["brands"][brand] = {}
-        for item_tab in ["전체", "Shoes", "Headwear", "Bag", "Acc_etc"]:
+        for item_tab in item_tabs:
             result["brands"][brand][item_tab] = {}
             for month in ANALYSIS_MONTHS:
-                md = {}
-                for op in ["core", "outlet"]:
-                    md[f"전체_{op}"] = round(inv_agg.get((brand, item_tab, month, "전체", op), 0))
-                    md[f"FRS_{op}"] = round(inv_agg.get((brand, item_tab, month, "FRS", op), 0))
-                    md[f"HQ_OR_{op}"] = round(inv_agg.get((brand, item_tab, month, "HQ_OR", op), 0))
-                    md[f"OR_sales_{op}"] = sales_or.get((brand, item_tab, month, "OR", op), 0)
-                result["brands"][brand][item_tab][month] = md
+                result["brands"][brand][item_tab][month] = inventory_month_data(inv_agg, sales_or, brand, item_tab, month)
     
     return result
 
 
-def main():
+def main(
+    all_categories: bool = False,
+    brand_total: bool = False,
+    season_breakdown: bool = False,
+    backend: str = "pandas",
+    layout: str = "single"
+):
     print("=" * 60)
     print("재고자산 데이터 전처리 시작")
     print("=" * 60)
     
-    OUTPUT_PATH.mkdir(parents=True, exist_ok=True)
+    abort_on_schema_drift([INVENTORY_DATA_PATH / f"{m}.csv" for m in ANALYSIS_MONTHS], INVENTORY_COLUMNS, 'utf-8-sig')
     
-    print("\n판매 OR 데이터 로드 중...")
-    sales_or_dict = load_sales_or_data()
-    print(f"OR 판매 키 수: {len(sales_or_dict):,}")
+    OUTPUT_PATH.mkdir(parents=True, exist_ok=True)
     
     print("\n재고 데이터 처리 중...")
-    inv_agg, unexpected = process_inventory_data()
+    inv_leaf, unexpected = process_inventory_data(all_categories, backend)
+    inv_agg = rollup_to_agg_dict(inv_leaf, INVENTORY_CHANNEL_GROUPS, brand_total)
+    inv_by_category = split_by_category(inv_agg)
+    if not all_categories:
+        inv_by_category.setdefault(TARGET_CATEGORY, {})
+    feed = ChangeFeed("full", ANALYSIS_MONTHS)
+    
+    results = {}
+    for category, cat_agg in sorted(inv_by_category.items()):
+        cat_unexpected = unexpected.get(category, set())
+        if cat_unexpected:
+            print(f"\n[WARNING] {category} 예상치 못한 중분류: {sorted(cat_unexpected)}")
+        
+        print(f"\n[{category}] 판매 OR 데이터 로드 중...")
+        sales_or_dict = load_sales_or_data(category, layout)
+        print(f"OR 판매 키 수: {len(sales_or_dict):,}")
+        
+        print(f"[{category}] JSON 변환 중...")
+        results[category] = convert_to_json(cat_agg, sales_or_dict, cat_unexpected, category)
     
-    if unexpected:
-        print(f"\n[WARNING] 예상치 못한 중분류: {sorted(unexpected)}")
+    # 컨트롤 토탈 검증 - 어긋나면 아무 파일도 게시하지 않음
+    abort_on_control_mismatch(
+        "inventory", {c: r["brands"] for c, r in results.items()},
+        required_months=sidecar_months(INVENTORY_DATA_PATH, ANALYSIS_MONTHS, backend)
+    )
     
-    print("\nJSON 변환 중...")
-    result = convert_to_json(inv_agg, sales_or_dict, unexpected)
+    for category, result in results.items():
+        output_file = write_summary(OUTPUT_PATH, category, "inventory", result, layout, feed)
+        
+        print(f"[DONE] 저장 완료: {output_file}")
+        write_derived(OUTPUT_PATH, category, "inventory", layout)
+        discard_preview(OUTPUT_PATH, category, "inventory", ANALYSIS_MONTHS)
     
-    output_file = OUTPUT_PATH / "accessory_inventory_summary.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    feed.write(OUTPUT_PATH)
     
-    print(f"\n[DONE] 저장 완료: {output_file}")
+    if season_breakdown:
+        write_season_breakdown(inv_leaf, INVENTORY_CHANNEL_GROUPS, "inventory", ANALYSIS_MONTHS, OUTPUT_PATH)
+    
+    print(f"\n리프 키 수: {len(inv_leaf):,}")
     print(f"재고 집계 키 수: {len(inv_agg):,}")
 
 
-def merge_inventory_month(months_to_merge: list, new_inventory_path: str = None):
+def merge_inventory_month(
+    months_to_merge: list,
+    new_inventory_path: str = None,
+    all_categories: bool = False,
+    brand_total: bool = False,
+    backend: str = "pandas",
+    layout: str = "single"
+):
     """
     특정 월의 재고 데이터만 병합 (기존 JSON 유지)
     
     Args:
         months_to_merge: 병합할 월 목록 (예: ["2025.11"])
         new_inventory_path: 새 데이터 경로 (None이면 기존 경로 사용)
+        all_categories: True면 모든 대분류를 한 번에 집계해서 대분류별 JSON에 병합
+        brand_total: True면 브랜드 합계("전체") 키도 함께 병합
+        backend: "pandas" (청크 루프) / "prefilter" (줄 사전 필터 + 청크 루프) / "duckdb" (쿼리 1개)
+        layout: "single"이면 JSON 전체를 다시 쓰고, "monthly"면 해당 월 파일과 인덱스만 씀
     """
     inventory_path = Path(new_inventory_path) if new_inventory_path else INVENTORY_DATA_PATH
     
@@ -241,168 +318,141 @@ def merge_inventory_month(months_to_merge: list, new_inventory_path: str = None)
     print(f"데이터 경로: {inventory_path}")
     print()
     
-    # 1. 기존 JSON 읽기
-    output_file = OUTPUT_PATH / "accessory_inventory_summary.json"
-    if not output_file.exists():
-        print(f"[ERROR] 기존 JSON 파일이 없습니다: {output_file}")
-        return
-    
-    with open(output_file, 'r', encoding='utf-8') as f:
-        existing_data = json.load(f)
-    
-    print(f"기존 JSON 로드 완료: {output_file}")
-    
-    # 2. 판매 OR 데이터 로드
-    print("\n판매 OR 데이터 로드 중...")
-    sales_or_dict = load_sales_or_data()
-    
-    # 3. 새 월 데이터 처리
-    agg_dict: Dict[Tuple, float] = defaultdict(float)
-    unexpected_categories: Set[str] = set()
-    
-    for month in months_to_merge:
-        file_path = inventory_path / f"{month}.csv"
-        
-        if not file_path.exists():
-            print(f"[WARNING] 파일이 존재하지 않습니다: {file_path}")
+    abort_on_schema_drift([inventory_path / f"{m}.csv" for m in months_to_merge], INVENTORY_COLUMNS, 'utf-8-sig')
+    
+    # 1. 새 월 데이터 처리
+    leaf, unexpected_categories = scan_inventory_months(inventory_path, months_to_merge, all_categories, backend)
+    agg_dict = rollup_to_agg_dict(leaf, INVENTORY_CHANNEL_GROUPS, brand_total)
+    feed = ChangeFeed("merge", months_to_merge)
+    inv_by_category = split_by_category(agg_dict)
+    if not all_categories:
+        inv_by_category.setdefault(TARGET_CATEGORY, {})
+    
+    merged = {}
+    for category, cat_agg in sorted(inv_by_category.items()):
+        # 2. 기존 결과 열기
+        store = open_summary(OUTPUT_PATH, category, "inventory", layout)
+        if not store.exists():
+            print(f"[ERROR] 기존 JSON 파일이 없습니다: {store.path}")
             continue
         
-        print(f"처리 중 (재고): {file_path}")
+        existing_tabs = store.item_tabs()
+        print(f"기존 JSON 로드 완료: {store.path}")
         
-        try:
-            for chunk in pd.read_csv(
-                file_path,
-                chunksize=CHUNK_SIZE,
-                encoding='utf-8-sig',
-                usecols=INVENTORY_COLUMNS,
-                dtype={
-                    "Channel 2": str,
-                    "产品品牌": str,
-                    "产品大分类": str,
-                    "产品中分类": str,
-                    "运营基准": str,
-                    "产品季节": str,
-                    "预计库存金额": float
+        # 3. 판매 OR 데이터 로드 (병합할 월만)
+        print(f"\n[{category}] 판매 OR 데이터 로드 중...")
+        sales_or_dict = load_sales_or_data(category, layout, months_to_merge)
+        
+        # 4. 병합할 월 데이터 생성 (재고는 브랜드명 그대로 사용)
+        print()
+        print("기존 데이터에 병합 중...")
+        
+        month_brands = {}
+        days_in_month = {}
+        for month in months_to_merge:
+            year, month_num = int(month[:4]), int(month[5:7])
+            days_in_month[month] = get_days_in_month(year, month_num)
+            
+            month_brands[month] = {}
+            for brand in output_brands(cat_agg):
+                observed = {key[1] for key in cat_agg} | existing_tabs.get(brand, set())
+                month_brands[month][brand] = {
+                    item_tab: inventory_month_data(cat_agg, sales_or_dict, brand, item_tab, month)
+                    for item_tab in item_tabs_for(category, observed)
                 }
-            ):
-                # 브랜드 필터
-                chunk = chunk[chunk["产品品牌"].isin(VALID_BRANDS)]
-                if chunk.empty:
-                    continue
-                
-                # 대분류 필터
-                chunk = chunk[chunk["产品大分类"] == TARGET_CATEGORY]
-                if chunk.empty:
-                    continue
-                
-                # 예상치 못한 중분류 확인
-                chunk_categories = set(chunk["产品中分类"].dropna().unique())
-                for cat in chunk_categories:
-                    if cat not in VALID_ITEM_CATEGORIES:
-                        unexpected_categories.add(cat)
-                
-                # operation_group 파생
-                chunk["operation_group"] = chunk.apply(
-                    lambda row: determine_operation_group(row["运营基准"], row["产品季节"]), 
-                    axis=1
-                )
-                
-                # 연월 추출
-                year = month[:4]
-                month_num = month[5:7]
-                year_month = f"{year}.{month_num}"
-                
-                # 집계
-                for _, row in chunk.iterrows():
-                    brand = row["产品品牌"]
-                    item_cat = row["产品中分类"]
-                    channel = row["Channel 2"]
-                    op_group = row["operation_group"]
-                    amount = row["预计库存金额"] if pd.notna(row["预计库存金额"]) else 0.0
-                    
-                    if item_cat in VALID_ITEM_CATEGORIES:
-                        item_tabs = ["전체", item_cat]
-                    else:
-                        item_tabs = ["전체"]
-                    
-                    for item_tab in item_tabs:
-                        # 전체재고
-                        key_total = (brand, item_tab, year_month, "전체", op_group)
-                        agg_dict[key_total] += amount
-                        
-                        # 채널별 재고
-                        if channel == "FRS":
-                            key_frs = (brand, item_tab, year_month, "FRS", op_group)
-                            agg_dict[key_frs] += amount
-                        elif channel in ["HQ", "OR"]:  # HQ + OR = 본사재고
-                            key_hq_or = (brand, item_tab, year_month, "HQ_OR", op_group)
-                            agg_dict[key_hq_or] += amount
-                        
-        except Exception as e:
-            print(f"[ERROR] 파일 처리 실패: {file_path}")
-            print(f"  - {e}")
+        merged[category] = (store, month_brands, days_in_month)
+    
+    # 컨트롤 토탈 검증 - 어긋나면 어느 대분류도 병합하지 않음
+    abort_on_control_mismatch(
+        "inventory", {c: month_brands_tree(mb) for c, (_, mb, _) in merged.items()},
+        required_months=sidecar_months(inventory_path, months_to_merge, backend)
+    )
+    
+    for category, (store, month_brands, days_in_month) in merged.items():
+        # 5. 저장 (months / daysInMonth 갱신 포함)
+        store.merge_months(month_brands, {"daysInMonth": days_in_month}, feed)
+        write_derived(OUTPUT_PATH, category, "inventory", layout, months_to_merge)
+        discard_preview(OUTPUT_PATH, category, "inventory", months_to_merge)
+        
+        print(f"[DONE] 병합 완료: {store.path}")
+        print(f"병합된 월: {months_to_merge}")
+        
+        if unexpected_categories.get(category):
+            print(f"[WARNING] {category} 예상치 못한 중분류: {unexpected_categories[category]}")
     
-    # 4. 기존 데이터에 병합
+    feed.write(OUTPUT_PATH)
+
+
+def preview_inventory_month(
+    months: list,
+    new_inventory_path: str = None,
+    all_categories: bool = False,
+    brand_total: bool = False,
+    layout: str = "single"
+):
+    """
+    새 월 재고 데이터 근사 미리보기 (표본 블록만 읽음, 기존 JSON은 건드리지 않음)
+    OR_sales 필드는 판매 JSON에 해당 월이 있으면 그 값 (신뢰구간 0), 없으면 판매 미리보기 추정치
+    결과: {prefix}_inventory_preview.json (전체 실행 / --merge 로 같은 월을 집계하면 삭제됨)
+    """
+    inventory_path = Path(new_inventory_path) if new_inventory_path else INVENTORY_DATA_PATH
+    
+    print("=" * 60)
+    print("재고 데이터 근사 미리보기")
+    print("=" * 60)
+    print(f"미리보기 월: {months}")
+    print(f"데이터 경로: {inventory_path}")
     print()
-    print("기존 데이터에 병합 중...")
     
-    for month in months_to_merge:
-        year, month_num = int(month[:4]), int(month[5:7])
-        
-        # daysInMonth 업데이트
-        existing_data["daysInMonth"][month] = get_days_in_month(year, month_num)
-        
-        # 브랜드별 데이터 업데이트
-        for brand in VALID_BRANDS:
-            brand_key = brand  # 재고는 브랜드명 그대로 사용
-            
-            if brand_key not in existing_data["brands"]:
-                existing_data["brands"][brand_key] = {}
-            
-            for item_tab in ["전체", "Shoes", "Headwear", "Bag", "Acc_etc"]:
-                if item_tab not in existing_data["brands"][brand_key]:
-                    existing_data["brands"][brand_key][item_tab] = {}
-                
-                # 해당 월 데이터 생성
-                md = {}
-                for op in ["core", "outlet"]:
-                    md[f"전체_{op}"] = round(agg_dict.get((brand, item_tab, month, "전체", op), 0))
-                    md[f"FRS_{op}"] = round(agg_dict.get((brand, item_tab, month, "FRS", op), 0))
-                    md[f"HQ_OR_{op}"] = round(agg_dict.get((brand, item_tab, month, "HQ_OR", op), 0))
-                    md[f"OR_sales_{op}"] = sales_or_dict.get((brand, item_tab, month, "OR", op), 0)
-                
-                existing_data["brands"][brand_key][item_tab][month] = md
-    
-    # months 목록 업데이트
-    for month in months_to_merge:
-        if month not in existing_data["months"]:
-            existing_data["months"].append(month)
-    existing_data["months"] = sorted(existing_data["months"])
-    
-    # 5. JSON 저장
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(existing_data, f, ensure_ascii=False, indent=2)
-    
-    print(f"[DONE] 병합 완료: {output_file}")
-    print(f"병합된 월: {months_to_merge}")
-    
-    if unexpected_categories:
-        print(f"[WARNING] 예상치 못한 중분류: {unexpected_categories}")
+    leaf, strata, unexpected = scan_preview_months(inventory_path, months, INVENTORY_COLUMNS, "预计库存金额", "utf-8-sig", all_categories)
+    estimates, half_widths = estimate(leaf, strata, INVENTORY_CHANNEL_GROUPS, brand_total)
+    
+    def or_sales(category: str):
+        sales_or, sales_ci = load_preview_fields(OUTPUT_PATH, category, "sales", {"OR": "OR"})
+        exact = load_sales_or_data(category, layout, months)
+        sales_or.update(exact)
+        sales_ci.update({key: 0 for key in exact})
+        return sales_or, sales_ci, {"OR_sales": "OR"}
+    
+    write_preview(
+        OUTPUT_PATH, "inventory", months, estimates, half_widths, unexpected,
+        {"전체": "전체", "FRS": "FRS", "HQ_OR": "HQ_OR"}, all_categories, TARGET_CATEGORY, or_sales
+    )
 
 
 if __name__ == "__main__":
-    import sys
+    import argparse
     
+    parser = argparse.ArgumentParser(description="재고자산 데이터 전처리")
     # 병합 모드: python preprocess_inventory.py --merge 2025.11
-    if len(sys.argv) > 1 and sys.argv[1] == "--merge":
-        months = sys.argv[2:]
-        if months:
-            # 새 경로 사용
-            merge_inventory_month(months, r"D:\data\inventory")
-        else:
-            print("사용법: python preprocess_inventory.py --merge 2025.11 [2025.12 ...]")
+    parser.add_argument("--merge", nargs="+", metavar="YYYY.MM", help="해당 월만 기존 JSON에 병합")
+    # 근사 미리보기: python preprocess_inventory.py --preview 2025.12 (표본 블록만 읽고 95% 신뢰구간 포함)
+    parser.add_argument("--preview", nargs="+", metavar="YYYY.MM", help="해당 월 근사 미리보기 JSON 생성")
+    # 전체 대분류 모드: 대분류별로 {prefix}_inventory_summary.json 생성 (1회 스캔)
+    parser.add_argument("--all-categories", action="store_true", help="모든 产品大分类를 한 번에 집계")
+    # 롤업 옵션
+    parser.add_argument("--brand-total", action="store_true", help="브랜드 합계(\"전체\") 키 추가")
+    parser.add_argument("--season-breakdown", action="store_true", help="产品季节별 구분을 별도 JSON으로 저장")
+    # 집계 백엔드: pandas 청크 루프 (기본) / prefilter 줄 사전 필터 + 청크 루프 / DuckDB 쿼리 1개 (pip install duckdb)
+    parser.add_argument("--backend", choices=["pandas", "prefilter", "duckdb"], default="pandas")
+    # 출력 방식: 단일 JSON (기본) / 월별 파일 + 인덱스
+    parser.add_argument("--layout", choices=LAYOUTS, default="single")
+    args = parser.parse_args()
+    
+    if args.preview:
+        preview_inventory_month(
+            args.preview, r"D:\data\inventory",
+            all_categories=args.all_categories, brand_total=args.brand_total, layout=args.layout
+        )
+    elif args.merge:
+        # 새 경로 사용
+        merge_inventory_month(
+            args.merge, r"D:\data\inventory",
+            all_categories=args.all_categories, brand_total=args.brand_total, backend=args.backend,
+            layout=args.layout
+        )
     else:
-        main()
-
-
-
+        main(
+            all_categories=args.all_categories, brand_total=args.brand_total,
+            season_breakdown=args.season_breakdown, backend=args.backend, layout=args.layout
+        )
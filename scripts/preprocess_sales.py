@@ -5,12 +5,26 @@
 """
 
 import pandas as pd
-import json
-import os
-from collections import defaultdict
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, Set, Tuple, Any
-import calendar
+from typing import Dict, List, Optional, Set, Tuple, Any
+
+from preprocess_common import (
+    INVENTORY_COLUMNS, RETAIL_COLUMNS, TARGET_CATEGORY, from_minor_units, get_days_in_month,
+    item_tabs_for, filter_chunk, collect_unexpected_categories, split_by_category,
+)
+from change_feed import ChangeFeed
+from control_totals import ControlTotals, abort_on_control_mismatch, month_brands_tree, sidecar_months
+from derived_metrics import write_derived
+from inspect_schema import abort_on_schema_drift
+from line_prefilter import LinePrefilter
+from output_layout import LAYOUTS, open_summary, write_summary
+from preprocess_inventory import scan_inventory_months
+from preview import discard_preview, estimate, scan_preview_months, write_preview
+from rollup import (
+    SALES_CHANNEL_GROUPS, INVENTORY_CHANNEL_GROUPS, aggregate_leaf, combine_leaves,
+    output_brands, rollup_to_agg_dict, write_aging_cube, write_season_breakdown,
+)
 
 # ========== 설정 ==========
 CHUNK_SIZE = 200_000  # 청크 크기 (메모리 여유에 따라 조정 가능)
@@ -26,266 +40,140 @@ ANALYSIS_MONTHS = [
     "2025.07", "2025.08", "2025.09", "2025.10", "2025.11"
 ]
 
-# 브랜드 필터
-VALID_BRANDS = {"MLB", "MLB KIDS", "DISCOVERY"}
-
-# 대분류 필터
-TARGET_CATEGORY = "饰品"
-
-# 정상 중분류 값
-VALID_ITEM_CATEGORIES = {"Shoes", "Headwear", "Bag", "Acc_etc"}
-
-# 시즌 문자열 (operation_group 판단용)
-CORE_SEASONS = ["24FW", "25SS", "25FW", "26SS"]
-
-# 판매 데이터 사용 컬럼
-RETAIL_COLUMNS = [
-    "Channel 2",
-    "产品品牌",
-    "产品大分类",
-    "产品中分类",
-    "运营基准",
-    "产品季节",
-    "吊牌金额"
-]
-
-# 재고 데이터 사용 컬럼
-INVENTORY_COLUMNS = [
-    "Channel 2",
-    "产品品牌",
-    "产品大分类",
-    "产品中分类",
-    "运营基准",
-    "产品季节",
-    "预计库存金额"
-]
-
 
-def determine_operation_group(op_basis: str, season: str) -> str:
+def aggregate_retail_file(
+    file_path: Path,
+    year_month: str,
+    unexpected_categories: Dict[str, Set[str]],
+    all_categories: bool = False,
+    control: ControlTotals = None,
+    prefilter: bool = False
+) -> pd.DataFrame:
     """
-    운영기준(运营基准)과 제품시즌(产品季节)을 기반으로 operation_group 결정
-    
-    주력(core):
-    - 运营基准이 "INTRO" 또는 "FOCUS"
-    - 또는 运营基准이 빈값이고, 产品季节에 24FW/25SS/25FW/26SS 포함
-    
-    아울렛(outlet):
-    - 그 외 모두
+    retail CSV 1개를 청크 단위로 읽어서 리프 큐브로 집계
+    (아이템탭 전체 / 채널그룹 등 상위 레벨은 rollup 단계에서 계산)
+    prefilter: 파싱 전에 바이트 단위로 통과할 수 없는 줄을 버림 (line_prefilter 참고)
     """
-    op_basis = str(op_basis).strip() if pd.notna(op_basis) else ""
-    season = str(season).strip() if pd.notna(season) else ""
-    
-    # 运营基准이 INTRO, FOCUS, 26SS이면 주력
-    if op_basis in ["INTRO", "FOCUS", "26SS"]:
-        return "core"
-    
-    # 运营基准이 빈값이고 시즌 문자열 포함하면 주력
-    if op_basis == "":
-        for core_season in CORE_SEASONS:
-            if core_season in season:
-                return "core"
-    
-    # 그 외 모두 아울렛
-    return "outlet"
-
-
-def get_days_in_month(year: int, month: int) -> int:
-    """해당 월의 일수 반환 (윤년 처리 포함)"""
-    return calendar.monthrange(year, month)[1]
+    leaves: List[pd.DataFrame] = []
+    
+    with LinePrefilter(file_path, 'utf-8', all_categories) if prefilter else nullcontext(file_path) as source:
+        for chunk in pd.read_csv(
+            source,
+            chunksize=CHUNK_SIZE,
+            encoding='utf-8',
+            usecols=RETAIL_COLUMNS,
+            dtype={
+                "Channel 2": str,
+                "产品品牌": str,
+                "产品大分类": str,
+                "产品中分类": str,
+                "运营基准": str,
+                "产品季节": str,
+                "吊牌金额": float
+            }
+        ):
+            # 1. 브랜드 필터 + 대분류 필터 (기본 모드는 饰品만)
+            chunk = filter_chunk(chunk, all_categories, control.record if control else None)
+            if chunk.empty:
+                continue
+            
+            # 2. 예상치 못한 중분류 값 확인
+            collect_unexpected_categories(chunk, unexpected_categories)
+            
+            # 3. operation_group 파생 + 리프 집계
+            leaves.append(aggregate_leaf(chunk, "吊牌金额", year_month))
+    
+    if prefilter:
+        stats = source.report()
+        if control:
+            control.prefilter = stats
+    
+    leaf = combine_leaves(leaves)
+    if control:
+        control.add_leaf(leaf)
+    return leaf
 
 
-def process_retail_data() -> Tuple[Dict[str, Any], Set[str]]:
+def scan_retail_months(
+    data_path: Path,
+    months: List[str],
+    all_categories: bool = False,
+    backend: str = "pandas",
+    strict: bool = False
+) -> Tuple[pd.DataFrame, Dict[str, Set[str]]]:
     """
-    retail CSV 파일들을 청크 단위로 처리하여 집계
+    월별 retail CSV → 리프 큐브 (전체 실행 / 병합 공통)
+    backend="duckdb"면 전체 월 파일을 DuckDB 쿼리 1개로 집계, "prefilter"면 청크 루프 앞에 바이트 단위 줄 사전 필터
+    strict=True면 없는 파일 / 처리 오류를 건너뛰지 않고 예외로 올림 (작업 큐처럼 월 1개 단위로 실패를 기록할 때)
     """
-    agg_dict: Dict[Tuple, float] = defaultdict(float)
-    unexpected_categories: Set[str] = set()
+    if backend == "duckdb":
+        from backend_duckdb import existing_month_files, scan_leaf
+        print("DuckDB 백엔드로 처리 중...")
+        return scan_leaf(existing_month_files(data_path, months), "吊牌金额", all_categories)
     
-    for month in ANALYSIS_MONTHS:
-        file_path = RETAIL_DATA_PATH / f"{month}.csv"
+    leaves: List[pd.DataFrame] = []
+    unexpected_categories: Dict[str, Set[str]] = {}
+    
+    for month in months:
+        file_path = data_path / f"{month}.csv"
         
         if not file_path.exists():
+            if strict:
+                raise FileNotFoundError(f"파일이 존재하지 않습니다: {file_path}")
             print(f"[WARNING] 파일이 존재하지 않습니다: {file_path}")
             continue
         
         print(f"처리 중 (판매): {file_path}")
         
         try:
-            for chunk in pd.read_csv(
-                file_path,
-                chunksize=CHUNK_SIZE,
-                encoding='utf-8',
-                usecols=RETAIL_COLUMNS,
-                dtype={
-                    "Channel 2": str,
-                    "产品品牌": str,
-                    "产品大分类": str,
-                    "产品中分类": str,
-                    "运营基准": str,
-                    "产品季节": str,
-                    "吊牌金额": float
-                }
-            ):
-                # 1. 브랜드 필터
-                chunk = chunk[chunk["产品品牌"].isin(VALID_BRANDS)]
-                if chunk.empty:
-                    continue
-                
-                # 2. 대분류 필터 (饰品만)
-                chunk = chunk[chunk["产品大分类"] == TARGET_CATEGORY]
-                if chunk.empty:
-                    continue
-                
-                # 3. 예상치 못한 중분류 값 확인
-                chunk_categories = set(chunk["产品中分类"].dropna().unique())
-                for cat in chunk_categories:
-                    if cat not in VALID_ITEM_CATEGORIES:
-                        unexpected_categories.add(cat)
-                
-                # 4. operation_group 파생 컬럼 생성
-                chunk["operation_group"] = chunk.apply(
-                    lambda row: determine_operation_group(row["运营基准"], row["产品季节"]), 
-                    axis=1
-                )
-                
-                # 5. 연월 추출
-                year = month[:4]
-                month_num = month[5:7]
-                year_month = f"{year}.{month_num}"
-                
-                # 6. 집계
-                for _, row in chunk.iterrows():
-                    brand = row["产品品牌"]
-                    item_cat = row["产品中分类"]
-                    channel = row["Channel 2"]
-                    op_group = row["operation_group"]
-                    amount = row["吊牌金额"] if pd.notna(row["吊牌金额"]) else 0.0
-                    
-                    if channel not in ["FRS", "OR"]:
-                        continue
-                    
-                    if item_cat in VALID_ITEM_CATEGORIES:
-                        item_tabs = ["전체", item_cat]
-                    else:
-                        item_tabs = ["전체"]
-                    
-                    for item_tab in item_tabs:
-                        # 전체판매 (FRS + OR)
-                        key_total = (brand, item_tab, year_month, "전체", op_group)
-                        agg_dict[key_total] += amount
-                        
-                        # 채널별 판매
-                        key_channel = (brand, item_tab, year_month, channel, op_group)
-                        agg_dict[key_channel] += amount
-        
+            control = ControlTotals("sales", month, "吊牌金额", all_categories, file_path)
+            leaves.append(aggregate_retail_file(file_path, month, unexpected_categories, all_categories, control, backend == "prefilter"))
+            control.write()
         except Exception as e:
+            if strict:
+                raise
             print(f"[ERROR] 파일 처리 중 오류 발생 ({file_path}): {e}")
             continue
     
-    return dict(agg_dict), unexpected_categories
+    return combine_leaves(leaves), unexpected_categories
 
 
-def process_inventory_data() -> Tuple[Dict[str, Any], Set[str]]:
+def process_retail_data(all_categories: bool = False, backend: str = "pandas") -> Tuple[pd.DataFrame, Dict[str, Set[str]]]:
     """
-    inventory CSV 파일들을 청크 단위로 처리하여 집계
+    retail CSV 파일들을 청크 단위로 처리하여 리프 큐브로 집계
     """
-    agg_dict: Dict[Tuple, float] = defaultdict(float)
-    unexpected_categories: Set[str] = set()
-    
-    for month in ANALYSIS_MONTHS:
-        file_path = INVENTORY_DATA_PATH / f"{month}.csv"
-        
-        if not file_path.exists():
-            print(f"[WARNING] 재고 파일이 존재하지 않습니다: {file_path}")
-            continue
-        
-        print(f"처리 중 (재고): {file_path}")
-        
-        try:
-            for chunk in pd.read_csv(
-                file_path,
-                chunksize=CHUNK_SIZE,
-                encoding='utf-8-sig',  # BOM 처리
-                usecols=INVENTORY_COLUMNS,
-                dtype={
-                    "Channel 2": str,
-                    "产品品牌": str,
-                    "产品大分类": str,
-                    "产品中分类": str,
-                    "运营基准": str,
-                    "产品季节": str,
-                    "预计库存金额": float
-                }
-            ):
-                # 1. 브랜드 필터
-                chunk = chunk[chunk["产品品牌"].isin(VALID_BRANDS)]
-                if chunk.empty:
-                    continue
-                
-                # 2. 대분류 필터 (饰品만)
-                chunk = chunk[chunk["产品大分类"] == TARGET_CATEGORY]
-                if chunk.empty:
-                    continue
-                
-                # 3. 예상치 못한 중분류 값 확인
-                chunk_categories = set(chunk["产品中分类"].dropna().unique())
-                for cat in chunk_categories:
-                    if cat not in VALID_ITEM_CATEGORIES:
-                        unexpected_categories.add(cat)
-                
-                # 4. operation_group 파생 컬럼 생성
-                chunk["operation_group"] = chunk.apply(
-                    lambda row: determine_operation_group(row["运营基准"], row["产品季节"]), 
-                    axis=1
-                )
-                
-                # 5. 연월 추출
-                year = month[:4]
-                month_num = month[5:7]
-                year_month = f"{year}.{month_num}"
-                
-                # 6. 집계
-                for _, row in chunk.iterrows():
-                    brand = row["产品品牌"]
-                    item_cat = row["产品中分类"]
-                    channel = row["Channel 2"]
-                    op_group = row["operation_group"]
-                    amount = row["预计库存金额"] if pd.notna(row["预计库存金额"]) else 0.0
-                    
-                    # Channel 2 유효값: FRS, HQ, OR
-                    if channel not in ["FRS", "HQ", "OR"]:
-                        continue
-                    
-                    if item_cat in VALID_ITEM_CATEGORIES:
-                        item_tabs = ["전체", item_cat]
-                    else:
-                        item_tabs = ["전체"]
-                    
-                    for item_tab in item_tabs:
-                        # 전체재고 (FRS + HQ + OR)
-                        key_total = (brand, item_tab, year_month, "전체", op_group)
-                        agg_dict[key_total] += amount
-                        
-                        # 대리상재고 (FRS)
-                        if channel == "FRS":
-                            key_frs = (brand, item_tab, year_month, "FRS", op_group)
-                            agg_dict[key_frs] += amount
-                        
-                        # 본사재고 (HQ + OR)
-                        if channel in ["HQ", "OR"]:
-                            key_hq_or = (brand, item_tab, year_month, "HQ_OR", op_group)
-                            agg_dict[key_hq_or] += amount
-        
-        except Exception as e:
-            print(f"[ERROR] 재고 파일 처리 중 오류 발생 ({file_path}): {e}")
-            continue
-    
-    return dict(agg_dict), unexpected_categories
+    return scan_retail_months(RETAIL_DATA_PATH, ANALYSIS_MONTHS, all_categories, backend)
 
 
-def convert_sales_to_json_structure(agg_dict: Dict[Tuple, float], unexpected_categories: Set[str]) -> Dict[str, Any]:
+def process_inventory_data(all_categories: bool = False, backend: str = "pandas") -> Tuple[pd.DataFrame, Dict[str, Set[str]]]:
     """
-    판매 집계 결과를 JSON 구조로 변환
+    inventory CSV 파일들을 청크 단위로 처리하여 리프 큐브로 집계
+    """
+    return scan_inventory_months(INVENTORY_DATA_PATH, ANALYSIS_MONTHS, all_categories, backend)
+
+
+def sales_month_data(agg_dict: Dict[Tuple, float], brand: str, item_tab: str, month: str) -> Dict[str, Any]:
+    """(브랜드, 아이템탭, 월) 1칸의 판매 JSON 필드 생성"""
+    month_data = {}
+    
+    for channel_group in ["전체", "FRS", "OR"]:
+        for op_group in ["core", "outlet"]:
+            key = (brand, item_tab, month, channel_group, op_group)
+            amount = agg_dict.get(key, 0)
+            # 최소 단위 정수 합계 → 원 단위로 저장
+            amount_won = from_minor_units(amount)
+            month_data[f"{channel_group}_{op_group}"] = amount_won
+    
+    return month_data
+
+
+def convert_sales_to_json_structure(
+    agg_dict: Dict[Tuple, float],
+    unexpected_categories: Set[str],
+    category: str = TARGET_CATEGORY
+) -> Dict[str, Any]:
+    """
+    판매 집계 결과를 JSON 구조로 변환 (agg_dict는 대분류 1개의 5-튜플 키)
     """
     result = {
         "brands": {},
@@ -293,24 +181,15 @@ def convert_sales_to_json_structure(agg_dict: Dict[Tuple, float], unexpected_cat
         "months": ANALYSIS_MONTHS
     }
     
-    for brand in VALID_BRANDS:
+    item_tabs = item_tabs_for(category, {key[1] for key in agg_dict})
+    for brand in output_brands(agg_dict):
         result["brands"][brand] = {}
         
-        for item_tab in ["전체", "Shoes", "Headwear", "Bag", "Acc_etc"]:
+        for item_tab in item_tabs:
             result["brands"][brand][item_tab] = {}
             
             for month in ANALYSIS_MONTHS:
-                month_data = {}
-                
-                for channel_group in ["전체", "FRS", "OR"]:
-                    for op_group in ["core", "outlet"]:
-                        key = (brand, item_tab, month, channel_group, op_group)
-                        amount = agg_dict.get(key, 0.0)
-                        # 원 단위로 저장 (나누기 제거)
-                        amount_won = round(amount)
-                        month_data[f"{channel_group}_{op_group}"] = amount_won
-                
-                result["brands"][brand][item_tab][month] = month_data
+                result["brands"][brand][item_tab][month] = sales_month_data(agg_dict, brand, item_tab, month)
     
     return result
 
@@ -318,7 +197,8 @@ def convert_sales_to_json_structure(agg_dict: Dict[Tuple, float], unexpected_cat
 def convert_inventory_to_json_structure(
     inv_agg_dict: Dict[Tuple, float], 
     sales_agg_dict: Dict[Tuple, float],
-    unexpected_categories: Set[str]
+    unexpected_categories: Set[str],
+    category: str = TARGET_CATEGORY
 ) -> Dict[str, Any]:
     """
     재고 집계 결과를 JSON 구조로 변환
@@ -337,10 +217,11 @@ def convert_inventory_to_json_structure(
         month_num = int(month[5:7])
         result["daysInMonth"][month] = get_days_in_month(year, month_num)
     
-    for brand in VALID_BRANDS:
+    item_tabs = item_tabs_for(category, {key[1] for key in inv_agg_dict})
+    for brand in output_brands(inv_agg_dict):
         result["brands"][brand] = {}
         
-        for item_tab in ["전체", "Shoes", "Headwear", "Bag", "Acc_etc"]:
+        for item_tab in item_tabs:
             result["brands"][brand][item_tab] = {}
             
             for month in ANALYSIS_MONTHS:
@@ -349,36 +230,43 @@ def convert_inventory_to_json_structure(
                 # 전체재고 (FRS + HQ + OR)
                 for op_group in ["core", "outlet"]:
                     key = (brand, item_tab, month, "전체", op_group)
-                    amount = inv_agg_dict.get(key, 0.0)
-                    amount_won = round(amount)  # 원 단위로 저장
+                    amount = inv_agg_dict.get(key, 0)
+                    amount_won = from_minor_units(amount)  # 원 단위로 저장
                     month_data[f"전체_{op_group}"] = amount_won
                 
                 # 대리상재고 (FRS)
                 for op_group in ["core", "outlet"]:
                     key = (brand, item_tab, month, "FRS", op_group)
-                    amount = inv_agg_dict.get(key, 0.0)
-                    amount_won = round(amount)  # 원 단위로 저장
+                    amount = inv_agg_dict.get(key, 0)
+                    amount_won = from_minor_units(amount)  # 원 단위로 저장
                     month_data[f"FRS_{op_group}"] = amount_won
                 
                 # 본사재고 (HQ + OR)
                 for op_group in ["core", "outlet"]:
                     key = (brand, item_tab, month, "HQ_OR", op_group)
-                    amount = inv_agg_dict.get(key, 0.0)
-                    amount_won = round(amount)  # 원 단위로 저장
+                    amount = inv_agg_dict.get(key, 0)
+                    amount_won = from_minor_units(amount)  # 원 단위로 저장
                     month_data[f"HQ_OR_{op_group}"] = amount_won
                 
-                # OR 판매매출 (직영재고 계산용) - 원 단위로 저장
+                # OR 판매매출 (직영재고 계산용) - 판매 JSON OR_* 와 같은 원 단위 반올림 (재고 단독 실행과 같은 값)
                 for op_group in ["core", "outlet"]:
                     key = (brand, item_tab, month, "OR", op_group)
-                    amount = sales_agg_dict.get(key, 0.0)
-                    month_data[f"OR_sales_{op_group}"] = amount  # 원 단위 저장
+                    amount = sales_agg_dict.get(key, 0)
+                    month_data[f"OR_sales_{op_group}"] = from_minor_units(amount)  # 원 단위로 저장
                 
                 result["brands"][brand][item_tab][month] = month_data
     
     return result
 
 
-def main():
+def main(
+    all_categories: bool = False,
+    brand_total: bool = False,
+    season_breakdown: bool = False,
+    backend: str = "pandas",
+    layout: str = "single",
+    aging: bool = False
+):
     """메인 실행 함수"""
     print("=" * 60)
     print("악세사리 판매매출 및 재고자산 데이터 전처리 시작")
@@ -387,8 +275,15 @@ def main():
     print(f"재고 데이터 경로: {INVENTORY_DATA_PATH}")
     print(f"출력 경로: {OUTPUT_PATH}")
     print(f"청크 크기: {CHUNK_SIZE:,}")
+    print(f"집계 백엔드: {backend}")
+    print(f"출력 방식: {layout}")
+    print(f"대분류: {'전체 (대분류별 출력)' if all_categories else TARGET_CATEGORY}")
     print()
     
+    # 스키마 사전 점검 (헤더만 읽음)
+    abort_on_schema_drift([RETAIL_DATA_PATH / f"{m}.csv" for m in ANALYSIS_MONTHS], RETAIL_COLUMNS, 'utf-8')
+    abort_on_schema_drift([INVENTORY_DATA_PATH / f"{m}.csv" for m in ANALYSIS_MONTHS], INVENTORY_COLUMNS, 'utf-8-sig')
+    
     # 출력 폴더 생성
     OUTPUT_PATH.mkdir(parents=True, exist_ok=True)
     
@@ -396,46 +291,115 @@ def main():
     print("=" * 40)
     print("판매(retail) 데이터 처리 중...")
     print("=" * 40)
-    sales_agg_dict, sales_unexpected = process_retail_data()
-    
-    if sales_unexpected:
-        print()
-        print("[WARNING] 판매 데이터 - 제품중분류에 예상치 못한 값:")
-        for cat in sorted(sales_unexpected):
-            print(f"   - {cat}")
+    sales_leaf, sales_unexpected = process_retail_data(all_categories, backend)
     
     # 재고 데이터 처리
     print()
     print("=" * 40)
     print("재고(inventory) 데이터 처리 중...")
     print("=" * 40)
-    inv_agg_dict, inv_unexpected = process_inventory_data()
-    
-    if inv_unexpected:
+    inv_leaf, inv_unexpected = process_inventory_data(all_categories, backend)
+    
+    write_outputs(
+        sales_leaf, sales_unexpected, inv_leaf, inv_unexpected,
+        all_categories=all_categories, brand_total=brand_total, season_breakdown=season_breakdown,
+        layout=layout, aging=aging,
+        required_months={
+            "sales": sidecar_months(RETAIL_DATA_PATH, ANALYSIS_MONTHS, backend),
+            "inventory": sidecar_months(INVENTORY_DATA_PATH, ANALYSIS_MONTHS, backend),
+        }
+    )
+
+
+def write_outputs(
+    sales_leaf: pd.DataFrame,
+    sales_unexpected: Dict[str, Set[str]],
+    inv_leaf: pd.DataFrame,
+    inv_unexpected: Dict[str, Set[str]],
+    all_categories: bool = False,
+    brand_total: bool = False,
+    season_breakdown: bool = False,
+    layout: str = "single",
+    aging: bool = False,
+    required_months: Optional[Dict[str, List[str]]] = None
+) -> None:
+    """
+    판매/재고 리프 큐브 → 롤업 → 대분류별 JSON 저장
+    (전체 실행과 분산 실행의 병합 단계 공통, layout은 output_layout 참고)
+    aging: 시즌 연차(차기/당/전/과시즌) 구분 {prefix}_aging_summary.json 도 저장 (같은 리프 큐브 사용)
+    required_months: 데이터셋 → 관리 합계 사이드카가 반드시 있어야 하는 월 (control_totals.sidecar_months)
+    """
+    required_months = required_months or {}
+    feed = ChangeFeed("full", ANALYSIS_MONTHS)
+    
+    # 리프 큐브 → 아이템탭 / 채널그룹 (+ 브랜드 합계) 롤업
+    sales_agg_dict = rollup_to_agg_dict(sales_leaf, SALES_CHANNEL_GROUPS, brand_total)
+    inv_agg_dict = rollup_to_agg_dict(inv_leaf, INVENTORY_CHANNEL_GROUPS, brand_total)
+    
+    sales_by_category = split_by_category(sales_agg_dict)
+    inv_by_category = split_by_category(inv_agg_dict)
+    categories = set(sales_by_category) | set(inv_by_category)
+    if not all_categories:
+        categories.add(TARGET_CATEGORY)
+    
+    sales_jsons = {}
+    inv_jsons = {}
+    for category in sorted(categories):
+        cat_sales = sales_by_category.get(category, {})
+        cat_inv = inv_by_category.get(category, {})
+        cat_sales_unexpected = sales_unexpected.get(category, set())
+        cat_inv_unexpected = inv_unexpected.get(category, set())
+        
+        if cat_sales_unexpected:
+            print()
+            print(f"[WARNING] 판매 데이터 - {category} 제품중분류에 예상치 못한 값:")
+            for cat in sorted(cat_sales_unexpected):
+                print(f"   - {cat}")
+        
+        if cat_inv_unexpected:
+            print()
+            print(f"[WARNING] 재고 데이터 - {category} 제품중분류에 예상치 못한 값:")
+            for cat in sorted(cat_inv_unexpected):
+                print(f"   - {cat}")
+        
+        # JSON 변환
         print()
-        print("[WARNING] 재고 데이터 - 제품중분류에 예상치 못한 값:")
-        for cat in sorted(inv_unexpected):
-            print(f"   - {cat}")
+        print(f"[{category}] 판매 데이터 JSON 변환 중...")
+        sales_jsons[category] = convert_sales_to_json_structure(cat_sales, cat_sales_unexpected, category)
+        print(f"[{category}] 재고 데이터 JSON 변환 중...")
+        inv_jsons[category] = convert_inventory_to_json_structure(cat_inv, cat_sales, cat_inv_unexpected, category)
     
-    # JSON 변환 및 저장 - 판매
+    # 컨트롤 토탈 검증 - 하나라도 어긋나면 아무 파일도 게시하지 않음
     print()
-    print("판매 데이터 JSON 변환 중...")
-    sales_json = convert_sales_to_json_structure(sales_agg_dict, sales_unexpected)
+    abort_on_control_mismatch("sales", {c: j["brands"] for c, j in sales_jsons.items()}, required_months=required_months.get("sales"))
+    abort_on_control_mismatch("inventory", {c: j["brands"] for c, j in inv_jsons.items()}, required_months=required_months.get("inventory"))
+    
+    for category in sorted(categories):
+        # JSON 저장
+        sales_output_file = write_summary(OUTPUT_PATH, category, "sales", sales_jsons[category], layout, feed)
+        print(f"[DONE] 판매 JSON 저장: {sales_output_file}")
+        inv_output_file = write_summary(OUTPUT_PATH, category, "inventory", inv_jsons[category], layout, feed)
+        print(f"[DONE] 재고 JSON 저장: {inv_output_file}")
+        
+        # 파생 지표 (전년 대비 / 전월 대비 / 최근 N개월 합계)
+        write_derived(OUTPUT_PATH, category, "sales", layout)
+        write_derived(OUTPUT_PATH, category, "inventory", layout)
+        discard_preview(OUTPUT_PATH, category, "sales", ANALYSIS_MONTHS)
+        discard_preview(OUTPUT_PATH, category, "inventory", ANALYSIS_MONTHS)
     
-    sales_output_file = OUTPUT_PATH / "accessory_sales_summary.json"
-    with open(sales_output_file, 'w', encoding='utf-8') as f:
-        json.dump(sales_json, f, ensure_ascii=False, indent=2)
-    print(f"[DONE] 판매 JSON 저장: {sales_output_file}")
+    feed.write(OUTPUT_PATH)
     
-    # JSON 변환 및 저장 - 재고
-    print()
-    print("재고 데이터 JSON 변환 중...")
-    inv_json = convert_inventory_to_json_structure(inv_agg_dict, sales_agg_dict, inv_unexpected)
+    if season_breakdown:
+        print()
+        write_season_breakdown(sales_leaf, SALES_CHANNEL_GROUPS, "sales", ANALYSIS_MONTHS, OUTPUT_PATH)
+        write_season_breakdown(inv_leaf, INVENTORY_CHANNEL_GROUPS, "inventory", ANALYSIS_MONTHS, OUTPUT_PATH)
     
-    inv_output_file = OUTPUT_PATH / "accessory_inventory_summary.json"
-    with open(inv_output_file, 'w', encoding='utf-8') as f:
-        json.dump(inv_json, f, ensure_ascii=False, indent=2)
-    print(f"[DONE] 재고 JSON 저장: {inv_output_file}")
+    if aging:
+        print()
+        write_aging_cube(
+            sales_leaf, inv_leaf, {"stock": INVENTORY_CHANNEL_GROUPS, "sales": SALES_CHANNEL_GROUPS},
+            ANALYSIS_MONTHS, OUTPUT_PATH
+        )
     
     # 통계 출력
     print()
@@ -443,25 +407,37 @@ def main():
     print("처리 완료 요약")
     print("=" * 60)
     print(f"처리된 월 수: {len(ANALYSIS_MONTHS)}")
+    print(f"처리된 대분류: {sorted(categories)}")
+    print(f"판매 리프 키 수: {len(sales_leaf):,}")
+    print(f"재고 리프 키 수: {len(inv_leaf):,}")
     print(f"판매 집계 키 수: {len(sales_agg_dict):,}")
     print(f"재고 집계 키 수: {len(inv_agg_dict):,}")
     if sales_unexpected:
-        print(f"판매 예상치 못한 중분류 수: {len(sales_unexpected)}")
+        print(f"판매 예상치 못한 중분류 수: {sum(len(v) for v in sales_unexpected.values())}")
     if inv_unexpected:
-        print(f"재고 예상치 못한 중분류 수: {len(inv_unexpected)}")
+        print(f"재고 예상치 못한 중분류 수: {sum(len(v) for v in inv_unexpected.values())}")
     print()
 
 
-def merge_sales_month(months_to_merge: list, new_retail_path: str = None):
+def merge_sales_month(
+    months_to_merge: list,
+    new_retail_path: str = None,
+    all_categories: bool = False,
+    brand_total: bool = False,
+    backend: str = "pandas",
+    layout: str = "single"
+):
     """
     특정 월의 판매 데이터만 병합 (기존 JSON 유지)
     
     Args:
         months_to_merge: 병합할 월 목록 (예: ["2025.11"])
         new_retail_path: 새 데이터 경로 (None이면 기존 경로 사용)
+        all_categories: True면 모든 대분류를 한 번에 집계해서 대분류별 JSON에 병합
+        brand_total: True면 브랜드 합계("전체") 키도 함께 병합
+        backend: "pandas" (청크 루프) / "prefilter" (줄 사전 필터 + 청크 루프) / "duckdb" (쿼리 1개)
+        layout: "single"이면 JSON 전체를 다시 쓰고, "monthly"면 해당 월 파일과 인덱스만 씀
     """
-    import copy
-    
     retail_path = Path(new_retail_path) if new_retail_path else RETAIL_DATA_PATH
     
     print("=" * 60)
@@ -471,159 +447,125 @@ def merge_sales_month(months_to_merge: list, new_retail_path: str = None):
     print(f"데이터 경로: {retail_path}")
     print()
     
-    # 1. 기존 JSON 읽기
-    sales_output_file = OUTPUT_PATH / "accessory_sales_summary.json"
-    if not sales_output_file.exists():
-        print(f"[ERROR] 기존 JSON 파일이 없습니다: {sales_output_file}")
-        return
-    
-    with open(sales_output_file, 'r', encoding='utf-8') as f:
-        existing_data = json.load(f)
-    
-    print(f"기존 JSON 로드 완료: {sales_output_file}")
-    
-    # 2. 새 월 데이터 처리
-    agg_dict: Dict[Tuple, float] = defaultdict(float)
-    unexpected_categories: Set[str] = set()
-    
-    for month in months_to_merge:
-        file_path = retail_path / f"{month}.csv"
-        
-        if not file_path.exists():
-            print(f"[WARNING] 파일이 존재하지 않습니다: {file_path}")
+    abort_on_schema_drift([retail_path / f"{m}.csv" for m in months_to_merge], RETAIL_COLUMNS, 'utf-8')
+    
+    # 1. 새 월 데이터 처리
+    leaf, unexpected_categories = scan_retail_months(retail_path, months_to_merge, all_categories, backend)
+    agg_dict = rollup_to_agg_dict(leaf, SALES_CHANNEL_GROUPS, brand_total)
+    feed = ChangeFeed("merge", months_to_merge)
+    sales_by_category = split_by_category(agg_dict)
+    if not all_categories:
+        sales_by_category.setdefault(TARGET_CATEGORY, {})
+    
+    merged = {}
+    for category, cat_agg in sorted(sales_by_category.items()):
+        # 2. 기존 결과 열기
+        store = open_summary(OUTPUT_PATH, category, "sales", layout)
+        if not store.exists():
+            print(f"[ERROR] 기존 JSON 파일이 없습니다: {store.path}")
             continue
         
-        print(f"처리 중 (판매): {file_path}")
-        
-        try:
-            for chunk in pd.read_csv(
-                file_path,
-                chunksize=CHUNK_SIZE,
-                encoding='utf-8',
-                usecols=RETAIL_COLUMNS,
-                dtype={
-                    "Channel 2": str,
-                    "产品品牌": str,
-                    "产品大分类": str,
-                    "产品中分类": str,
-                    "运营基准": str,
-                    "产品季节": str,
-                    "吊牌金额": float
-                }
-            ):
-                # 브랜드 필터
-                chunk = chunk[chunk["产品品牌"].isin(VALID_BRANDS)]
-                if chunk.empty:
-                    continue
-                
-                # 대분류 필터
-                chunk = chunk[chunk["产品大分类"] == TARGET_CATEGORY]
-                if chunk.empty:
-                    continue
-                
-                # 예상치 못한 중분류 확인
-                chunk_categories = set(chunk["产品中分类"].dropna().unique())
-                for cat in chunk_categories:
-                    if cat not in VALID_ITEM_CATEGORIES:
-                        unexpected_categories.add(cat)
-                
-                # operation_group 파생
-                chunk["operation_group"] = chunk.apply(
-                    lambda row: determine_operation_group(row["运营基准"], row["产品季节"]), 
-                    axis=1
-                )
-                
-                # 연월 추출
-                year = month[:4]
-                month_num = month[5:7]
-                year_month = f"{year}.{month_num}"
-                
-                # 집계
-                for _, row in chunk.iterrows():
-                    brand = row["产品品牌"]
-                    item_cat = row["产品中分类"]
-                    channel = row["Channel 2"]
-                    op_group = row["operation_group"]
-                    amount = row["吊牌金额"] if pd.notna(row["吊牌金额"]) else 0.0
-                    
-                    if channel not in ["FRS", "OR"]:
-                        continue
-                    
-                    if item_cat in VALID_ITEM_CATEGORIES:
-                        item_tabs = ["전체", item_cat]
-                    else:
-                        item_tabs = ["전체"]
-                    
-                    for item_tab in item_tabs:
-                        key_total = (brand, item_tab, year_month, "전체", op_group)
-                        agg_dict[key_total] += amount
-                        
-                        key_channel = (brand, item_tab, year_month, channel, op_group)
-                        agg_dict[key_channel] += amount
-                        
-        except Exception as e:
-            print(f"[ERROR] 파일 처리 실패: {file_path}")
-            print(f"  - {e}")
-    
-    # 3. 기존 데이터에 병합
-    print()
-    print("기존 데이터에 병합 중...")
-    
-    for key, value in agg_dict.items():
-        brand, item_tab, year_month, channel, op_group = key
-        
-        # 브랜드 키 변환
-        brand_key = {"MLB": "MLB", "MLB KIDS": "MLB_KIDS", "DISCOVERY": "DISCOVERY"}[brand]
-        
-        # 브랜드 데이터 없으면 생성
-        if brand_key not in existing_data["brands"]:
-            existing_data["brands"][brand_key] = {}
+        existing_tabs = store.item_tabs()
+        print(f"기존 JSON 로드 완료: {store.path}")
         
-        # 아이템탭 데이터 없으면 생성
-        if item_tab not in existing_data["brands"][brand_key]:
-            existing_data["brands"][brand_key][item_tab] = {}
-        
-        # 월 데이터 없으면 생성
-        if year_month not in existing_data["brands"][brand_key][item_tab]:
-            existing_data["brands"][brand_key][item_tab][year_month] = {}
+        # 3. 병합할 월 데이터 생성 (브랜드명 그대로 사용 - 프론트엔드 키와 동일)
+        print()
+        print("기존 데이터에 병합 중...")
         
-        month_data = existing_data["brands"][brand_key][item_tab][year_month]
+        month_brands = {}
+        for month in months_to_merge:
+            month_brands[month] = {}
+            for brand in output_brands(cat_agg):
+                observed = {key[1] for key in cat_agg} | existing_tabs.get(brand, set())
+                month_brands[month][brand] = {
+                    item_tab: sales_month_data(cat_agg, brand, item_tab, month)
+                    for item_tab in item_tabs_for(category, observed)
+                }
+        merged[category] = (store, month_brands)
+    
+    # 컨트롤 토탈 검증 - 어긋나면 어느 대분류도 병합하지 않음
+    abort_on_control_mismatch(
+        "sales", {c: month_brands_tree(mb) for c, (_, mb) in merged.items()},
+        required_months=sidecar_months(retail_path, months_to_merge, backend)
+    )
+    
+    for category, (store, month_brands) in merged.items():
+        # 4. 저장 (months 목록 갱신 포함)
+        store.merge_months(month_brands, feed=feed)
+        write_derived(OUTPUT_PATH, category, "sales", layout, months_to_merge)
+        discard_preview(OUTPUT_PATH, category, "sales", months_to_merge)
         
-        # 필드 키 생성 및 값 저장
-        if channel == "전체":
-            field_key = f"전체_{op_group}"
-        else:
-            field_key = f"{channel}_{op_group}"
+        print(f"[DONE] 병합 완료: {store.path}")
+        print(f"병합된 월: {months_to_merge}")
         
-        month_data[field_key] = round(value)
-    
-    # months 목록 업데이트
-    for month in months_to_merge:
-        if month not in existing_data["months"]:
-            existing_data["months"].append(month)
-    existing_data["months"] = sorted(existing_data["months"])
+        if unexpected_categories.get(category):
+            print(f"[WARNING] {category} 예상치 못한 중분류: {unexpected_categories[category]}")
     
-    # 4. JSON 저장
-    with open(sales_output_file, 'w', encoding='utf-8') as f:
-        json.dump(existing_data, f, ensure_ascii=False, indent=2)
+    feed.write(OUTPUT_PATH)
+
+
+def preview_sales_month(
+    months: list,
+    new_retail_path: str = None,
+    all_categories: bool = False,
+    brand_total: bool = False
+):
+    """
+    새 월 판매 데이터 근사 미리보기 (표본 블록만 읽음, 기존 JSON은 건드리지 않음)
+    결과: {prefix}_sales_preview.json (전체 실행 / --merge 로 같은 월을 집계하면 삭제됨)
+    """
+    retail_path = Path(new_retail_path) if new_retail_path else RETAIL_DATA_PATH
     
-    print(f"[DONE] 병합 완료: {sales_output_file}")
-    print(f"병합된 월: {months_to_merge}")
+    print("=" * 60)
+    print("판매 데이터 근사 미리보기")
+    print("=" * 60)
+    print(f"미리보기 월: {months}")
+    print(f"데이터 경로: {retail_path}")
+    print()
     
-    if unexpected_categories:
-        print(f"[WARNING] 예상치 못한 중분류: {unexpected_categories}")
+    leaf, strata, unexpected = scan_preview_months(retail_path, months, RETAIL_COLUMNS, "吊牌金额", "utf-8", all_categories)
+    estimates, half_widths = estimate(leaf, strata, SALES_CHANNEL_GROUPS, brand_total)
+    write_preview(
+        OUTPUT_PATH, "sales", months, estimates, half_widths, unexpected,
+        {"전체": "전체", "FRS": "FRS", "OR": "OR"}, all_categories, TARGET_CATEGORY
+    )
 
 
 if __name__ == "__main__":
-    import sys
+    import argparse
     
+    parser = argparse.ArgumentParser(description="판매매출 및 재고자산 데이터 전처리")
     # 병합 모드: python preprocess_sales.py --merge 2025.11
-    if len(sys.argv) > 1 and sys.argv[1] == "--merge":
-        months = sys.argv[2:]
-        if months:
-            # 새 경로 사용
-            merge_sales_month(months, r"D:\data\retail")
-        else:
-            print("사용법: python preprocess_sales.py --merge 2025.11 [2025.12 ...]")
+    parser.add_argument("--merge", nargs="+", metavar="YYYY.MM", help="해당 월만 기존 JSON에 병합")
+    # 근사 미리보기: python preprocess_sales.py --preview 2025.12 (표본 블록만 읽고 95% 신뢰구간 포함)
+    parser.add_argument("--preview", nargs="+", metavar="YYYY.MM", help="해당 월 근사 미리보기 JSON 생성")
+    # 전체 대분류 모드: 대분류별로 {prefix}_*_summary.json 생성 (1회 스캔)
+    parser.add_argument("--all-categories", action="store_true", help="모든 产品大分类를 한 번에 집계")
+    # 롤업 옵션
+    parser.add_argument("--brand-total", action="store_true", help="브랜드 합계(\"전체\") 키 추가")
+    parser.add_argument("--season-breakdown", action="store_true", help="产品季节별 구분을 별도 JSON으로 저장")
+    parser.add_argument("--aging", action="store_true", help="시즌 연차별 재고/판매를 {prefix}_aging_summary.json으로 저장")
+    # 집계 백엔드: pandas 청크 루프 (기본) / prefilter 줄 사전 필터 + 청크 루프 / DuckDB 쿼리 1개 (pip install duckdb)
+    parser.add_argument("--backend", choices=["pandas", "prefilter", "duckdb"], default="pandas")
+    # 출력 방식: 단일 JSON (기본) / 월별 파일 + 인덱스
+    parser.add_argument("--layout", choices=LAYOUTS, default="single")
+    args = parser.parse_args()
+    
+    if args.preview:
+        preview_sales_month(
+            args.preview, r"D:\data\retail",
+            all_categories=args.all_categories, brand_total=args.brand_total
+        )
+    elif args.merge:
+        # 새 경로 사용
+        merge_sales_month(
+            args.merge, r"D:\data\retail",
+            all_categories=args.all_categories, brand_total=args.brand_total, backend=args.backend,
+            layout=args.layout
+        )
     else:
-        main()
+        main(
+            all_categories=args.all_categories, brand_total=args.brand_total,
+            season_breakdown=args.season_breakdown, backend=args.backend, layout=args.layout,
+            aging=args.aging
+        )
@@ -0,0 +1,296 @@
+"""
+근사 미리보기 (월마감 직후 새 월을 빠르게 확인하는 용도)
+- 월 파일을 바이트 구간(행 블록)으로 나누고, 파일 위치 기준 층(stratum)마다 일부 블록만 무작위로 읽음
+- 읽은 블록은 전체 실행과 같은 리프 집계 → 롤업을 거쳐 셀(브랜드, 아이템탭, 월, 채널그룹, op_group)별 블록 합계로 만들고
+  층화 추정으로 전체 합계와 95% 신뢰구간을 계산
+    추정치 = Σ_h (N_h / n_h) × Σ 블록 합계
+    분산   = Σ_h N_h² × (1 - n_h / N_h) × s_h² / n_h       (s_h²: 층 h 블록 합계의 표본분산)
+- 결과는 {prefix}_{sales|inventory}_preview.json (approximate: true, 필드별 신뢰구간 반폭은 ci95)
+- 같은 월을 전체 실행 / --merge 로 정확히 집계하면 미리보기 파일에서 해당 월이 빠짐 (discard_preview)
+"""
+
+import io
+import json
+import math
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from preprocess_common import (
+    AMOUNT_SCALE, collect_unexpected_categories, filter_chunk, get_days_in_month, item_tabs_for, output_prefix,
+    split_by_category, write_atomic,
+)
+from rollup import AGG_KEY, aggregate_leaf, build_rollup_rules, output_brands, rollup
+
+# ========== 설정 ==========
+PREVIEW_SAMPLE_FRACTION = 0.05  # 읽을 블록 비율
+PREVIEW_BLOCK_BYTES = 4 * 1024 * 1024  # 블록 크기 (행 단위로 맞춰 읽음)
+PREVIEW_STRATA = 20  # 파일 위치 기준 층 수
+PREVIEW_SEED = 0
+CONFIDENCE_Z = 1.96  # 95% 신뢰구간
+
+
+def read_block(f, data_start: int, start: int, end: int) -> bytes:
+    """
+    [start, end) 에서 시작하는 행만 읽음 (end 를 넘어가는 마지막 행은 끝까지)
+    블록 경계에 걸친 행은 시작 위치가 속한 블록 1곳에만 포함
+    """
+    if start > data_start:
+        f.seek(start - 1)
+        f.readline()  # start 이전에 시작한 행은 앞 블록 몫
+    else:
+        f.seek(start)
+    position = f.tell()
+    if position >= end:
+        return b""
+    data = f.read(end - position)
+    if data and not data.endswith(b"\n"):
+        data += f.readline()
+    return data
+
+
+def sample_blocks(
+    file_path: Path,
+    fraction: float = PREVIEW_SAMPLE_FRACTION,
+    block_bytes: int = PREVIEW_BLOCK_BYTES,
+    strata: int = PREVIEW_STRATA,
+    seed=PREVIEW_SEED
+) -> Tuple[bytes, List[Tuple[int, int, int]], Dict[int, Tuple[int, int]]]:
+    """
+    Returns:
+        헤더 행, 읽을 블록 [(층, 블록 번호, 시작 바이트)], 층별 (전체 블록 수 N_h, 표본 블록 수 n_h)
+    블록이 적어서 층마다 2개 이상 뽑을 수 없으면 전체 블록을 읽음 (분산 0)
+    """
+    size = file_path.stat().st_size
+    with open(file_path, "rb") as f:
+        header = f.readline()
+    data_start = len(header)
+    n_blocks = max(1, math.ceil((size - data_start) / block_bytes))
+
+    strata = max(1, min(strata, n_blocks // 2))
+    bounds = np.linspace(0, n_blocks, strata + 1).astype(int)
+    rng = np.random.default_rng(seed)
+    chosen, sizes = [], {}
+    for h in range(strata):
+        blocks = np.arange(bounds[h], bounds[h + 1])
+        n_h = min(len(blocks), max(2, math.ceil(len(blocks) * fraction)))
+        picked = np.sort(rng.choice(blocks, size=n_h, replace=False))
+        sizes[h] = (len(blocks), n_h)
+        chosen.extend((h, int(b), data_start + int(b) * block_bytes) for b in picked)
+    return header, chosen, sizes
+
+
+def scan_preview_months(
+    data_path: Path,
+    months: List[str],
+    columns: List[str],
+    amount_col: str,
+    encoding: str,
+    all_categories: bool = False,
+    **sampling
+) -> Tuple[pd.DataFrame, Dict[Tuple[str, int], Tuple[int, int]], Dict[str, Set[str]]]:
+    """
+    월 파일 표본 블록 → 블록별 리프 큐브 ("block" 컬럼 = "월:블록 번호")
+    Returns: (리프, {(월, 층): (N_h, n_h)}, 예상치 못한 중분류)
+    """
+    dtype = {col: str for col in columns}
+    dtype[amount_col] = float
+    block_bytes = sampling.get("block_bytes", PREVIEW_BLOCK_BYTES)
+    seed = sampling.pop("seed", PREVIEW_SEED)
+    leaves: List[pd.DataFrame] = []
+    strata: Dict[Tuple[str, int], Tuple[int, int]] = {}
+    unexpected: Dict[str, Set[str]] = {}
+
+    for month in months:
+        file_path = data_path / f"{month}.csv"
+        if not file_path.exists():
+            print(f"[WARNING] 파일이 존재하지 않습니다: {file_path}")
+            continue
+        # 월마다 다른 블록 위치 (같은 월은 항상 같은 표본)
+        month_seed = [seed, int(month.replace(".", ""))]
+        header, chosen, sizes = sample_blocks(file_path, seed=month_seed, **sampling)
+        print(f"미리보기 표본 ({len(chosen)}블록 / {sum(n for n, _ in sizes.values())}블록): {file_path}")
+        strata.update({(month, h): size for h, size in sizes.items()})
+
+        frames = []
+        with open(file_path, "rb") as f:
+            for stratum, block, start in chosen:
+                data = read_block(f, len(header), start, start + block_bytes)
+                if data.strip():
+                    frame = pd.read_csv(io.BytesIO(header + data), encoding=encoding, usecols=columns, dtype=dtype)
+                    frames.append((stratum, block, frame))
+
+        for stratum, block, frame in frames:
+            frame = filter_chunk(frame, all_categories)
+            if frame.empty:
+                continue
+            collect_unexpected_categories(frame, unexpected)
+            leaf = aggregate_leaf(frame, amount_col, month)
+            leaf["block"] = f"{month}:{block}"
+            leaf["stratum"] = stratum
+            leaves.append(leaf)
+
+    leaf = pd.concat(leaves, ignore_index=True) if leaves else pd.DataFrame(columns=AGG_KEY + ["block", "stratum", "amount"])
+    return leaf, strata, unexpected
+
+
+def estimate(
+    leaf: pd.DataFrame,
+    strata: Dict[Tuple[str, int], Tuple[int, int]],
+    channel_groups: Dict[str, List[str]],
+    brand_total: bool = False
+) -> Tuple[Dict[tuple, float], Dict[tuple, float]]:
+    """
+    블록별 리프 → 층화 추정 (AGG_KEY 6-튜플 dict 2개: 추정치, 신뢰구간 반폭)
+    표본에 한 번도 안 나온 셀은 0 (신뢰구간 없음)
+    """
+    if leaf.empty:
+        return {}, {}
+    rules = build_rollup_rules(channel_groups, brand_total=brand_total)
+    keys = ["brand_rollup" if dim == "brand" else dim for dim in AGG_KEY] if brand_total else AGG_KEY
+    blocks = rollup(leaf, rules, keys + ["block"])
+    block_strata = leaf[["month", "block", "stratum"]].drop_duplicates().set_index("block")
+
+    # (셀, 블록) 합계 → 셀 × 블록 행렬 (표본 블록에 없는 셀은 0)
+    wide = blocks.pivot_table(index=keys, columns="block", values="amount", aggfunc="sum", fill_value=0.0)
+    total = np.zeros(len(wide))
+    variance = np.zeros(len(wide))
+    for (month, stratum), group in block_strata.groupby(["month", "stratum"]):
+        n_total, n_sample = strata[(month, stratum)]
+        columns = [block for block in group.index if block in wide.columns]
+        values = np.zeros((len(wide), n_sample))
+        values[:, :len(columns)] = wide[columns].to_numpy()  # 필터 후 비어 있던 블록은 0
+        total += n_total / n_sample * values.sum(axis=1)
+        if n_sample > 1:
+            variance += n_total ** 2 * (1 - n_sample / n_total) * values.var(axis=1, ddof=1) / n_sample
+
+    cells = list(wide.index)
+    half_width = CONFIDENCE_Z * np.sqrt(variance)
+    # 리프 금액은 최소 단위 → 원 단위 (다른 데이터셋 JSON 값과 같은 단위로 합쳐서 출력)
+    return dict(zip(cells, (total / AMOUNT_SCALE).tolist())), dict(zip(cells, (half_width / AMOUNT_SCALE).tolist()))
+
+
+def preview_file(output_path: Path, category: str, dataset: str) -> Path:
+    return output_path / f"{output_prefix(category)}_{dataset}_preview.json"
+
+
+def preview_month_data(agg: Dict[tuple, float], brand: str, item_tab: str, month: str, fields: Dict[str, str]) -> Dict[str, float]:
+    """필드 이름 → (채널그룹, op_group) 매핑으로 1칸 생성 (반올림은 전체 실행과 동일하게 원 단위)"""
+    result = {}
+    for field, channel_group in fields.items():
+        for op_group in ("core", "outlet"):
+            result[f"{field}_{op_group}"] = round(agg.get((brand, item_tab, month, channel_group, op_group), 0.0))
+    return result
+
+
+def write_preview(
+    output_path: Path,
+    dataset: str,
+    months: List[str],
+    estimates: Dict[tuple, float],
+    half_widths: Dict[tuple, float],
+    unexpected: Dict[str, Set[str]],
+    fields: Dict[str, str],
+    all_categories: bool,
+    target_category: str,
+    extra_fields: Optional[Callable[[str], Tuple[Dict[tuple, float], Dict[tuple, float], Dict[str, str]]]] = None,
+    sampling: Optional[Dict] = None
+) -> List[Path]:
+    """
+    대분류별 미리보기 파일 저장 (기존 미리보기의 다른 월은 유지)
+    파일 구조: 전처리 결과 JSON과 같은 brands 트리 + 같은 모양의 ci95 트리
+        {"approximate": true, "confidenceLevel": 0.95, "sampleFraction", "months", "brands", "ci95", ...}
+    extra_fields: 대분류 → (5-튜플 값, 5-튜플 신뢰구간 반폭, 필드 매핑)
+                  다른 데이터셋 값으로 채울 필드 (재고 파일의 OR_sales 등)
+    """
+    by_category = split_by_category(estimates)
+    ci_by_category = split_by_category(half_widths)
+    if not all_categories:
+        by_category.setdefault(target_category, {})
+
+    written = []
+    for category, cat_agg in sorted(by_category.items()):
+        cat_ci = ci_by_category.get(category, {})
+        target_file = preview_file(output_path, category, dataset)
+        existing = {}
+        if target_file.exists():
+            with open(target_file, "r", encoding="utf-8") as f:
+                existing = json.load(f)
+
+        brands = existing.get("brands", {})
+        ci95 = existing.get("ci95", {})
+        extra_est, extra_ci, extra = extra_fields(category) if extra_fields else ({}, {}, {})
+        item_tabs = item_tabs_for(category, {key[1] for key in cat_agg})
+        for brand in output_brands(cat_agg):
+            for item_tab in item_tabs:
+                for month in months:
+                    value = preview_month_data(cat_agg, brand, item_tab, month, fields)
+                    ci = preview_month_data(cat_ci, brand, item_tab, month, fields)
+                    value.update(preview_month_data(extra_est, brand, item_tab, month, extra))
+                    ci.update(preview_month_data(extra_ci, brand, item_tab, month, extra))
+                    brands.setdefault(brand, {}).setdefault(item_tab, {})[month] = value
+                    ci95.setdefault(brand, {}).setdefault(item_tab, {})[month] = ci
+
+        all_months = sorted(set(existing.get("months", [])) | set(months))
+        payload = {
+            "approximate": True,
+            "confidenceLevel": 0.95,
+            "sampleFraction": (sampling or {}).get("fraction", PREVIEW_SAMPLE_FRACTION),
+            "brands": brands,
+            "ci95": ci95,
+            "unexpectedCategories": sorted(set(existing.get("unexpectedCategories", [])) | unexpected.get(category, set())),
+            "months": all_months,
+        }
+        if dataset == "inventory":
+            payload["daysInMonth"] = {m: get_days_in_month(int(m[:4]), int(m[5:7])) for m in all_months}
+        write_atomic(target_file, json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8"))
+        print(f"[DONE] 근사 미리보기 저장 (approximate): {target_file} {months}")
+        written.append(target_file)
+    return written
+
+
+def load_preview_fields(output_path: Path, category: str, dataset: str, fields: Dict[str, str]) -> Tuple[Dict[tuple, float], Dict[tuple, float]]:
+    """미리보기 파일 → (5-튜플 추정치, 5-튜플 신뢰구간 반폭) (파일이 없으면 빈 dict)"""
+    target_file = preview_file(output_path, category, dataset)
+    if not target_file.exists():
+        return {}, {}
+    with open(target_file, "r", encoding="utf-8") as f:
+        preview = json.load(f)
+    result = ({}, {})
+    for tree, agg in zip(("brands", "ci95"), result):
+        for brand, tabs in preview.get(tree, {}).items():
+            for item_tab, by_month in tabs.items():
+                for month, month_data in by_month.items():
+                    for field, channel_group in fields.items():
+                        for op_group in ("core", "outlet"):
+                            agg[(brand, item_tab, month, channel_group, op_group)] = month_data.get(f"{field}_{op_group}", 0)
+    return result
+
+
+def discard_preview(output_path: Path, category: str, dataset: str, months: List[str]) -> None:
+    """정확히 집계한 월은 미리보기에서 제거 (남는 월이 없으면 파일 삭제)"""
+    target_file = preview_file(output_path, category, dataset)
+    if not target_file.exists():
+        return
+    with open(target_file, "r", encoding="utf-8") as f:
+        preview = json.load(f)
+    done = set(months) & set(preview.get("months", []))
+    if not done:
+        return
+    remaining = [m for m in preview["months"] if m not in done]
+    if not remaining:
+        target_file.unlink()
+        print(f"[DONE] 근사 미리보기 삭제 (정확한 집계로 대체): {target_file}")
+        return
+    for tree in ("brands", "ci95"):
+        for tabs in preview.get(tree, {}).values():
+            for by_month in tabs.values():
+                for month in done:
+                    by_month.pop(month, None)
+    preview["months"] = remaining
+    if "daysInMonth" in preview:
+        preview["daysInMonth"] = {m: d for m, d in preview["daysInMonth"].items() if m not in done}
+    write_atomic(target_file, json.dumps(preview, ensure_ascii=False, indent=2).encode("utf-8"))
+    print(f"[DONE] 근사 미리보기에서 {sorted(done)} 제거 (정확한 집계로 대체): {target_file}")
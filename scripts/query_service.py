@@ -0,0 +1,246 @@
+"""
+로컬 집계 조회 서비스 (오프라인, 표준 라이브러리 HTTP 서버)
+- 큐브 파일(scripts/aggregate_cube.py)을 대분류별로 메모리 맵으로 열고 구간 조회에 응답
+  요청마다 큐브 파일 크기 / 수정 시각을 확인해서 다시 만들어졌으면 새로 열고 구간 캐시를 비움
+- 자주 쓰는 구간은 크기 제한 LRU 캐시에 보관
+- /stats 로 캐시 적중률 (큐브가 바뀌면 초기화), 응답 시간 p50 / p99 확인
+
+사용법:
+    python scripts/aggregate_cube.py
+    python scripts/query_service.py --port 8765
+
+    GET /slice?metric=sales&brand=MLB&item_tab=Shoes&channel=전체&op_group=core&from=2025.01&to=2025.11
+        op_group: core / outlet / total (생략 시 total)
+        category: 생략 시 기본 대분류
+    GET /axes?category=饰品
+    GET /stats
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from aggregate_cube import CUBE_AXES, CUBE_PATH, OP_GROUPS, cube_files, load_cube
+from preprocess_common import TARGET_CATEGORY
+
+# ========== 설정 ==========
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+CACHE_SIZE = 1024  # 캐시에 보관할 구간 수
+LATENCY_WINDOW = 10_000  # p50 / p99 계산에 쓰는 최근 요청 수
+
+
+class QueryError(ValueError):
+    """잘못된 조회 파라미터 (HTTP 400)"""
+
+
+class CubeStore:
+    """
+    대분류별 큐브를 메모리 맵으로 열어서 보관
+    조회마다 큐브 파일 (배열 + 축 라벨) 크기 / 수정 시각을 확인해서 바뀌었으면 다시 열기
+    """
+
+    def __init__(self, cube_path: Path = CUBE_PATH):
+        self.cube_path = cube_path
+        self._cubes: Dict[str, Tuple[Tuple, np.ndarray, Dict[str, List[str]], Dict[str, Dict[str, int]]]] = {}
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def version(self, category: str) -> Tuple:
+        """큐브 파일 식별 정보 ((크기, 수정 시각) × 배열 / 축 라벨 파일)"""
+        try:
+            stats = [path.stat() for path in cube_files(category, self.cube_path)]
+        except FileNotFoundError:
+            raise QueryError(f"큐브 파일이 없습니다: {category} (python scripts/aggregate_cube.py)")
+        return tuple((stat.st_size, stat.st_mtime_ns) for stat in stats)
+
+    def get(self, category: str):
+        """(버전, 큐브, 축 라벨, 라벨 → 위치)"""
+        version = self.version(category)
+        with self._lock:
+            cached = self._cubes.get(category)
+            if cached is None or cached[0] != version:
+                try:
+                    cube, axes = load_cube(category, self.cube_path)
+                except FileNotFoundError:
+                    raise QueryError(f"큐브 파일이 없습니다: {category} (python scripts/aggregate_cube.py)")
+                if cube.shape != tuple(len(axes[axis]) for axis in CUBE_AXES):
+                    # 배열만 바뀌고 축 라벨은 아직 쓰는 중
+                    raise QueryError(f"큐브 파일을 다시 쓰는 중입니다: {category} (잠시 후 다시 조회)")
+                index = {axis: {label: i for i, label in enumerate(labels)} for axis, labels in axes.items()}
+                if cached is not None:
+                    self.reloads += 1
+                    print(f"[DONE] 큐브 다시 열기: {category}")
+                self._cubes[category] = (version, cube, axes, index)
+            return self._cubes[category]
+
+
+class QueryService:
+    def __init__(self, store: CubeStore, cache_size: int = CACHE_SIZE):
+        self.store = store
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._latency_lock = threading.Lock()
+        self._versions: Dict[str, Tuple] = {}
+        self._cached_slice = lru_cache(maxsize=cache_size)(self._slice)
+
+    def slice(
+        self,
+        category: str,
+        metric: str,
+        brand: str,
+        item_tab: str,
+        channel: str,
+        op_group: str,
+        month_from: Optional[str],
+        month_to: Optional[str],
+    ) -> Dict:
+        """월 구간 값 조회 (큐브 파일이 바뀌었으면 캐시를 비우고, 캐시 키에 큐브 버전 포함)"""
+        version = self.store.get(category)[0]
+        if self._versions.setdefault(category, version) != version:
+            self._versions[category] = version
+            self._cached_slice.cache_clear()
+        return self._cached_slice(category, version, metric, brand, item_tab, channel, op_group, month_from, month_to)
+
+    def _slice(
+        self,
+        category: str,
+        version: Tuple,
+        metric: str,
+        brand: str,
+        item_tab: str,
+        channel: str,
+        op_group: str,
+        month_from: Optional[str],
+        month_to: Optional[str],
+    ) -> Dict:
+        """월 구간 값 조회 (캐시 대상 - 반환값은 수정하지 않음)"""
+        _, cube, axes, index = self.store.get(category)
+
+        def position(axis: str, label: str) -> int:
+            if label not in index[axis]:
+                raise QueryError(f"알 수 없는 {axis}: {label} (가능: {axes[axis]})")
+            return index[axis][label]
+
+        months = axes["month"]
+        start = 0 if month_from is None else np.searchsorted(months, month_from, side="left")
+        stop = len(months) if month_to is None else np.searchsorted(months, month_to, side="right")
+
+        if op_group == "total":
+            op_slice = slice(None)
+        elif op_group in OP_GROUPS:
+            op_slice = position("op_group", op_group)
+        else:
+            raise QueryError(f"알 수 없는 op_group: {op_group} (가능: {OP_GROUPS + ['total']})")
+
+        values = cube[
+            position("metric", metric),
+            position("brand", brand),
+            position("item_tab", item_tab),
+            slice(int(start), int(stop)),
+            position("channel", channel),
+            op_slice,
+        ]
+        if op_group == "total":
+            values = values.sum(axis=-1)
+        return {"months": months[start:stop], "values": np.asarray(values).tolist()}
+
+    def record_latency(self, seconds: float) -> None:
+        with self._latency_lock:
+            self._latencies.append(seconds)
+
+    def stats(self) -> Dict:
+        info = self._cached_slice.cache_info()
+        lookups = info.hits + info.misses
+        with self._latency_lock:
+            latencies = np.array(self._latencies) * 1000
+        latency = {"count": int(latencies.size)}
+        if latencies.size:
+            latency["p50"] = round(float(np.percentile(latencies, 50)), 3)
+            latency["p99"] = round(float(np.percentile(latencies, 99)), 3)
+        return {
+            "cache": {
+                "hits": info.hits,
+                "misses": info.misses,
+                "hitRate": round(info.hits / lookups, 4) if lookups else 0.0,
+                "size": info.currsize,
+                "maxSize": info.maxsize,
+                "cubeReloads": self.store.reloads,
+            },
+            "latencyMs": latency,
+        }
+
+
+def make_handler(service: QueryService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Dict) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            started = time.perf_counter()
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            category = params.get("category", TARGET_CATEGORY)
+            try:
+                if url.path == "/slice":
+                    missing = [key for key in ["metric", "brand", "item_tab", "channel"] if key not in params]
+                    if missing:
+                        raise QueryError(f"필수 파라미터 누락: {missing}")
+                    body = service.slice(
+                        category, params["metric"], params["brand"], params["item_tab"], params["channel"],
+                        params.get("op_group", "total"), params.get("from"), params.get("to"),
+                    )
+                    service.record_latency(time.perf_counter() - started)
+                    self._send(200, body)
+                elif url.path == "/axes":
+                    _, _, axes, _ = service.store.get(category)
+                    self._send(200, {"axes": CUBE_AXES, "labels": axes})
+                elif url.path == "/stats":
+                    self._send(200, service.stats())
+                else:
+                    self._send(404, {"error": f"Not found: {url.path}"})
+            except QueryError as e:
+                self._send(400, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            # 요청마다 출력하지 않음 (통계는 /stats)
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 집계 조회 서비스")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cube-path", type=Path, default=CUBE_PATH)
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    args = parser.parse_args()
+
+    service = QueryService(CubeStore(args.cube_path), args.cache_size)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"조회 서비스 시작: http://{args.host}:{args.port} (큐브: {args.cube_path})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
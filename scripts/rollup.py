@@ -0,0 +1,293 @@
+"""
+리프 집계 큐브 + 계층 롤업
+- 청크 루프에서는 리프 레벨 (대분류, 브랜드, 중분류, 월, 채널, operation_group, 시즌) 합계만 누적
+  금액은 int64 최소 단위 (preprocess_common.AMOUNT_SCALE) → 합산 순서와 관계없이 정확, 원 단위 반올림은 JSON 출력 시
+- 아이템탭 전체 / 채널 전체·HQ_OR / 브랜드 전체 / 시즌 구분 등 상위 레벨은
+  루프가 끝난 뒤 리프 큐브에서 매핑 테이블 merge + groupby sum 으로 한 번에 계산
+- 새 구분(롤업)은 build_rollup_rules에 규칙만 추가하면 되고 청크 루프는 건드리지 않음
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from preprocess_common import (
+    BRAND_ORDER, determine_operation_group_vectorized, from_minor_units, is_valid_item, item_tabs_for,
+    output_prefix, to_minor_units, write_atomic,
+)
+
+# ========== 설정 ==========
+# 원천 컬럼 → 리프 차원 이름
+LEAF_COLUMNS = {
+    "产品大分类": "category",
+    "产品品牌": "brand",
+    "产品中分类": "item_cat",
+    "Channel 2": "channel",
+    "产品季节": "season",
+}
+
+# 리프 큐브 차원 (값 컬럼: amount, int64 최소 단위)
+LEAF_DIMENSIONS = ["category", "brand", "item_cat", "month", "channel", "op_group", "season"]
+
+# 기존 JSON 변환 함수가 사용하는 집계 키 (대분류 포함 6-튜플)
+AGG_KEY = ["category", "brand", "item_tab", "month", "channel_group", "op_group"]
+
+# 채널 계층 (리프 채널 → 채널그룹 목록, 없는 채널은 버림)
+SALES_CHANNEL_GROUPS = {
+    "FRS": ["전체", "FRS"],  # 전체판매 = FRS + OR
+    "OR": ["전체", "OR"],
+}
+INVENTORY_CHANNEL_GROUPS = {
+    "FRS": ["전체", "FRS"],  # 전체재고 = FRS + HQ + OR
+    "HQ": ["전체", "HQ_OR"],  # 본사재고 = HQ + OR
+    "OR": ["전체", "HQ_OR"],
+}
+
+# 브랜드 합계 키
+BRAND_TOTAL = "전체"
+
+# 시즌 연차 구분 (产品季节 연도 - 해당 월 연도, 재고 시즌 차트의 당시즌/차기시즌/과시즌 기준과 같은 연도 단위)
+SEASON_VINTAGES = ["차기시즌", "당시즌", "전시즌", "과시즌", "기타"]
+
+# 롤업 규칙: (생성할 차원, 입력 차원 목록, 입력값 → 상위값 목록 함수)
+RollupRule = Tuple[str, List[str], Callable[..., Optional[Sequence[str]]]]
+
+
+def aggregate_leaf(chunk: pd.DataFrame, amount_col: str, year_month: str) -> pd.DataFrame:
+    """필터된 청크 → 리프 큐브 (청크 단위 groupby sum)"""
+    leaf = chunk[list(LEAF_COLUMNS)].rename(columns=LEAF_COLUMNS).fillna("")
+    leaf["op_group"] = determine_operation_group_vectorized(chunk["运营基准"], chunk["产品季节"])
+    leaf["month"] = year_month
+    leaf["amount"] = to_minor_units(chunk[amount_col])
+    return leaf.groupby(LEAF_DIMENSIONS, as_index=False, sort=False)["amount"].sum()
+
+
+def empty_leaf() -> pd.DataFrame:
+    """빈 리프 큐브 (금액 컬럼 int64)"""
+    return pd.DataFrame(columns=LEAF_DIMENSIONS + ["amount"]).astype({"amount": np.int64})
+
+
+def combine_leaves(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """청크/파일별 리프 큐브를 하나로 합침 (같은 키는 합산)"""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return empty_leaf()
+    combined = pd.concat(frames, ignore_index=True)
+    return combined.groupby(LEAF_DIMENSIONS, as_index=False, sort=False)["amount"].sum()
+
+
+def item_tab_parents(category: str, item_cat: str) -> List[str]:
+    """중분류 → 아이템탭 (정상 중분류는 자기 탭 + 전체, 나머지는 전체만)"""
+    return ["전체", item_cat] if is_valid_item(category, item_cat) else ["전체"]
+
+
+def season_family(season: str) -> str:
+    """产品季节 → 시즌 코드 (예: "25FW" 포함 문자열 → "25FW", 그 외 "기타")"""
+    match = re.search(r"\d{2}(SS|FW)", season or "")
+    return match.group(0) if match else "기타"
+
+
+def season_vintage(season: pd.Series, month: pd.Series) -> np.ndarray:
+    """
+    产品季节 + 월(YYYY.MM) → 시즌 연차 (벡터 연산)
+    시즌 연도 = 월 연도 + 1 이상: 차기시즌, 같음: 당시즌, -1: 전시즌, -2 이하: 과시즌, 시즌 코드 없음: 기타
+    """
+    season_year = pd.to_numeric(season.astype(str).str.extract(r"(\d{2})(?:SS|FW)", expand=False), errors="coerce")
+    month_year = pd.to_numeric(month.astype(str).str[2:4], errors="coerce")
+    diff = ((season_year - month_year + 50) % 100 - 50).to_numpy()  # 00/99 경계 처리
+    return np.select(
+        [np.isnan(diff), diff >= 1, diff == 0, diff == -1],
+        ["기타", "차기시즌", "당시즌", "전시즌"],
+        default="과시즌",
+    )
+
+
+def build_rollup_rules(
+    channel_groups: Dict[str, List[str]],
+    brand_total: bool = False,
+    season_breakdown: bool = False
+) -> List[RollupRule]:
+    """
+    데이터셋별 롤업 규칙 생성
+
+    Args:
+        channel_groups: SALES_CHANNEL_GROUPS / INVENTORY_CHANNEL_GROUPS
+        brand_total: 브랜드 합계(BRAND_TOTAL) 키 추가
+        season_breakdown: 시즌 코드(season_code) 차원 추가
+    """
+    rules: List[RollupRule] = [
+        ("item_tab", ["category", "item_cat"], item_tab_parents),
+        ("channel_group", ["channel"], channel_groups.get),
+    ]
+    if brand_total:
+        rules.append(("brand_rollup", ["brand"], lambda brand: [brand, BRAND_TOTAL]))
+    if season_breakdown:
+        rules.append(("season_code", ["season"], lambda season: [season_family(season)]))
+    return rules
+
+
+def rollup(leaf: pd.DataFrame, rules: List[RollupRule], group_dims: List[str]) -> pd.DataFrame:
+    """
+    리프 큐브 → 상위 레벨 큐브
+
+    규칙마다 입력 차원의 고유 조합(수십~수백 행)에만 매핑 함수를 적용해 매핑 테이블을 만들고,
+    리프 큐브에 merge (1:N 확장) 한 뒤 group_dims 기준으로 한 번에 합산
+    """
+    frame = leaf
+    for target, sources, parents_fn in rules:
+        mapping = frame[sources].drop_duplicates().reset_index(drop=True)
+        mapping[target] = [list(parents_fn(*values) or []) for values in mapping.itertuples(index=False)]
+        mapping = mapping.explode(target).dropna(subset=[target])
+        frame = frame.merge(mapping, on=sources, how="inner")
+    return frame.groupby(group_dims, as_index=False, sort=False)["amount"].sum()
+
+
+def to_agg_dict(frame: pd.DataFrame, key_dims: List[str], value_col: str = "amount") -> Dict[tuple, float]:
+    """롤업 결과 → {키 튜플: 값} (기존 convert 함수 입력 형식)"""
+    keys = frame[key_dims].itertuples(index=False, name=None)
+    return dict(zip(keys, frame[value_col].tolist()))
+
+
+def rollup_to_agg_dict(
+    leaf: pd.DataFrame,
+    channel_groups: Dict[str, List[str]],
+    brand_total: bool = False
+) -> Dict[tuple, float]:
+    """리프 큐브 → AGG_KEY 6-튜플 dict (브랜드 합계 포함 여부 선택)"""
+    rules = build_rollup_rules(channel_groups, brand_total=brand_total)
+    group_dims = AGG_KEY
+    if brand_total:
+        group_dims = ["brand_rollup" if dim == "brand" else dim for dim in AGG_KEY]
+    return to_agg_dict(rollup(leaf, rules, group_dims), group_dims)
+
+
+def rollup_season_agg_dict(leaf: pd.DataFrame, channel_groups: Dict[str, List[str]]) -> Dict[tuple, float]:
+    """리프 큐브 → (대분류, 브랜드, 아이템탭, 월, 시즌코드, 채널그룹, operation_group) dict"""
+    rules = build_rollup_rules(channel_groups, season_breakdown=True)
+    group_dims = ["category", "brand", "item_tab", "month", "season_code", "channel_group", "op_group"]
+    return to_agg_dict(rollup(leaf, rules, group_dims), group_dims)
+
+
+def output_brands(agg_dict: Dict[tuple, float]) -> List[str]:
+    """JSON에 출력할 브랜드 목록 (브랜드 합계 키가 집계돼 있으면 마지막에 추가)"""
+    brands = list(BRAND_ORDER)
+    if any(key[0] == BRAND_TOTAL for key in agg_dict):
+        brands.append(BRAND_TOTAL)
+    return brands
+
+
+def write_season_breakdown(
+    leaf: pd.DataFrame,
+    channel_groups: Dict[str, List[str]],
+    dataset: str,
+    months: List[str],
+    output_path: Path
+) -> None:
+    """
+    시즌 코드별 구분을 대분류마다 {prefix}_{dataset}_season_summary.json 으로 저장
+    구조: brands → 아이템탭 → 월 → 시즌코드 → {채널그룹}_{core|outlet}
+    """
+    season_agg = rollup_season_agg_dict(leaf, channel_groups)
+    group_names = list(dict.fromkeys(group for groups in channel_groups.values() for group in groups))
+
+    by_category: Dict[str, Dict] = {}
+    for (category, brand, item_tab, month, season_code, channel_group, op_group), amount in season_agg.items():
+        category_data = by_category.setdefault(category, {"brands": {}, "seasons": set()})
+        category_data["seasons"].add(season_code)
+        month_data = (
+            category_data["brands"].setdefault(brand, {})
+            .setdefault(item_tab, {})
+            .setdefault(month, {})
+        )
+        fields = month_data.setdefault(season_code, {
+            f"{group}_{op}": 0 for group in group_names for op in ["core", "outlet"]
+        })
+        fields[f"{channel_group}_{op_group}"] = from_minor_units(amount)
+
+    for category, category_data in sorted(by_category.items()):
+        observed_tabs = {tab for brand_data in category_data["brands"].values() for tab in brand_data}
+        result = {
+            "brands": {
+                brand: {
+                    tab: category_data["brands"][brand][tab]
+                    for tab in item_tabs_for(category, observed_tabs)
+                    if tab in category_data["brands"][brand]
+                }
+                for brand in sorted(category_data["brands"])
+            },
+            "months": months,
+            "seasons": sorted(category_data["seasons"]),
+        }
+        output_file = output_path / f"{output_prefix(category)}_{dataset}_season_summary.json"
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"[DONE] 시즌 구분 JSON 저장: {output_file}")
+
+
+def rollup_aging_agg_dict(leaf: pd.DataFrame, channel_groups: Dict[str, List[str]]) -> Dict[tuple, float]:
+    """리프 큐브 → (대분류, 브랜드, 아이템탭, 월, 시즌 연차, 채널그룹) dict (core/outlet 합계)"""
+    if leaf.empty:
+        return {}
+    leaf = leaf.assign(vintage=season_vintage(leaf["season"], leaf["month"]))
+    rules = build_rollup_rules(channel_groups)
+    group_dims = ["category", "brand", "item_tab", "month", "vintage", "channel_group"]
+    return to_agg_dict(rollup(leaf, rules, group_dims), group_dims)
+
+
+def write_aging_cube(
+    sales_leaf: pd.DataFrame,
+    inv_leaf: pd.DataFrame,
+    channel_groups: Dict[str, Dict[str, List[str]]],
+    months: List[str],
+    output_path: Path
+) -> None:
+    """
+    재고/판매 시즌 연차 구분을 대분류마다 {prefix}_aging_summary.json 으로 저장
+    (전처리 스캔에서 만든 리프 큐브의 产品季节 차원을 그대로 사용, 원천 CSV를 다시 읽지 않음)
+    구조: brands → 아이템탭 → 월 → 시즌 연차 → {stock|sales}_{채널그룹}
+    channel_groups: {"stock": INVENTORY_CHANNEL_GROUPS, "sales": SALES_CHANNEL_GROUPS}
+    """
+    leaves = {"stock": inv_leaf, "sales": sales_leaf}
+    field_names = [
+        f"{measure}_{group}"
+        for measure, groups in channel_groups.items()
+        for group in dict.fromkeys(group for parents in groups.values() for group in parents)
+    ]
+
+    by_category: Dict[str, Dict] = {}
+    for measure, groups in channel_groups.items():
+        aging_agg = rollup_aging_agg_dict(leaves[measure], groups)
+        for (category, brand, item_tab, month, vintage, channel_group), amount in aging_agg.items():
+            month_data = (
+                by_category.setdefault(category, {})
+                .setdefault(brand, {})
+                .setdefault(item_tab, {})
+                .setdefault(month, {})
+            )
+            fields = month_data.setdefault(vintage, dict.fromkeys(field_names, 0))
+            fields[f"{measure}_{channel_group}"] = from_minor_units(amount)
+
+    for category, brands in sorted(by_category.items()):
+        observed_tabs = {tab for brand_data in brands.values() for tab in brand_data}
+        result = {
+            "brands": {
+                brand: {
+                    tab: {
+                        month: {vintage: by_vintage[vintage] for vintage in SEASON_VINTAGES if vintage in by_vintage}
+                        for month, by_vintage in sorted(brands[brand][tab].items())
+                    }
+                    for tab in item_tabs_for(category, observed_tabs)
+                    if tab in brands[brand]
+                }
+                for brand in sorted(brands)
+            },
+            "months": months,
+            "vintages": SEASON_VINTAGES,
+        }
+        output_file = output_path / f"{output_prefix(category)}_aging_summary.json"
+        write_atomic(output_file, json.dumps(result, ensure_ascii=False, indent=2).encode("utf-8"))
+        print(f"[DONE] 시즌 연차 구분 JSON 저장: {output_file}")
@@ -0,0 +1,244 @@
+"""
+재고 시뮬레이션 시나리오 그리드 (신규발주가능 금액 룩업 테이블)
+- 화면에서 슬라이더 1개 위치씩 계산하던 시뮬레이션을
+  브랜드 × 아이템탭 × 성장률 × 목표재고주수 × 재고주수 기준(1/2/3개월) 전체 조합으로 한 번에 계산
+- 계산식은 프론트와 동일
+    예상 판매    = 전년 동월 (전체_core + 전체_outlet) × 성장률 / 100        (src/lib/forecast.ts)
+    예상 기말재고 = max(전월 기말재고 + 입고예정 - 예상 판매, 0)             (src/lib/inventoryForecast.ts)
+    목표 재고자산 = (기간매출 ÷ 기간일수 × 7) × 목표재고주수                 (src/utils/stockWeeks.ts)
+    신규발주가능  = 목표 재고자산 - 타겟월 예상 기말재고
+- 성장률 / 목표재고주수 / 기준 개월 축은 배열 브로드캐스팅으로 계산
+  (음수 방지가 있는 기말재고 누적은 inventory_timeline.project_closing)
+- 결과: public/data/{prefix}_scenario_grid.json (축 라벨 + 평탄화한 정수 배열), --csv 로 전체 조합 내보내기
+
+사용법:
+    python scripts/scenario_grid.py
+    python scripts/scenario_grid.py --csv D:\\data\\scenario_grid.csv
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from derived_metrics import month_calendar, shift_month
+from inventory_timeline import FORECAST_MONTHS_COUNT, load_inputs, month_total, project_closing
+from output_layout import LAYOUTS
+from preprocess_common import CATEGORY_ITEM_TABS, TARGET_CATEGORY, get_days_in_month, output_prefix, write_atomic
+from rollup import BRAND_TOTAL
+
+# ========== 설정 ==========
+OUTPUT_PATH = Path(__file__).parent.parent / "public" / "data"
+
+TARGET_MONTH = "2026.03"  # BrandSalesPage.tsx 의 TARGET_MONTH
+
+GROWTH_RATES = list(range(80, 131))  # 성장률 (%)
+TARGET_WEEKS = list(range(0, 53))  # 목표재고주수 입력 범위 (0~52주)
+STOCK_WEEK_WINDOWS = [1, 2, 3]  # 재고주수 기준 개월
+
+GRID_AXES = ["brand", "item_tab", "growthRate", "targetWeeks", "window"]
+
+
+def js_round(values: np.ndarray) -> np.ndarray:
+    """Math.round 와 같은 반올림 (0.5는 올림)"""
+    return np.floor(values + 0.5)
+
+
+def grid_file(output_path: Path, category: str) -> Path:
+    return output_path / f"{output_prefix(category)}_scenario_grid.json"
+
+
+def build_grid(
+    inputs: Dict,
+    brands: List[str],
+    item_tabs: List[str],
+    growth_rates: List[float],
+    target_weeks: List[int],
+    windows: List[int],
+    target_month: str = TARGET_MONTH
+) -> Dict[str, np.ndarray]:
+    """
+    Returns:
+        deltaInventory   (브랜드, 아이템탭, 성장률, 목표주수, 기준개월) 신규발주가능 금액
+        targetInventory  (브랜드, 아이템탭, 성장률, 목표주수, 기준개월) 목표 재고자산
+        currentInventory (브랜드, 아이템탭, 성장률) 타겟월 예상 기말재고
+        salesPeriod      (브랜드, 아이템탭, 성장률, 기준개월) 기간매출
+        daysPeriod       (기준개월) 기간일수
+    """
+    sales, inventory, forecast = inputs["sales"], inputs["inventory"], inputs["forecast"]
+    components = [tab for tab in item_tabs if tab != "전체"]
+
+    inventory_latest = max(inventory["months"])
+    inventory_forecast = [shift_month(inventory_latest, i) for i in range(1, FORECAST_MONTHS_COUNT + 1)]
+    window_months = [shift_month(target_month, -i) for i in range(max(windows))]
+    calendar = month_calendar(
+        min(window_months + inventory_forecast),
+        max(window_months + inventory_forecast)
+    )
+    position = {month: i for i, month in enumerate(calendar)}
+    shape = (len(brands), len(item_tabs), len(calendar))
+
+    # 판매: 실적(있는 월) / 전년 동월 / 예상 구간 여부
+    actual = np.zeros(shape)
+    prev_year = np.zeros(shape)
+    has_actual = np.zeros(shape, dtype=bool)
+    is_forecast = np.zeros(shape, dtype=bool)
+    for b, brand in enumerate(brands):
+        for t, tab in enumerate(item_tabs):
+            by_month = sales["brands"].get(brand, {}).get(tab, {})
+            if not by_month:
+                continue
+            latest = max(by_month)
+            for m, month in enumerate(calendar):
+                if month in by_month:
+                    actual[b, t, m] = month_total(by_month[month])
+                    has_actual[b, t, m] = True
+                prev_year[b, t, m] = month_total(by_month.get(shift_month(month, -12)))
+                is_forecast[b, t, m] = latest < month <= shift_month(latest, FORECAST_MONTHS_COUNT)
+
+    # (성장률, 브랜드, 아이템탭, 월) 예상 판매 포함 월 매출
+    growth = np.asarray(growth_rates, dtype=np.float64)[:, None, None, None]
+    projected_sales = np.where(is_forecast, js_round(prev_year * growth / 100), np.where(has_actual, actual, 0.0))
+
+    # 재고 누적에 쓰는 판매: 탭에 해당 월 데이터가 없으면 전체 탭 판매 사용 (프론트와 동일)
+    total_tab = item_tabs.index("전체")
+    has_entry = has_actual | is_forecast
+    inventory_sales = np.where(has_entry, projected_sales, projected_sales[:, :, total_tab:total_tab + 1, :])
+
+    # 재고: 시작점(최근 실적 월 기말재고) + 입고예정
+    start = np.zeros(shape[:2])
+    has_start = np.zeros(shape[:2], dtype=bool)
+    inbound = np.zeros((len(brands), len(item_tabs), len(inventory_forecast)))
+    for b, brand in enumerate(brands):
+        forecast_brand = forecast["brands"].get(brand, {})
+        for t, tab in enumerate(item_tabs):
+            latest_fields = inventory["brands"].get(brand, {}).get(tab, {}).get(inventory_latest)
+            if latest_fields:
+                start[b, t] = month_total(latest_fields)
+                has_start[b, t] = True
+            for k, month in enumerate(inventory_forecast):
+                items = forecast_brand.get(month, {})
+                keys = components if tab == "전체" else [tab]
+                inbound[b, t, k] = sum(float(items.get(key, 0) or 0) for key in keys)
+
+    # 타겟월 예상 기말재고 (성장률, 브랜드, 아이템탭)
+    if target_month in inventory["months"]:
+        actual_target = np.array([
+            [month_total(inventory["brands"].get(brand, {}).get(tab, {}).get(target_month)) for tab in item_tabs]
+            for brand in brands
+        ])
+        current = np.broadcast_to(actual_target, (len(growth_rates),) + shape[:2]).copy()
+    else:
+        current = np.zeros((len(growth_rates),) + shape[:2])
+        if target_month in inventory_forecast:
+            net_flow = inbound - inventory_sales[..., [position[m] for m in inventory_forecast]]
+            closing = project_closing(np.broadcast_to(start, current.shape), net_flow)
+            current = np.where(has_start, js_round(closing[..., inventory_forecast.index(target_month)]), 0.0)
+
+    # 기간매출 / 기간일수 (기준개월별 누적)
+    days_in_month = inventory.get("daysInMonth", {})
+    window_pos = [position[m] for m in window_months]
+    window_days = np.array([
+        days_in_month.get(m) or get_days_in_month(int(m[:4]), int(m[5:7])) for m in window_months
+    ], dtype=np.float64)
+    window_sales = np.cumsum(projected_sales[..., window_pos], axis=-1)
+    window_index = np.asarray(windows) - 1
+    sales_period = window_sales[..., window_index]  # (성장률, 브랜드, 아이템탭, 기준개월)
+    days_period = np.cumsum(window_days)[window_index]
+
+    # (브랜드, 아이템탭, 성장률, 목표주수, 기준개월) 로 브로드캐스팅
+    weekly_sales = (sales_period / days_period * 7).transpose(1, 2, 0, 3)[:, :, :, None, :]
+    weeks = np.asarray(target_weeks, dtype=np.float64)[None, None, None, :, None]
+    target_inventory = weekly_sales * weeks
+    current_inventory = current.transpose(1, 2, 0)
+    delta_inventory = target_inventory - current_inventory[:, :, :, None, None]
+
+    return {
+        "deltaInventory": js_round(delta_inventory).astype(np.int64),
+        "targetInventory": js_round(target_inventory).astype(np.int64),
+        "currentInventory": js_round(current_inventory).astype(np.int64),
+        "salesPeriod": js_round(sales_period.transpose(1, 2, 0, 3)).astype(np.int64),
+        "daysPeriod": days_period.astype(np.int64),
+    }
+
+
+def grid_to_frame(grid: Dict[str, np.ndarray], labels: Dict[str, List]) -> pd.DataFrame:
+    """전체 조합을 행 1개씩 펼친 표 (CSV 내보내기용)"""
+    index = pd.MultiIndex.from_product([labels[axis] for axis in GRID_AXES], names=GRID_AXES)
+    frame = pd.DataFrame({
+        "targetInventory": grid["targetInventory"].ravel(),
+        "deltaInventory": grid["deltaInventory"].ravel(),
+    }, index=index).reset_index()
+    current = grid["currentInventory"][:, :, :, None, None]
+    frame.insert(len(GRID_AXES), "currentInventory", np.broadcast_to(current, grid["deltaInventory"].shape).ravel())
+    return frame
+
+
+def write_grid(
+    category: str = TARGET_CATEGORY,
+    output_path: Path = OUTPUT_PATH,
+    layout: str = "single",
+    csv_path: Optional[Path] = None
+) -> Path:
+    """
+    시나리오 그리드 저장
+    파일 구조: {"targetMonth", "axes", "labels", "shape", "deltaInventory": [...], "currentInventory": [...], ...}
+    평탄화 순서는 axes 순서 (C order), 예) delta[b][t][g][k][w] = deltaInventory[(((b*T + t)*G + g)*K + k)*W + w]
+    """
+    inputs = load_inputs(category, output_path, layout)
+    brands = [brand for brand in inputs["sales"]["brands"] if brand != BRAND_TOTAL]
+    item_tabs = ["전체"] + CATEGORY_ITEM_TABS.get(category, [])
+    labels = {
+        "brand": brands,
+        "item_tab": item_tabs,
+        "growthRate": GROWTH_RATES,
+        "targetWeeks": TARGET_WEEKS,
+        "window": STOCK_WEEK_WINDOWS,
+    }
+    grid = build_grid(inputs, brands, item_tabs, GROWTH_RATES, TARGET_WEEKS, STOCK_WEEK_WINDOWS)
+
+    payload = {
+        "targetMonth": TARGET_MONTH,
+        "axes": GRID_AXES,
+        "labels": labels,
+        "shape": list(grid["deltaInventory"].shape),
+        "deltaInventory": grid["deltaInventory"].ravel().tolist(),
+        "currentInventory": grid["currentInventory"].ravel().tolist(),
+        "salesPeriod": grid["salesPeriod"].ravel().tolist(),
+        "daysPeriod": grid["daysPeriod"].tolist(),
+    }
+    target_file = grid_file(output_path, category)
+    write_atomic(target_file, json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    print(f"[DONE] 시나리오 그리드 저장: {target_file} ({grid['deltaInventory'].size:,}개 조합)")
+
+    if csv_path is not None:
+        frame = grid_to_frame(grid, labels)
+        write_atomic(Path(csv_path), frame.to_csv(index=False).encode("utf-8-sig"))
+        print(f"[DONE] 시나리오 그리드 CSV 저장: {csv_path} ({len(frame):,}행)")
+    return target_file
+
+
+def lookup(payload: Dict, brand: str, item_tab: str, growth_rate: float, target_weeks: int, window: int) -> int:
+    """저장된 그리드에서 슬라이더 위치 1개의 신규발주가능 금액"""
+    labels, shape = payload["labels"], payload["shape"]
+    flat = 0
+    for axis, size, label in zip(GRID_AXES, shape, (brand, item_tab, growth_rate, target_weeks, window)):
+        flat = flat * size + labels[axis].index(label)
+    return payload["deltaInventory"][flat]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="재고 시뮬레이션 시나리오 그리드 (신규발주가능 금액)")
+    parser.add_argument("--category", default=TARGET_CATEGORY)
+    parser.add_argument("--layout", choices=LAYOUTS, default="single", help="전처리 결과 저장 방식")
+    parser.add_argument("--csv", type=Path, help="전체 조합을 CSV로 내보낼 경로")
+    args = parser.parse_args()
+
+    write_grid(args.category, layout=args.layout, csv_path=args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+스케치 지표 (셀별 고정 메모리 근사치)
+- 브랜드 × 아이템탭 × 월 × operation_group 셀마다
+    HyperLogLog  : 판매 / 재고 고유 SKU 수, 고유 매장 수
+    분위수 스케치 : SKU별 재고주수 분포 (상대오차 고정 로그 구간 히스토그램, 구간 수 고정)
+- 청크 루프에서 리프 셀(대분류, 브랜드, 중분류, 월, op_group) 스케치만 갱신하고,
+  아이템탭 전체 / op_group 합계는 출력할 때 스케치를 병합 (HLL은 레지스터 max, 분위수는 구간별 합)
+- SKU별 재고주수는 판매/재고 SKU 합계가 필요해서 external_agg 파티션 단위로 조인 후 반영
+- 스케치 상태는 data/sketches/{prefix}_sketches.npz, 추정치는 public/data/{prefix}_sketch_summary.json
+  (--merge 시 해당 월 셀만 다시 계산해서 상태 파일에 반영)
+
+사용법:
+    python scripts/sketches.py [--months 2025.10 2025.11] [--all-categories] [--spill-dir D:\\data\\_spill]
+    python scripts/sketches.py --merge 2025.11
+"""
+
+import argparse
+import io
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from external_agg import SPILL_MEMORY_LIMIT_MB, SPILL_PARTITIONS, ExternalAggregator
+from inspect_schema import abort_on_schema_drift
+from preprocess_common import (
+    SKU_COLUMNS, STORE_COLUMN, TARGET_CATEGORY, determine_operation_group_vectorized, filter_chunk,
+    get_days_in_month, item_tabs_for, output_prefix, write_atomic,
+)
+from rollup import item_tab_parents
+from sku_index import ANALYSIS_MONTHS, CHUNK_SIZE, INVENTORY_DATA_PATH, RETAIL_DATA_PATH, SKU_KEYS, SKU_SOURCES
+
+# ========== 설정 ==========
+OUTPUT_PATH = Path(__file__).parent.parent / "public" / "data"
+SKETCH_PATH = Path(__file__).parent.parent / "data" / "sketches"
+
+HLL_PRECISION = 12  # 레지스터 2^12개 (표준오차 약 1.6%), 11 이상이어야 함 (나머지 비트를 float64로 정확히 계산)
+WEEKS_RELATIVE_ACCURACY = 0.02  # 재고주수 분위수 상대오차
+WEEKS_MIN = 0.01  # 이보다 작은 재고주수는 첫 구간
+WEEKS_MAX = 10_000  # 이보다 큰 재고주수는 마지막 구간
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+# HLL 종류 (레지스터 배열 순서)
+HLL_SETS = ["salesSkus", "salesStores", "stockSkus", "stockStores"]
+DATASET_HLL = {"retail": ("salesSkus", "salesStores"), "inventory": ("stockSkus", "stockStores")}
+
+LEAF_KEYS = ["category", "brand", "item_cat", "month", "op_group"]
+OP_GROUP_TOTAL = "total"
+
+_GAMMA = (1 + WEEKS_RELATIVE_ACCURACY) / (1 - WEEKS_RELATIVE_ACCURACY)
+WEEKS_BUCKETS = int(np.ceil(np.log(WEEKS_MAX / WEEKS_MIN) / np.log(_GAMMA))) + 2
+
+
+def hll_update_values(hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """64비트 해시 → (레지스터 번호, 레지스터 값 = 나머지 비트의 선행 0 개수 + 1)"""
+    rest_bits = 64 - HLL_PRECISION
+    hashes = hashes.astype(np.uint64)
+    index = (hashes >> np.uint64(rest_bits)).astype(np.int64)
+    rest = hashes & np.uint64((1 << rest_bits) - 1)
+    bit_length = np.frexp(rest.astype(np.float64))[1]  # rest = 0 이면 0
+    return index, (rest_bits - bit_length + 1).astype(np.uint8)
+
+
+def hll_estimate(registers: np.ndarray) -> np.ndarray:
+    """레지스터 (..., m) → 고유 개수 추정 (작은 구간은 linear counting)"""
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+def weeks_bucket(values: np.ndarray) -> np.ndarray:
+    """재고주수 → 구간 번호 (0: WEEKS_MIN 이하, 마지막: WEEKS_MAX 초과)"""
+    clipped = np.clip(values, WEEKS_MIN, WEEKS_MAX * _GAMMA)
+    bucket = np.ceil(np.log(clipped / WEEKS_MIN) / np.log(_GAMMA)).astype(np.int64)
+    return np.clip(bucket, 0, WEEKS_BUCKETS - 1)
+
+
+def weeks_quantiles(counts: np.ndarray, quantiles: List[float] = QUANTILES) -> Optional[List[float]]:
+    """구간별 개수 → 분위수 (구간 대표값, 상대오차 WEEKS_RELATIVE_ACCURACY)"""
+    total = counts.sum()
+    if total == 0:
+        return None
+    cumulative = np.cumsum(counts)
+    ranks = np.asarray(quantiles) * (total - 1)
+    buckets = np.searchsorted(cumulative, ranks, side="right")
+    values = WEEKS_MIN * np.power(_GAMMA, buckets) * 2 / (_GAMMA + 1)
+    values[buckets == 0] = WEEKS_MIN
+    return [round(float(v), 2) for v in values]
+
+
+class SketchTable:
+    """리프 셀별 스케치 (HLL 레지스터 + 재고주수 구간 개수 + 판매 없는 재고 SKU 수)"""
+
+    def __init__(self):
+        self.keys: Dict[Tuple, int] = {}
+        self.registers = np.zeros((0, len(HLL_SETS), 1 << HLL_PRECISION), dtype=np.uint8)
+        self.weeks = np.zeros((0, WEEKS_BUCKETS), dtype=np.int64)
+        self.no_sales = np.zeros(0, dtype=np.int64)
+
+    def rows(self, keys: List[Tuple]) -> np.ndarray:
+        """셀 키 → 행 번호 (없으면 추가, 배열은 2배씩 늘림)"""
+        for key in keys:
+            if key not in self.keys:
+                self.keys[key] = len(self.keys)
+        if len(self.keys) > len(self.no_sales):
+            capacity = max(len(self.keys), 2 * len(self.no_sales), 64)
+            grow = capacity - len(self.no_sales)
+            self.registers = np.concatenate([self.registers, np.zeros((grow,) + self.registers.shape[1:], np.uint8)])
+            self.weeks = np.concatenate([self.weeks, np.zeros((grow, WEEKS_BUCKETS), np.int64)])
+            self.no_sales = np.concatenate([self.no_sales, np.zeros(grow, np.int64)])
+        return np.array([self.keys[key] for key in keys], dtype=np.int64)
+
+    def add_hll(self, frame: pd.DataFrame, hll_set: str, hashes: np.ndarray) -> None:
+        """frame 행(리프 키 컬럼)별 해시를 해당 셀 HLL에 반영"""
+        cells = frame.groupby(LEAF_KEYS, sort=False).ngroup().to_numpy()
+        unique_keys = list(frame[LEAF_KEYS].drop_duplicates().itertuples(index=False, name=None))
+        rows = self.rows(unique_keys)[cells]
+        index, rank = hll_update_values(hashes)
+        # 같은 (셀, 레지스터) 는 max 1개로 줄인 뒤 반영
+        reduced = pd.DataFrame({"row": rows, "index": index, "rank": rank}).groupby(["row", "index"], sort=False)["rank"].max()
+        row_idx = reduced.index.get_level_values(0).to_numpy()
+        reg_idx = reduced.index.get_level_values(1).to_numpy()
+        target = self.registers[:, HLL_SETS.index(hll_set), :]
+        target[row_idx, reg_idx] = np.maximum(target[row_idx, reg_idx], reduced.to_numpy().astype(np.uint8))
+
+    def add_weeks(self, frame: pd.DataFrame) -> None:
+        """SKU 합계 행(stock_amt, sales_amt, days) → 재고 있는 SKU의 재고주수 분포 반영"""
+        frame = frame[frame["stock_amt"] > 0]
+        if frame.empty:
+            return
+        rows = self.rows(list(frame[LEAF_KEYS].itertuples(index=False, name=None)))
+        sales = frame["sales_amt"].to_numpy()
+        has_sales = sales > 0
+        np.add.at(self.no_sales, rows[~has_sales], 1)
+        weekly = sales[has_sales] / frame["days"].to_numpy()[has_sales] * 7
+        weeks = frame["stock_amt"].to_numpy()[has_sales] / weekly
+        np.add.at(self.weeks, (rows[has_sales], weeks_bucket(weeks)), 1)
+
+    def drop_months(self, months: List[str]) -> None:
+        """해당 월 셀 삭제 (--merge 전)"""
+        drop = set(months)
+        kept = [(key, row) for key, row in self.keys.items() if key[3] not in drop]
+        rows = np.array([row for _, row in kept], dtype=np.int64)
+        self.keys = {key: i for i, (key, _) in enumerate(kept)}
+        self.registers, self.weeks, self.no_sales = self.registers[rows], self.weeks[rows], self.no_sales[rows]
+
+    def save(self, path: Path) -> None:
+        n = len(self.keys)
+        keys = json.dumps(list(self.keys), ensure_ascii=False)
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer, keys=np.array(keys), registers=self.registers[:n], weeks=self.weeks[:n], no_sales=self.no_sales[:n],
+            precision=np.array(HLL_PRECISION), buckets=np.array(WEEKS_BUCKETS),
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, buffer.getvalue())
+
+    @classmethod
+    def load(cls, path: Path) -> "SketchTable":
+        table = cls()
+        with np.load(path) as data:
+            if int(data["precision"]) != HLL_PRECISION or int(data["buckets"]) != WEEKS_BUCKETS:
+                raise ValueError(f"스케치 설정이 바뀌었습니다. 전체 다시 계산하세요: {path}")
+            table.keys = {tuple(key): i for i, key in enumerate(json.loads(str(data["keys"])))}
+            table.registers, table.weeks, table.no_sales = data["registers"], data["weeks"], data["no_sales"]
+        return table
+
+    def merged(self, rows: List[int]) -> Dict:
+        """리프 셀 여러 개를 병합한 추정치"""
+        registers = self.registers[rows].max(axis=0)
+        weeks = self.weeks[rows].sum(axis=0)
+        estimates = {name: int(round(value)) for name, value in zip(HLL_SETS, hll_estimate(registers))}
+        estimates["stockWeeks"] = weeks_quantiles(weeks)
+        estimates["stockWeeksSkus"] = int(weeks.sum())
+        estimates["noSalesSkus"] = int(self.no_sales[rows].sum())
+        return estimates
+
+
+def iter_sketch_chunks(file_path: Path, dataset: str, year_month: str, all_categories: bool = False) -> Iterator[pd.DataFrame]:
+    """CSV 1개 → 청크별 (리프 키, SKU, 매장, 금액) 행 (채널 전체 기준)"""
+    encoding, amount_col, _, _, _, channel_groups = SKU_SOURCES[dataset]
+    usecols = ["Channel 2", "产品品牌", "产品大分类", "产品中分类", "运营基准", "产品季节", STORE_COLUMN] + list(SKU_COLUMNS) + [amount_col]
+
+    for chunk in pd.read_csv(
+        file_path,
+        chunksize=CHUNK_SIZE,
+        encoding=encoding,
+        usecols=usecols,
+        dtype={**{col: str for col in usecols}, amount_col: float},
+    ):
+        chunk = filter_chunk(chunk, all_categories)
+        chunk = chunk[chunk["Channel 2"].isin(list(channel_groups))]
+        if chunk.empty:
+            continue
+        frame = pd.DataFrame({
+            "category": chunk["产品大分类"].to_numpy(),
+            "brand": chunk["产品品牌"].to_numpy(),
+            "item_cat": chunk["产品中分类"].fillna("").to_numpy(),
+            "month": year_month,
+            "op_group": determine_operation_group_vectorized(chunk["运营基准"], chunk["产品季节"]),
+            "store": chunk[STORE_COLUMN].fillna("").to_numpy(),
+            "amount": chunk[amount_col].fillna(0.0).to_numpy(),
+        })
+        for source, name in SKU_COLUMNS.items():
+            frame[name] = chunk[source].fillna("").to_numpy()
+        yield frame
+
+
+def scan_sketches(
+    data_paths: Dict[str, Path],
+    months: List[str],
+    all_categories: bool = False,
+    spill_dir: Optional[Path] = None,
+    memory_limit_mb: Optional[float] = None,
+    table: Optional[SketchTable] = None
+) -> SketchTable:
+    """판매/재고 월 파일 → 리프 셀 스케치 (HLL은 청크마다, 재고주수는 SKU 합계 파티션마다 반영)"""
+    if spill_dir is not None and memory_limit_mb is None:
+        memory_limit_mb = SPILL_MEMORY_LIMIT_MB
+
+    table = table or SketchTable()
+    sku_row_keys = LEAF_KEYS + SKU_KEYS
+    aggregators: Dict[str, ExternalAggregator] = {}
+    try:
+        for dataset, data_path in data_paths.items():
+            value = "sales_amt" if dataset == "retail" else "stock_amt"
+            aggregator = ExternalAggregator(sku_row_keys, [value], spill_dir, memory_limit_mb)
+            aggregators[dataset] = aggregator
+            sku_set, store_set = DATASET_HLL[dataset]
+            for month in months:
+                file_path = data_path / f"{month}.csv"
+                if not file_path.exists():
+                    print(f"[WARNING] 파일이 존재하지 않습니다: {file_path}")
+                    continue
+                print(f"처리 중 (스케치 {dataset}): {file_path}")
+                for frame in iter_sketch_chunks(file_path, dataset, month, all_categories):
+                    table.add_hll(frame, sku_set, pd.util.hash_pandas_object(frame[SKU_KEYS], index=False).to_numpy())
+                    table.add_hll(frame, store_set, pd.util.hash_pandas_object(frame["store"], index=False).to_numpy())
+                    grouped = frame.rename(columns={"amount": value}).groupby(sku_row_keys, as_index=False, sort=False)[value].sum()
+                    aggregator.add(grouped)
+
+        count = SPILL_PARTITIONS if any(a.spilled for a in aggregators.values()) else 1
+        for p in range(count):
+            tables = [a.partition(p, count).set_index(sku_row_keys) for a in aggregators.values()]
+            tables = [t for t in tables if not t.empty]
+            if not tables:
+                continue
+            joined = pd.concat(tables, axis=1).reset_index()
+            for col in ("stock_amt", "sales_amt"):
+                joined[col] = joined[col].fillna(0.0) if col in joined else 0.0
+            month_days = {m: get_days_in_month(int(m[:4]), int(m[5:7])) for m in joined["month"].unique()}
+            joined["days"] = joined["month"].map(month_days)
+            table.add_weeks(joined)
+    finally:
+        for aggregator in aggregators.values():
+            aggregator.close()
+    return table
+
+
+def sketch_files(category: str, output_path: Path = OUTPUT_PATH, sketch_path: Path = SKETCH_PATH) -> Tuple[Path, Path]:
+    """(스케치 상태 파일, 추정치 JSON)"""
+    prefix = output_prefix(category)
+    return sketch_path / f"{prefix}_sketches.npz", output_path / f"{prefix}_sketch_summary.json"
+
+
+def build_estimates(table: SketchTable, category: str) -> Dict:
+    """리프 셀 → 아이템탭 / op_group(core, outlet, total) 단위로 병합한 추정치"""
+    groups: Dict[Tuple, List[int]] = {}
+    observed = set()
+    for (cell_category, brand, item_cat, month, op_group), row in table.keys.items():
+        if cell_category != category:
+            continue
+        for item_tab in item_tab_parents(category, item_cat):
+            observed.add(item_tab)
+            for group in (op_group, OP_GROUP_TOTAL):
+                groups.setdefault((brand, item_tab, month, group), []).append(row)
+
+    tab_order = {tab: i for i, tab in enumerate(item_tabs_for(category, observed))}
+    brands: Dict = {}
+    for (brand, item_tab, month, group), rows in sorted(groups.items()):
+        if item_tab not in tab_order:
+            continue
+        by_tab = brands.setdefault(brand, {}).setdefault(item_tab, {})
+        by_tab.setdefault(month, {})[group] = table.merged(rows)
+    # 아이템탭은 설정 순서로
+    return {brand: dict(sorted(tabs.items(), key=lambda kv: tab_order[kv[0]])) for brand, tabs in brands.items()}
+
+
+def write_estimates(table: SketchTable, category: str, output_path: Path = OUTPUT_PATH) -> Path:
+    """
+    파일 구조: {"months", "quantiles", "hllPrecision", "weeksRelativeAccuracy",
+               "brands": {브랜드: {아이템탭: {월: {core|outlet|total: {salesSkus, salesStores, stockSkus, stockStores,
+                                                                     stockWeeks: [분위수...], stockWeeksSkus, noSalesSkus}}}}}}
+    """
+    _, summary_file = sketch_files(category, output_path)
+    months = sorted({key[3] for key in table.keys if key[0] == category})
+    payload = {
+        "months": months,
+        "quantiles": QUANTILES,
+        "hllPrecision": HLL_PRECISION,
+        "weeksRelativeAccuracy": WEEKS_RELATIVE_ACCURACY,
+        "brands": build_estimates(table, category),
+    }
+    write_atomic(summary_file, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    print(f"[DONE] 스케치 지표 저장: {summary_file}")
+    return summary_file
+
+
+def main(
+    months: List[str],
+    all_categories: bool = False,
+    merge: bool = False,
+    spill_dir: Optional[Path] = None,
+    memory_limit_mb: Optional[float] = None
+) -> None:
+    data_paths = {"retail": RETAIL_DATA_PATH, "inventory": INVENTORY_DATA_PATH}
+    for dataset, data_path in data_paths.items():
+        encoding, amount_col, *_ = SKU_SOURCES[dataset]
+        abort_on_schema_drift(
+            [data_path / f"{m}.csv" for m in months],
+            ["Channel 2", "产品品牌", "产品大分类", "产品中分类", "运营基准", "产品季节", STORE_COLUMN] + list(SKU_COLUMNS) + [amount_col],
+            encoding,
+        )
+
+    # 대분류 모드마다 상태 파일이 따로라 병합은 기본 대분류 상태 파일 기준 (전체 대분류 모드는 대분류별 파일을 합쳐서 읽음)
+    table = SketchTable()
+    if merge:
+        categories = [TARGET_CATEGORY] if not all_categories else None
+        state_files = (
+            [sketch_files(c)[0] for c in categories] if categories else sorted(SKETCH_PATH.glob("*_sketches.npz"))
+        )
+        for state_file in state_files:
+            if not state_file.exists():
+                raise FileNotFoundError(f"스케치 상태 파일이 없습니다 (전체 실행 먼저): {state_file}")
+            loaded = SketchTable.load(state_file)
+            loaded.drop_months(months)
+            rows = table.rows(list(loaded.keys))
+            table.registers[rows], table.weeks[rows], table.no_sales[rows] = loaded.registers, loaded.weeks, loaded.no_sales
+
+    table = scan_sketches(data_paths, months, all_categories, spill_dir, memory_limit_mb, table)
+    categories = sorted({key[0] for key in table.keys}) if all_categories else [TARGET_CATEGORY]
+    for category in categories:
+        state_file, _ = sketch_files(category)
+        subset = SketchTable()
+        keys = [key for key in table.keys if key[0] == category]
+        rows = subset.rows(keys)
+        source = np.array([table.keys[key] for key in keys], dtype=np.int64)
+        subset.registers[rows], subset.weeks[rows], subset.no_sales[rows] = (
+            table.registers[source], table.weeks[source], table.no_sales[source]
+        )
+        subset.save(state_file)
+        write_estimates(subset, category)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="셀별 고유 SKU / 매장 수 (HLL) + SKU 재고주수 분위수 스케치")
+    parser.add_argument("--months", nargs="+", default=ANALYSIS_MONTHS, metavar="YYYY.MM")
+    parser.add_argument("--merge", nargs="+", metavar="YYYY.MM", help="해당 월만 다시 계산해서 기존 스케치에 반영")
+    parser.add_argument("--all-categories", action="store_true")
+    parser.add_argument("--spill-dir", type=Path, help="메모리 한도를 넘으면 SKU 합계를 내려쓸 폴더 (디스크 분할 집계)")
+    parser.add_argument("--memory-limit-mb", type=float, help=f"디스크 분할 집계 메모리 한도 (기본 {SPILL_MEMORY_LIMIT_MB} MB)")
+    args = parser.parse_args()
+    if args.merge:
+        main(args.merge, args.all_categories, True, args.spill_dir, args.memory_limit_mb)
+    else:
+        main(args.months, args.all_categories, False, args.spill_dir, args.memory_limit_mb)
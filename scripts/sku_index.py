@@ -0,0 +1,436 @@
+"""
+SKU 단위 인덱스 (품번 상세 / 정체재고 상세 드릴다운용)
+- (브랜드, prdt_cd, color_cd, size_cd, 월) 단위 재고/판매 금액·수량을 컬럼별 .npy 파일로 저장
+- 행은 (prdt_cd, color_cd, size_cd, 월, 브랜드) 순으로 정렬 → 품번 조회는 이진 탐색 1번
+- 중분류 조회용으로 (중분류, prdt_cd) 순 정렬 행 번호 배열을 따로 저장
+- 읽기 쪽은 np.load(mmap_mode="r")로 열어서 조회 구간만 디스크에서 읽음 (복사 없음)
+- 쓰기 쪽은 파티션별로 정렬한 run 을 k-way 병합해서 출력 .npy 에 순서대로 씀 (전체 테이블 정렬 없음)
+
+사용법:
+    python scripts/sku_index.py                       # 기본 대분류, ANALYSIS_MONTHS
+    python scripts/sku_index.py --months 2025.10 2025.11
+    python scripts/sku_index.py --spill-dir D:\\data\\_spill --memory-limit-mb 512   # 메모리가 작은 머신
+
+조회:
+    index = SkuIndex.open(Path("data/sku_index/accessory"))
+    index.style("M25FW0063", brand="MLB")
+    index.sku("M25FW0063", "BK", "M")
+    index.item_category("Shoes", brand="MLB", month="2025.11")
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from external_agg import SPILL_MEMORY_LIMIT_MB, SPILL_PARTITIONS, ExternalAggregator
+from inspect_schema import abort_on_schema_drift
+from preprocess_common import (
+    SALES_QTY_COLUMN, SKU_COLUMNS, STOCK_QTY_COLUMN, TARGET_CATEGORY, filter_chunk, output_prefix,
+)
+from rollup import INVENTORY_CHANNEL_GROUPS, SALES_CHANNEL_GROUPS
+
+# ========== 설정 ==========
+CHUNK_SIZE = 200_000
+RETAIL_DATA_PATH = Path(r"D:\data\retail")
+INVENTORY_DATA_PATH = Path(r"D:\data\inventory")
+SKU_INDEX_PATH = Path(__file__).parent.parent / "data" / "sku_index"
+
+ANALYSIS_MONTHS = [
+    "2024.01", "2024.02", "2024.03", "2024.04", "2024.05", "2024.06",
+    "2024.07", "2024.08", "2024.09", "2024.10", "2024.11", "2024.12",
+    "2025.01", "2025.02", "2025.03", "2025.04", "2025.05", "2025.06",
+    "2025.07", "2025.08", "2025.09", "2025.10", "2025.11"
+]
+
+SKU_KEYS = list(SKU_COLUMNS.values())  # prdt_cd, color_cd, size_cd
+ROW_KEYS = ["category", "brand", "item_cat"] + SKU_KEYS + ["month"]
+VALUE_COLUMNS = ["stock_amt", "stock_qty", "sales_amt", "sales_qty"]
+LABEL_COLUMNS = ["brand", "item_cat", "month"]  # 인덱스에는 int16 코드로 저장
+SORT_KEYS = SKU_KEYS + ["month", "brand", "item_cat"]  # 인덱스 기본 정렬 순서 (중분류는 같은 키의 순서 고정용)
+MERGE_BLOCK_ROWS = 1_000_000  # 정렬 run 병합 시 한 번에 읽는 행 수 (전체 run 합)
+
+# 데이터셋별 (인코딩, 금액 컬럼, 수량 컬럼, 출력 금액, 출력 수량, 전체 채널)
+SKU_SOURCES = {
+    "retail": ("utf-8", "吊牌金额", SALES_QTY_COLUMN, "sales_amt", "sales_qty", SALES_CHANNEL_GROUPS),
+    "inventory": ("utf-8-sig", "预计库存金额", STOCK_QTY_COLUMN, "stock_amt", "stock_qty", INVENTORY_CHANNEL_GROUPS),
+}
+
+
+def iter_sku_chunks(file_path: Path, dataset: str, year_month: str, all_categories: bool = False) -> Iterator[pd.DataFrame]:
+    """CSV 1개 → 청크별 (대분류, 브랜드, 중분류, SKU, 월) 단위 금액/수량 합계 (채널 전체 기준)"""
+    encoding, amount_col, qty_col, amount_out, qty_out, channel_groups = SKU_SOURCES[dataset]
+    group_cols = ["category", "brand", "item_cat"] + SKU_KEYS
+    usecols = ["Channel 2", "产品品牌", "产品大分类", "产品中分类"] + list(SKU_COLUMNS) + [amount_col, qty_col]
+
+    for chunk in pd.read_csv(
+        file_path,
+        chunksize=CHUNK_SIZE,
+        encoding=encoding,
+        usecols=usecols,
+        dtype={**{col: str for col in usecols}, amount_col: float, qty_col: float},
+    ):
+        chunk = filter_chunk(chunk, all_categories)
+        chunk = chunk[chunk["Channel 2"].isin(list(channel_groups))]
+        if chunk.empty:
+            continue
+        frame = chunk.rename(columns={"产品大分类": "category", "产品品牌": "brand", "产品中分类": "item_cat", **SKU_COLUMNS})
+        frame = frame[group_cols].fillna("")
+        frame[amount_out] = chunk[amount_col].fillna(0.0)
+        frame[qty_out] = chunk[qty_col].fillna(0.0)
+        grouped = frame.groupby(group_cols, as_index=False, sort=False)[[amount_out, qty_out]].sum()
+        grouped["month"] = year_month
+        yield grouped
+
+
+def iter_sku_partitions(
+    data_paths: Dict[str, Path],
+    months: List[str],
+    all_categories: bool = False,
+    spill_dir: Optional[Path] = None,
+    memory_limit_mb: Optional[float] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    판매/재고 월 파일 → 파티션별 SKU × 월 테이블 (없는 값은 0, 한 번에 파티션 1개만 메모리에 둠)
+    spill_dir 지정 시 데이터셋별 집계가 memory_limit_mb 를 넘으면 해시 파티션으로 디스크에 내려쓰고
+    판매/재고 조인도 파티션 단위로 함 (같은 키 → 같은 파티션, 파티션끼리 키 순서는 섞여 있음)
+    """
+    if spill_dir is not None and memory_limit_mb is None:
+        memory_limit_mb = SPILL_MEMORY_LIMIT_MB
+
+    aggregators: Dict[str, ExternalAggregator] = {}
+    try:
+        for dataset, data_path in data_paths.items():
+            _, _, _, amount_out, qty_out, _ = SKU_SOURCES[dataset]
+            aggregator = ExternalAggregator(ROW_KEYS, [amount_out, qty_out], spill_dir, memory_limit_mb)
+            aggregators[dataset] = aggregator
+            for month in months:
+                file_path = data_path / f"{month}.csv"
+                if not file_path.exists():
+                    print(f"[WARNING] 파일이 존재하지 않습니다: {file_path}")
+                    continue
+                print(f"처리 중 (SKU {dataset}): {file_path}")
+                for grouped in iter_sku_chunks(file_path, dataset, month, all_categories):
+                    aggregator.add(grouped)
+
+        count = SPILL_PARTITIONS if any(a.spilled for a in aggregators.values()) else 1
+        for p in range(count):
+            tables = [a.partition(p, count).set_index(ROW_KEYS) for a in aggregators.values()]
+            tables = [table for table in tables if not table.empty]
+            if not tables:
+                continue
+            table = pd.concat(tables, axis=1).reset_index()
+            for col in VALUE_COLUMNS:
+                table[col] = table[col].fillna(0.0) if col in table else 0.0
+            yield table[ROW_KEYS + VALUE_COLUMNS]
+    finally:
+        for aggregator in aggregators.values():
+            aggregator.close()
+
+
+def _encode(values: pd.Series) -> np.ndarray:
+    """문자열 → 고정 길이 UTF-8 바이트 배열 (바이트 순서 = 코드포인트 순서라 정렬이 그대로 유지)"""
+    return np.char.encode(values.to_numpy(dtype=str), "utf-8")
+
+
+class SortedRuns:
+    """
+    파티션 → 대분류별 정렬 run (인덱스 기본 정렬 순서, 문자열 컬럼은 UTF-8 바이트 배열)
+    spill_dir 가 있으면 run 마다 컬럼별 .npy 로 내려쓰고 memory map 으로 다시 열어서
+    병합할 때 run 별로 앞에서부터 블록 단위로만 읽음 (최대 메모리 ≈ 파티션 1개 + 병합 블록)
+    """
+
+    def __init__(self, spill_dir: Optional[Path] = None):
+        self.spill_root = Path(spill_dir) if spill_dir is not None else None
+        self.work_dir: Optional[Path] = None
+        self.runs: Dict[str, List[Dict[str, np.ndarray]]] = {}
+
+    def __enter__(self) -> "SortedRuns":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add(self, partition: pd.DataFrame) -> None:
+        for category, frame in partition.groupby("category", sort=False):
+            frame = frame.sort_values(SORT_KEYS, kind="stable")
+            run = {name: _encode(frame[name]) for name in SKU_KEYS + LABEL_COLUMNS}
+            run.update({col: frame[col].to_numpy(dtype=np.float64) for col in VALUE_COLUMNS})
+            self.runs.setdefault(category, []).append(self._store(run))
+
+    def _store(self, run: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        if self.spill_root is None:
+            return run
+        if self.work_dir is None:
+            self.spill_root.mkdir(parents=True, exist_ok=True)
+            self.work_dir = Path(tempfile.mkdtemp(prefix="runs-", dir=self.spill_root))
+        run_dir = self.work_dir / f"run-{sum(map(len, self.runs.values())):05d}"
+        run_dir.mkdir()
+        for name, values in run.items():
+            np.save(run_dir / f"{name}.npy", values)
+        return {name: np.load(run_dir / f"{name}.npy", mmap_mode="r") for name in run}
+
+    def categories(self) -> List[str]:
+        return sorted(self.runs)
+
+    def close(self) -> None:
+        self.runs = {}
+        if self.work_dir is not None:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.work_dir = None
+
+
+def _labels(runs: List[Dict[str, np.ndarray]], name: str, extra: Optional[List[str]] = None) -> List[str]:
+    values = set(extra or [])
+    for run in runs:
+        values.update(np.char.decode(np.unique(run[name]), "utf-8").tolist())
+    return sorted(values)
+
+
+def _block(run: Dict[str, np.ndarray], start: int, stop: int, widths: Dict[str, int], codes: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """run [start, stop) → 인덱스 컬럼 형식 (SKU 키는 전체 최대 길이, 라벨은 int16 코드)"""
+    block = {key: run[key][start:stop].astype(f"S{widths[key]}") for key in SKU_KEYS}
+    for name in LABEL_COLUMNS:
+        block[name] = np.searchsorted(codes[name], run[name][start:stop]).astype(np.int16)
+    for col in VALUE_COLUMNS:
+        block[col] = np.asarray(run[col][start:stop], dtype=np.float64)
+    return block
+
+
+def _sort_key(block: Dict[str, np.ndarray], widths: Dict[str, int]) -> np.ndarray:
+    """SORT_KEYS → 바이트 비교 순서가 같은 고정 길이 키 1개 (라벨 코드는 빅엔디언 2바이트)"""
+    parts = [block[key].view(np.uint8).reshape(-1, widths[key]) for key in SKU_KEYS]
+    parts += [block[name].astype(">u2").view(np.uint8).reshape(-1, 2) for name in SORT_KEYS[len(SKU_KEYS):]]
+    matrix = np.ascontiguousarray(np.hstack(parts))
+    return matrix.view(f"S{matrix.shape[1]}").ravel()
+
+
+def merge_runs(
+    runs: List[Dict[str, np.ndarray]],
+    widths: Dict[str, int],
+    codes: Dict[str, np.ndarray],
+    block_rows: int = MERGE_BLOCK_ROWS
+) -> Iterator[Dict[str, np.ndarray]]:
+    """정렬 run k개 → 전체 정렬 순서의 블록 (k-way 병합, run 마다 block_rows // k 행씩 읽음)"""
+    step = max(1, block_rows // max(1, len(runs)))
+    sizes = [len(run["month"]) for run in runs]
+    cursors = [0] * len(runs)
+    while True:
+        active = [i for i in range(len(runs)) if cursors[i] < sizes[i]]
+        if not active:
+            return
+        blocks = {i: _block(runs[i], cursors[i], min(cursors[i] + step, sizes[i]), widths, codes) for i in active}
+        keys = {i: _sort_key(blocks[i], widths) for i in active}
+        # 뒤에 행이 남은 run 의 블록 마지막 키 중 최솟값까지만 확정 (그 run 은 블록 전체가 나가므로 항상 진행)
+        limits = [keys[i][-1] for i in active if cursors[i] + len(keys[i]) < sizes[i]]
+        cutoff = min(limits) if limits else None
+        taken = []
+        for i in active:
+            n = len(keys[i]) if cutoff is None else int(np.searchsorted(keys[i], cutoff, "right"))
+            if n:
+                taken.append((blocks[i], keys[i][:n], n))
+                cursors[i] += n
+        order = np.argsort(np.concatenate([key for _, key, _ in taken]), kind="stable")
+        yield {name: np.concatenate([block[name][:n] for block, _, n in taken])[order] for name in taken[0][0]}
+
+
+def write_sku_index(runs: List[Dict[str, np.ndarray]], months: List[str], index_path: Path) -> None:
+    """
+    대분류 1개의 정렬 run → 컬럼별 .npy + meta.json
+    병합한 블록을 memory map 으로 연 출력 파일에 순서대로 바로 씀 (전체 테이블을 메모리에 올리지 않음)
+    """
+    rows = sum(len(run["month"]) for run in runs)
+    brands = _labels(runs, "brand")
+    item_cats = _labels(runs, "item_cat")
+    month_labels = _labels(runs, "month", months)
+    widths = {key: max([run[key].dtype.itemsize for run in runs] + [1]) for key in SKU_KEYS}
+    codes = {
+        name: np.array([label.encode("utf-8") for label in labels], dtype=bytes)
+        for name, labels in [("brand", brands), ("item_cat", item_cats), ("month", month_labels)]
+    }
+
+    dtypes = {key: np.dtype(f"S{widths[key]}") for key in SKU_KEYS}
+    dtypes.update({name: np.dtype(np.int16) for name in LABEL_COLUMNS})
+    dtypes.update({col: np.dtype(np.float64) for col in VALUE_COLUMNS})
+    tmp_path = begin_column_dir(index_path)
+    columns = {
+        name: np.lib.format.open_memmap(tmp_path / f"{name}.npy", mode="w+", dtype=dtype, shape=(rows,))
+        for name, dtype in dtypes.items()
+    }
+    # 기본 정렬: prdt_cd, color_cd, size_cd, 월, 브랜드 (, 중분류)
+    position = 0
+    for block in merge_runs(runs, widths, codes):
+        count = len(block["month"])
+        for name, values in block.items():
+            columns[name][position:position + count] = values
+        position += count
+    # 중분류 조회용 행 번호 (중분류, prdt_cd 순)
+    by_item_cat = np.argsort(columns["item_cat"], kind="stable").astype(np.int64)
+    item_cat_offsets = np.searchsorted(columns["item_cat"][by_item_cat], np.arange(len(item_cats) + 1), "left")
+    for values in columns.values():
+        values.flush()
+    columns.clear()  # 폴더 교체 전에 memory map 닫기
+    np.save(tmp_path / "by_item_cat.npy", by_item_cat)
+
+    meta = {
+        "rows": int(rows),
+        "brands": brands,
+        "itemCategories": item_cats,
+        "itemCategoryOffsets": item_cat_offsets.tolist(),  # by_item_cat 안에서 중분류별 시작 위치
+        "months": month_labels,
+        "columns": sorted(list(dtypes) + ["by_item_cat"]),
+    }
+    commit_column_dir(index_path, tmp_path, meta)
+    print(f"[DONE] SKU 인덱스 저장: {index_path} ({meta['rows']:,}행)")
+
+
+def begin_column_dir(path: Path) -> Path:
+    """컬럼 폴더를 쓸 빈 임시 폴더"""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+    return tmp_path
+
+
+def commit_column_dir(path: Path, tmp_path: Path, meta: Dict) -> None:
+    """임시 폴더에 meta.json 을 쓰고 폴더 단위로 교체 (읽는 쪽이 반쯤 쓴 인덱스를 보지 않도록)"""
+    with open(tmp_path / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    old_path = path.with_name(f".{path.name}.old")
+    if path.exists():
+        path.rename(old_path)
+    tmp_path.rename(path)
+    if old_path.exists():
+        shutil.rmtree(old_path)
+
+
+def write_column_dir(path: Path, columns: Dict[str, np.ndarray], meta: Dict) -> None:
+    """컬럼별 .npy + meta.json ("columns" 목록 추가) 폴더 저장"""
+    tmp_path = begin_column_dir(path)
+    for name, values in columns.items():
+        np.save(tmp_path / f"{name}.npy", values)
+    commit_column_dir(path, tmp_path, {**meta, "columns": sorted(columns)})
+
+
+class SkuIndex:
+    """메모리 맵 SKU 인덱스 조회 (조회 결과만 DataFrame으로 복사)"""
+
+    def __init__(self, path: Path, meta: Dict, columns: Dict[str, np.ndarray]):
+        self.path = path
+        self.meta = meta
+        self.columns = columns
+        self._brand_codes = {brand: i for i, brand in enumerate(meta["brands"])}
+        self._item_cat_codes = {item: i for i, item in enumerate(meta["itemCategories"])}
+        self._month_codes = {month: i for i, month in enumerate(meta["months"])}
+
+    @classmethod
+    def open(cls, path: Path) -> "SkuIndex":
+        with open(path / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        columns = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in meta["columns"]}
+        return cls(path, meta, columns)
+
+    def _rows(self, rows) -> pd.DataFrame:
+        """행 번호(범위 또는 배열) → 결과 DataFrame"""
+        frame = pd.DataFrame({
+            "brand": np.asarray(self.meta["brands"], dtype=object)[self.columns["brand"][rows]],
+            "item_cat": np.asarray(self.meta["itemCategories"], dtype=object)[self.columns["item_cat"][rows]],
+            **{key: np.char.decode(self.columns[key][rows], "utf-8") for key in SKU_KEYS},
+            "month": np.asarray(self.meta["months"], dtype=object)[self.columns["month"][rows]],
+            **{col: np.asarray(self.columns[col][rows]) for col in VALUE_COLUMNS},
+        })
+        return frame
+
+    def _filter(self, frame: pd.DataFrame, brand: Optional[str], month: Optional[str]) -> pd.DataFrame:
+        if brand is not None:
+            frame = frame[frame["brand"] == brand]
+        if month is not None:
+            frame = frame[frame["month"] == month]
+        return frame.reset_index(drop=True)
+
+    def _prefix_range(self, column: str, start: int, stop: int, value: str) -> Tuple[int, int]:
+        """[start, stop) 구간에서 column == value 인 행 범위 (구간 안에서 column 정렬 보장)"""
+        values = self.columns[column][start:stop]
+        key = value.encode("utf-8")
+        return start + int(np.searchsorted(values, key, "left")), start + int(np.searchsorted(values, key, "right"))
+
+    def style(self, prdt_cd: str, brand: Optional[str] = None, month: Optional[str] = None) -> pd.DataFrame:
+        """품번 1개의 컬러 × 사이즈 × 월 행"""
+        start, stop = self._prefix_range("prdt_cd", 0, self.meta["rows"], prdt_cd)
+        return self._filter(self._rows(slice(start, stop)), brand, month)
+
+    def sku(
+        self,
+        prdt_cd: str,
+        color_cd: Optional[str] = None,
+        size_cd: Optional[str] = None,
+        brand: Optional[str] = None
+    ) -> pd.DataFrame:
+        """품번 + 컬러 (+ 사이즈) 월별 행"""
+        start, stop = self._prefix_range("prdt_cd", 0, self.meta["rows"], prdt_cd)
+        if color_cd is not None:
+            start, stop = self._prefix_range("color_cd", start, stop, color_cd)
+            if size_cd is not None:
+                start, stop = self._prefix_range("size_cd", start, stop, size_cd)
+        frame = self._rows(slice(start, stop))
+        if size_cd is not None and color_cd is None:
+            frame = frame[frame["size_cd"] == size_cd]
+        return self._filter(frame, brand, None)
+
+    def item_category(self, item_cat: str, brand: Optional[str] = None, month: Optional[str] = None) -> pd.DataFrame:
+        """중분류 1개의 전체 SKU 행"""
+        code = self._item_cat_codes.get(item_cat)
+        if code is None:
+            return self._rows(slice(0, 0))
+        offsets = self.meta["itemCategoryOffsets"]
+        rows = np.asarray(self.columns["by_item_cat"][offsets[code]:offsets[code + 1]])
+        if month is not None:
+            rows = rows[self.columns["month"][rows] == self._month_codes.get(month, -1)]
+        if brand is not None:
+            rows = rows[self.columns["brand"][rows] == self._brand_codes.get(brand, -1)]
+        return self._rows(rows)
+
+
+def sku_index_path(category: str = TARGET_CATEGORY) -> Path:
+    return SKU_INDEX_PATH / output_prefix(category)
+
+
+def main(
+    months: List[str],
+    all_categories: bool = False,
+    spill_dir: Optional[Path] = None,
+    memory_limit_mb: Optional[float] = None
+) -> None:
+    data_paths = {"retail": RETAIL_DATA_PATH, "inventory": INVENTORY_DATA_PATH}
+    for dataset, data_path in data_paths.items():
+        encoding, amount_col, qty_col, *_ = SKU_SOURCES[dataset]
+        abort_on_schema_drift(
+            [data_path / f"{m}.csv" for m in months],
+            ["Channel 2", "产品品牌", "产品大分类", "产品中分类"] + list(SKU_COLUMNS) + [amount_col, qty_col],
+            encoding,
+        )
+
+    with SortedRuns(spill_dir) as runs:
+        for partition in iter_sku_partitions(data_paths, months, all_categories, spill_dir, memory_limit_mb):
+            runs.add(partition)
+        categories = runs.categories() if all_categories else [TARGET_CATEGORY]
+        SKU_INDEX_PATH.mkdir(parents=True, exist_ok=True)
+        for category in categories:
+            write_sku_index(runs.runs.get(category, []), months, sku_index_path(category))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SKU 단위 인덱스 생성")
+    parser.add_argument("--months", nargs="+", default=ANALYSIS_MONTHS, metavar="YYYY.MM")
+    parser.add_argument("--all-categories", action="store_true")
+    parser.add_argument("--spill-dir", type=Path, help="메모리 한도를 넘으면 집계를 내려쓸 폴더 (디스크 분할 집계)")
+    parser.add_argument("--memory-limit-mb", type=float, help=f"디스크 분할 집계 메모리 한도 (기본 {SPILL_MEMORY_LIMIT_MB} MB)")
+    args = parser.parse_args()
+    main(args.months, args.all_categories, args.spill_dir, args.memory_limit_mb)
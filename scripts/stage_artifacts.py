@@ -0,0 +1,187 @@
+"""
+단계 간 중간 산출물 (Arrow IPC / Feather v2)
+- 요약 저장소(output_layout)가 JSON을 쓸 때마다 같은 값을 긴 테이블로 data/artifacts/{prefix}_{dataset}_summary.arrow 에 씀
+    컬럼: brand, item_tab, month + 필드 ({채널}_{core|outlet}, OR_sales_* ...), 정수 필드는 int64 / 나머지 float64, 없는 칸은 null
+    비압축 Feather → 읽는 쪽은 memory_map 으로 필요한 컬럼만 (JSON 파싱 / 중첩 dict 순회 없음, 복사 없음)
+- 정수 필드는 pandas nullable Int64 로 읽어서 null 이 있어도 정수 유지
+- 메타데이터에 원본 JSON(단일 파일 / 월별 인덱스)의 경로·크기·수정 시각과 brands 외 summary 키(months, 월별 메타 등)를 기록
+  read_summary 는 store.read() 와 같은 summary 구조를 돌려줌 (큐브 / 재고 타임라인 / 시나리오 단계)
+  읽을 때 원본과 다르면 (다른 출력 경로, JSON만 따로 바뀐 경우) None → 호출하는 쪽은 JSON으로 대체
+- JSON은 프론트엔드 게시용으로 그대로 유지
+- pyarrow 미설치 환경에서는 쓰지도 읽지도 않음 (pip install pyarrow)
+"""
+
+import io
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from preprocess_common import output_prefix, write_atomic
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+# ========== 설정 ==========
+ARTIFACT_PATH = Path(__file__).parent.parent / "data" / "artifacts"
+KEY_COLUMNS = ["brand", "item_tab", "month"]
+STAMP_KEY = b"source"
+META_KEY = b"summary"
+
+
+def artifact_file(category: str, dataset: str, path: Optional[Path] = None) -> Path:
+    return (path or ARTIFACT_PATH) / f"{output_prefix(category)}_{dataset}_summary.arrow"
+
+
+def source_stamp(source: Path) -> Dict:
+    """원본 JSON 식별 정보 (경로 + 크기 + 수정 시각)"""
+    stat = source.stat()
+    return {"path": str(source.resolve()), "size": stat.st_size, "mtimeNs": stat.st_mtime_ns}
+
+
+def summary_table(brands: Dict) -> "pa.Table":
+    """brands → 아이템탭 → 월 → 필드 트리 → 긴 테이블 (필드 순서는 처음 나온 순서)"""
+    keys: Dict[str, List] = {column: [] for column in KEY_COLUMNS}
+    fields: Dict[str, List] = {}
+    row = 0
+    for brand, tabs in brands.items():
+        for item_tab, by_month in tabs.items():
+            for month, values in by_month.items():
+                keys["brand"].append(brand)
+                keys["item_tab"].append(item_tab)
+                keys["month"].append(month)
+                for field, value in values.items():
+                    fields.setdefault(field, [None] * row).append(value)
+                row += 1
+                for column in fields.values():
+                    if len(column) < row:
+                        column.append(None)
+    columns = {column: pa.array(values, pa.string()) for column, values in keys.items()}
+    for field, values in fields.items():
+        is_int = all(value is None or isinstance(value, int) for value in values)
+        columns[field] = pa.array(values, pa.int64() if is_int else pa.float64())
+    return pa.table(columns)
+
+
+def summary_meta(summary: Dict) -> Dict:
+    """brands 를 뺀 summary 키 (months, unexpectedCategories, daysInMonth ...)"""
+    return {key: value for key, value in summary.items() if key != "brands"}
+
+
+def _write(table: "pa.Table", category: str, dataset: str, source: Path, meta: Dict, path: Optional[Path]) -> None:
+    """비압축 Feather 로 원자적 쓰기 (메타데이터에 원본 식별 정보 + summary 키)"""
+    target_file = artifact_file(category, dataset, path)
+    target_file.parent.mkdir(parents=True, exist_ok=True)
+    table = table.replace_schema_metadata({
+        STAMP_KEY: json.dumps(source_stamp(source)).encode("utf-8"),
+        META_KEY: json.dumps(meta, ensure_ascii=False).encode("utf-8"),
+    })
+    buffer = io.BytesIO()
+    feather.write_feather(table, buffer, compression="uncompressed")
+    write_atomic(target_file, buffer.getvalue())
+
+
+def _open(category: str, dataset: str, source: Path, path: Optional[Path]) -> Optional["pa.Table"]:
+    """원본과 맞는 산출물만 memory map 으로 열기"""
+    target_file = artifact_file(category, dataset, path)
+    if pa is None or not target_file.exists() or not source.exists():
+        return None
+    table = feather.read_table(target_file, memory_map=True)
+    metadata = table.schema.metadata or {}
+    stamp = metadata.get(STAMP_KEY)
+    if stamp is None or META_KEY not in metadata or json.loads(stamp) != source_stamp(source):
+        return None
+    return table
+
+
+def write_summary_artifact(category: str, dataset: str, summary: Dict, source: Path, path: Optional[Path] = None) -> None:
+    """전체 summary → 산출물 (source: 방금 쓴 JSON / 인덱스 파일)"""
+    if pa is None:
+        return
+    _write(summary_table(summary["brands"]), category, dataset, source, summary_meta(summary), path)
+
+
+def is_current(category: str, dataset: str, source: Path, path: Optional[Path] = None) -> bool:
+    return _open(category, dataset, source, path) is not None
+
+
+def merge_summary_artifact(
+    category: str,
+    dataset: str,
+    month_brands: Dict[str, Dict],
+    month_meta: Optional[Dict[str, Dict]],
+    source: Path,
+    was_current: bool,
+    read_full: Callable[[], Dict],
+    path: Optional[Path] = None
+) -> None:
+    """
+    월 병합 후 산출물 갱신
+    병합 전에 원본과 맞았으면 (was_current) 기존 테이블에서 병합 월만 바꾸고, 아니면 read_full() 로 전체 재작성
+    """
+    if pa is None:
+        return
+    if not was_current:
+        full = read_full()
+        _write(summary_table(full["brands"]), category, dataset, source, summary_meta(full), path)
+        return
+    existing = feather.read_table(artifact_file(category, dataset, path), memory_map=True)
+    meta = json.loads(existing.schema.metadata[META_KEY])
+    meta["months"] = sorted(set(meta["months"]) | set(month_brands))
+    for key, values in (month_meta or {}).items():
+        meta.setdefault(key, {}).update(values)
+    kept = existing.filter(pc.invert(pc.is_in(existing["month"], value_set=pa.array(list(month_brands), pa.string()))))
+    brands: Dict = {}
+    for month, by_brand in month_brands.items():
+        for brand, tabs in by_brand.items():
+            for item_tab, fields in tabs.items():
+                brands.setdefault(brand, {}).setdefault(item_tab, {})[month] = fields
+    merged = pa.concat_tables([kept.replace_schema_metadata(None), summary_table(brands)], promote_options="permissive")
+    _write(merged, category, dataset, source, meta, path)
+
+
+def read_summary_table(
+    category: str,
+    dataset: str,
+    source: Path,
+    columns: Optional[List[str]] = None,
+    months: Optional[List[str]] = None,
+    path: Optional[Path] = None
+) -> Optional[pd.DataFrame]:
+    """
+    산출물 → DataFrame (KEY_COLUMNS + columns, months 지정 시 해당 월만)
+    pyarrow 가 없거나 산출물이 없거나 원본 JSON과 맞지 않으면 None
+    없는 필드 컬럼은 null 로 채움
+    """
+    table = _open(category, dataset, source, path)
+    if table is None:
+        return None
+    if months is not None:
+        table = table.filter(pc.is_in(table["month"], value_set=pa.array(list(months), pa.string())))
+    if columns is not None:
+        for column in columns:
+            if column not in table.column_names:
+                table = table.append_column(column, pa.nulls(len(table), pa.int64()))
+        table = table.select(KEY_COLUMNS + [c for c in columns if c not in KEY_COLUMNS])
+    return table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+
+def read_summary(category: str, dataset: str, source: Path, path: Optional[Path] = None) -> Optional[Dict]:
+    """
+    산출물 → summary 구조 (store.read() 와 같은 모양, null 칸은 필드에서 빠짐)
+    pyarrow 가 없거나 산출물이 없거나 원본 JSON과 맞지 않으면 None
+    """
+    table = _open(category, dataset, source, path)
+    if table is None:
+        return None
+    fields = [column for column in table.column_names if column not in KEY_COLUMNS]
+    brands: Dict = {}
+    for row in table.to_pylist():
+        values = {field: row[field] for field in fields if row[field] is not None}
+        brands.setdefault(row["brand"], {}).setdefault(row["item_tab"], {})[row["month"]] = values
+    return {**json.loads(table.schema.metadata[META_KEY]), "brands": brands}
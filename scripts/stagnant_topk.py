@@ -0,0 +1,248 @@
+"""
+정체재고 상세용 상위 K개 품번 (브랜드 × 중분류 × 월 × operation_group 셀별)
+- 판매/재고 월 파일을 청크 단위로 읽어 (대분류, 브랜드, 중분류, 월, op_group, prdt_cd) 합계를 만들고
+  (external_agg.ExternalAggregator 디스크 분할 집계, 기본은 시스템 임시 폴더 + 한도 SPILL_MEMORY_LIMIT_MB
+   → 한도를 넘으면 해시 파티션으로 내려써서 한 번에 파티션 1개만 메모리에 올림)
+- 품번 합계가 확정되는 파티션 단위로 흘려보내면서 셀마다 크기 K인 힙 2개만 유지
+    byStock : 재고금액 큰 순
+    byRatio : 판매 ÷ 재고 낮은 순 (재고 있는 품번만, 같으면 재고금액 큰 순)
+- 과시즌 품번만 대상 (prdt_cd 2~3번째 자리 연도가 해당 월 연도 / 다음 연도면 당시즌 / 차기시즌으로 제외,
+  pages/api/stagnant-stock.ts 의 시즌 구분과 동일)
+- 결과: public/data/{prefix}_stagnant_topk.json
+
+사용법:
+    python scripts/stagnant_topk.py [--months 2025.10 2025.11] [--top-k 20] [--all-categories]
+    python scripts/stagnant_topk.py --spill-dir D:\\data\\_spill --memory-limit-mb 512   # 내려쓸 폴더 / 한도 지정
+"""
+
+import argparse
+import heapq
+import json
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from external_agg import SPILL_MEMORY_LIMIT_MB, SPILL_PARTITIONS, ExternalAggregator
+from inspect_schema import abort_on_schema_drift
+from preprocess_common import (
+    SKU_COLUMNS, TARGET_CATEGORY, determine_operation_group_vectorized, filter_chunk, output_prefix, write_atomic,
+)
+from sku_index import ANALYSIS_MONTHS, CHUNK_SIZE, INVENTORY_DATA_PATH, RETAIL_DATA_PATH, SKU_SOURCES
+
+# ========== 설정 ==========
+OUTPUT_PATH = Path(__file__).parent.parent / "public" / "data"
+TOP_K = 20
+PAST_SEASON_ONLY = True
+SPILL_DIR = Path(tempfile.gettempdir())  # 기본 디스크 분할 집계 폴더 (작업 후 spill-* 폴더는 삭제됨)
+
+STYLE_COLUMN = next(source for source, name in SKU_COLUMNS.items() if name == "prdt_cd")
+CELL_KEYS = ["category", "brand", "item_cat", "month", "op_group"]
+ROW_KEYS = CELL_KEYS + ["prdt_cd"]
+VALUE_COLUMNS = ["stock_amt", "stock_qty", "sales_amt", "sales_qty"]
+ENTRY_FIELDS = ["prdt_cd", "stock_amt", "stock_qty", "sales_amt", "sales_qty", "sellThrough", "ratio"]
+
+
+def iter_style_chunks(file_path: Path, dataset: str, year_month: str, all_categories: bool = False) -> Iterator[pd.DataFrame]:
+    """CSV 1개 → 청크별 (대분류, 브랜드, 중분류, 월, op_group, prdt_cd) 금액/수량 합계 (채널 전체 기준)"""
+    encoding, amount_col, qty_col, amount_out, qty_out, channel_groups = SKU_SOURCES[dataset]
+    usecols = ["Channel 2", "产品品牌", "产品大分类", "产品中分类", "运营基准", "产品季节", STYLE_COLUMN, amount_col, qty_col]
+
+    for chunk in pd.read_csv(
+        file_path,
+        chunksize=CHUNK_SIZE,
+        encoding=encoding,
+        usecols=usecols,
+        dtype={**{col: str for col in usecols}, amount_col: float, qty_col: float},
+    ):
+        chunk = filter_chunk(chunk, all_categories)
+        chunk = chunk[chunk["Channel 2"].isin(list(channel_groups))]
+        if chunk.empty:
+            continue
+        frame = pd.DataFrame({
+            "category": chunk["产品大分类"].to_numpy(),
+            "brand": chunk["产品品牌"].to_numpy(),
+            "item_cat": chunk["产品中分类"].fillna("").to_numpy(),
+            "month": year_month,
+            "op_group": determine_operation_group_vectorized(chunk["运营基准"], chunk["产品季节"]),
+            "prdt_cd": chunk[STYLE_COLUMN].fillna("").to_numpy(),
+            amount_out: chunk[amount_col].fillna(0.0).to_numpy(),
+            qty_out: chunk[qty_col].fillna(0.0).to_numpy(),
+        })
+        yield frame.groupby(ROW_KEYS, as_index=False, sort=False)[[amount_out, qty_out]].sum()
+
+
+def is_past_season(prdt_cd: pd.Series, month: pd.Series) -> np.ndarray:
+    """prdt_cd 시즌 연도(2~3번째 자리)가 해당 월 연도 / 다음 연도가 아니면 과시즌"""
+    season_year = prdt_cd.str[1:3]
+    current = month.str[2:4]
+    following = ((month.str[:4].astype(int) + 1) % 100).map("{:02d}".format)
+    return ~((season_year == current) | (season_year == following)).to_numpy()
+
+
+class TopKCells:
+    """셀별 크기 K 힙 2개 (재고금액 큰 순 / 판매÷재고 낮은 순)"""
+
+    def __init__(self, k: int):
+        self.k = k
+        self.by_stock: Dict[Tuple, List] = {}
+        self.by_ratio: Dict[Tuple, List] = {}
+        self.stock_totals: Dict[Tuple, float] = {}
+
+    @staticmethod
+    def _push(heap: List, k: int, item: Tuple) -> None:
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def add(self, frame: pd.DataFrame) -> None:
+        """
+        품번 합계가 확정된 행 묶음 추가
+        셀마다 상위 K개만 먼저 골라서 (정렬 + head) 힙에 넣음
+        """
+        if frame.empty:
+            return
+        # 중분류 재고 합계 (정체재고 비율 분모, 과시즌 필터 전 전체 기준)
+        for key, total in frame.groupby(["category", "brand", "item_cat", "month"], sort=False)["stock_amt"].sum().items():
+            self.stock_totals[key] = self.stock_totals.get(key, 0.0) + total
+
+        frame = frame[frame["stock_amt"] > 0]
+        if PAST_SEASON_ONLY:
+            frame = frame[is_past_season(frame["prdt_cd"], frame["month"])]
+        if frame.empty:
+            return
+        frame = frame.assign(sellThrough=frame["sales_amt"] / frame["stock_amt"])
+
+        heaviest = frame.sort_values("stock_amt", ascending=False).groupby(CELL_KEYS, sort=False).head(self.k)
+        for row in heaviest.itertuples(index=False):
+            cell = tuple(getattr(row, key) for key in CELL_KEYS)
+            self._push(self.by_stock.setdefault(cell, []), self.k, (row.stock_amt, row.prdt_cd, row))
+
+        slowest = frame.sort_values(["sellThrough", "stock_amt"], ascending=[True, False]).groupby(CELL_KEYS, sort=False).head(self.k)
+        for row in slowest.itertuples(index=False):
+            cell = tuple(getattr(row, key) for key in CELL_KEYS)
+            self._push(self.by_ratio.setdefault(cell, []), self.k, (-row.sellThrough, row.stock_amt, row.prdt_cd, row))
+
+    def _entry(self, row, mid_total: float) -> List:
+        ratio = row.sales_amt / mid_total if mid_total > 0 else 0.0
+        return [
+            row.prdt_cd, round(row.stock_amt, 2), round(row.stock_qty, 2), round(row.sales_amt, 2),
+            round(row.sales_qty, 2), round(row.sellThrough, 6), round(ratio, 8),
+        ]
+
+    def result(self, category: str) -> Dict:
+        """{브랜드: {중분류: {월: {op_group: {"byStock": [...], "byRatio": [...]}}}}}"""
+        cells: Dict = {}
+        for name, heaps in (("byStock", self.by_stock), ("byRatio", self.by_ratio)):
+            for cell, heap in heaps.items():
+                cell_category, brand, item_cat, month, op_group = cell
+                if cell_category != category:
+                    continue
+                mid_total = self.stock_totals.get((cell_category, brand, item_cat, month), 0.0)
+                ordered = sorted(heap, reverse=True)
+                slot = cells.setdefault(brand, {}).setdefault(item_cat, {}).setdefault(month, {}).setdefault(op_group, {})
+                slot[name] = [self._entry(item[-1], mid_total) for item in ordered]
+        return cells
+
+
+def scan_top_k(
+    data_paths: Dict[str, Path],
+    months: List[str],
+    k: int = TOP_K,
+    all_categories: bool = False,
+    spill_dir: Path = SPILL_DIR,
+    memory_limit_mb: float = SPILL_MEMORY_LIMIT_MB
+) -> TopKCells:
+    """
+    판매/재고 월 파일 → 셀별 상위 K개 (파티션 단위로 판매/재고 조인 후 힙에 반영)
+    집계가 memory_limit_mb 를 넘으면 spill_dir 에 내려쓰므로 최대 메모리 ≈ 한도 + 파티션 1개
+    """
+    top_k = TopKCells(k)
+    aggregators: Dict[str, ExternalAggregator] = {}
+    try:
+        for dataset, data_path in data_paths.items():
+            _, _, _, amount_out, qty_out, _ = SKU_SOURCES[dataset]
+            aggregator = ExternalAggregator(ROW_KEYS, [amount_out, qty_out], spill_dir, memory_limit_mb)
+            aggregators[dataset] = aggregator
+            for month in months:
+                file_path = data_path / f"{month}.csv"
+                if not file_path.exists():
+                    print(f"[WARNING] 파일이 존재하지 않습니다: {file_path}")
+                    continue
+                print(f"처리 중 (상위 품번 {dataset}): {file_path}")
+                for grouped in iter_style_chunks(file_path, dataset, month, all_categories):
+                    aggregator.add(grouped)
+
+        count = SPILL_PARTITIONS if any(a.spilled for a in aggregators.values()) else 1
+        for p in range(count):
+            tables = [a.partition(p, count).set_index(ROW_KEYS) for a in aggregators.values()]
+            tables = [table for table in tables if not table.empty]
+            if not tables:
+                continue
+            joined = pd.concat(tables, axis=1).reset_index()
+            for col in VALUE_COLUMNS:
+                joined[col] = joined[col].fillna(0.0) if col in joined else 0.0
+            top_k.add(joined)
+    finally:
+        for aggregator in aggregators.values():
+            aggregator.close()
+    return top_k
+
+
+def top_k_file(output_path: Path, category: str) -> Path:
+    return output_path / f"{output_prefix(category)}_stagnant_topk.json"
+
+
+def write_top_k(top_k: TopKCells, category: str, months: List[str], output_path: Path = OUTPUT_PATH) -> Path:
+    """
+    파일 구조: {"k", "months", "fields", "cells": {브랜드: {중분류: {월: {op_group: {"byStock": [행...], "byRatio": [행...]}}}}}}
+    행은 fields 순서 리스트, ratio = 판매 ÷ 중분류 기말재고 (정체재고 판단 비율)
+    """
+    payload = {
+        "k": top_k.k,
+        "months": months,
+        "pastSeasonOnly": PAST_SEASON_ONLY,
+        "fields": ENTRY_FIELDS,
+        "cells": top_k.result(category),
+    }
+    target_file = top_k_file(output_path, category)
+    write_atomic(target_file, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    print(f"[DONE] 정체재고 상위 {top_k.k}개 품번 저장: {target_file}")
+    return target_file
+
+
+def main(
+    months: List[str],
+    k: int = TOP_K,
+    all_categories: bool = False,
+    spill_dir: Path = SPILL_DIR,
+    memory_limit_mb: float = SPILL_MEMORY_LIMIT_MB
+) -> None:
+    data_paths = {"retail": RETAIL_DATA_PATH, "inventory": INVENTORY_DATA_PATH}
+    for dataset, data_path in data_paths.items():
+        encoding, amount_col, qty_col, *_ = SKU_SOURCES[dataset]
+        abort_on_schema_drift(
+            [data_path / f"{m}.csv" for m in months],
+            ["Channel 2", "产品品牌", "产品大分类", "产品中分类", "运营基准", "产品季节", STYLE_COLUMN, amount_col, qty_col],
+            encoding,
+        )
+
+    top_k = scan_top_k(data_paths, months, k, all_categories, spill_dir, memory_limit_mb)
+    categories = sorted({cell[0] for cell in top_k.by_stock}) if all_categories else [TARGET_CATEGORY]
+    OUTPUT_PATH.mkdir(parents=True, exist_ok=True)
+    for category in categories:
+        write_top_k(top_k, category, months)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="정체재고 상세용 셀별 상위 K개 품번")
+    parser.add_argument("--months", nargs="+", default=ANALYSIS_MONTHS, metavar="YYYY.MM")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--all-categories", action="store_true")
+    parser.add_argument("--spill-dir", type=Path, default=SPILL_DIR, help=f"메모리 한도를 넘으면 집계를 내려쓸 폴더 (기본 {SPILL_DIR})")
+    parser.add_argument("--memory-limit-mb", type=float, default=SPILL_MEMORY_LIMIT_MB, help=f"디스크 분할 집계 메모리 한도 (기본 {SPILL_MEMORY_LIMIT_MB} MB)")
+    args = parser.parse_args()
+    main(args.months, args.top_k, args.all_categories, args.spill_dir, args.memory_limit_mb)
@@ -0,0 +1,324 @@
+"""
+SKU 재고 이력 저장소 (월별 재고 스냅샷을 기준 스냅샷 + 변경분으로 압축)
+- SKU 사전: (브랜드, 중분류, prdt_cd, color_cd, size_cd) → sku_id (처음 나온 순서로 부여, 한 번 정하면 안 바뀜)
+  사전 행은 (prdt_cd, color_cd, size_cd, 브랜드, 중분류) 순으로 정렬 → 품번 조회는 이진 탐색 1번
+- 월별 run: sku_id 오름차순 (sku_id, 재고금액, 재고수량) 배열을 하나로 이어 붙여 저장 (run_ids / run_amt / run_qty)
+    base  : 그 달 전체 스냅샷 (첫 달 + KEYFRAME_INTERVAL 개월마다)
+    delta : 전월과 값이 다른 SKU만 (사라진 SKU는 0으로 기록)
+- 월 복원 = 가장 가까운 이전 base + 그 뒤 delta 들만 읽음 (최대 KEYFRAME_INTERVAL 개 run)
+- SKU 1개 이력 = run마다 정렬된 sku_id 구간에서 이진 탐색 (run 전체를 읽지 않음)
+- 읽기 쪽은 np.load(mmap_mode="r")
+
+사용법:
+    python scripts/stock_history.py                          # 기본 대분류, ANALYSIS_MONTHS 전체 생성
+    python scripts/stock_history.py --append 2025.12         # 마지막 월 뒤에 1개월 추가 (delta run 1개)
+    python scripts/stock_history.py --all-categories
+
+조회:
+    history = StockHistory.open(Path("data/stock_history/accessory"))
+    history.month("2025.11")                          # 그 달 전체 SKU 재고
+    history.sku("M25FW0063", "BK", "M")               # SKU 월별 재고 이력
+    history.style("M25FW0063", brand="MLB")
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from external_agg import ExternalAggregator
+from inspect_schema import abort_on_schema_drift
+from preprocess_common import SKU_COLUMNS, STOCK_QTY_COLUMN, TARGET_CATEGORY, output_prefix
+from sku_index import ANALYSIS_MONTHS, INVENTORY_DATA_PATH, SKU_KEYS, iter_sku_chunks, write_column_dir
+
+# ========== 설정 ==========
+STOCK_HISTORY_PATH = Path(__file__).parent.parent / "data" / "stock_history"
+KEYFRAME_INTERVAL = 12  # base 스냅샷 간격 (개월), 월 복원 시 읽는 run 수의 상한
+
+KEY_COLUMNS = ["brand", "item_cat"] + SKU_KEYS
+STOCK_VALUES = ["stock_amt", "stock_qty"]
+
+
+def scan_stock_month(file_path: Path, month: str, all_categories: bool = False) -> pd.DataFrame:
+    """재고 CSV 1개 → (대분류, 브랜드, 중분류, SKU) 단위 재고금액/수량 (채널 전체 기준)"""
+    aggregator = ExternalAggregator(["category"] + KEY_COLUMNS, STOCK_VALUES)
+    for grouped in iter_sku_chunks(file_path, "inventory", month, all_categories):
+        aggregator.add(grouped)
+    return aggregator.partition(0)
+
+
+def _encode(values) -> np.ndarray:
+    """문자열 → 고정 길이 UTF-8 바이트 배열 (정렬 순서 유지)"""
+    return np.char.encode(np.asarray(values, dtype=str), "utf-8")
+
+
+class HistoryBuilder:
+    """
+    월 스냅샷을 순서대로 받아서 SKU 사전과 base/delta run을 만듦
+    기존 저장소에서 이어서 추가할 때는 from_history 로 마지막 월 상태를 복원해서 시작
+    """
+
+    def __init__(self, category: str, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.category = category
+        self.keyframe_interval = keyframe_interval
+        self.keys = pd.DataFrame(columns=KEY_COLUMNS)  # sku_id = 행 번호
+        self.state = {col: np.zeros(0) for col in STOCK_VALUES}  # 직전 월 SKU별 값 (sku_id 기준 밀집 배열)
+        self.runs: List[Dict] = []
+        self.run_ids: List[np.ndarray] = []
+        self.run_values: Dict[str, List[np.ndarray]] = {col: [] for col in STOCK_VALUES}
+        self.rows = 0
+
+    @classmethod
+    def from_history(cls, history: "StockHistory") -> "HistoryBuilder":
+        builder = cls(history.meta["category"], history.meta["keyframeInterval"])
+        order = np.argsort(np.asarray(history.columns["sku_id"]))
+        builder.keys = history.key_frame(order)
+        builder.runs = [dict(run) for run in history.meta["runs"]]
+        builder.run_ids = [np.asarray(history.columns["run_ids"])]
+        builder.run_values = {col: [np.asarray(history.columns[f"run_{col}"])] for col in STOCK_VALUES}
+        builder.rows = len(builder.run_ids[0])
+        last = history.month_values(history.months[-1])
+        builder.state = {col: last[col] for col in STOCK_VALUES}
+        return builder
+
+    @property
+    def months(self) -> List[str]:
+        return [run["month"] for run in self.runs]
+
+    def _assign_ids(self, snapshot: pd.DataFrame) -> np.ndarray:
+        """스냅샷 행 → sku_id (처음 보는 SKU는 사전 끝에 추가)"""
+        lookup = pd.MultiIndex.from_frame(self.keys[KEY_COLUMNS])
+        ids = lookup.get_indexer(pd.MultiIndex.from_frame(snapshot[KEY_COLUMNS]))
+        new = ids < 0
+        if new.any():
+            ids[new] = len(self.keys) + np.arange(new.sum())
+            self.keys = pd.concat([self.keys, snapshot.loc[new, KEY_COLUMNS]], ignore_index=True)
+        return ids
+
+    def add_month(self, month: str, snapshot: pd.DataFrame) -> None:
+        """월 1개 추가 (월은 오름차순으로 넣어야 함)"""
+        if self.runs and month <= self.runs[-1]["month"]:
+            raise ValueError(f"마지막 월({self.runs[-1]['month']}) 이후 월만 추가할 수 있습니다: {month}")
+
+        ids = self._assign_ids(snapshot)
+        current = {}
+        for col in STOCK_VALUES:
+            values = np.zeros(len(self.keys))
+            values[ids] = snapshot[col].to_numpy(dtype=np.float64)
+            previous = np.zeros(len(self.keys))
+            previous[:len(self.state[col])] = self.state[col]
+            current[col], self.state[col] = values, previous
+
+        since_base = next((i for i, run in enumerate(reversed(self.runs)) if run["kind"] == "base"), None)
+        if since_base is None or since_base + 1 >= self.keyframe_interval:
+            kind = "base"
+            run_ids = np.flatnonzero(np.logical_or.reduce([current[col] != 0 for col in STOCK_VALUES]))
+        else:
+            kind = "delta"
+            run_ids = np.flatnonzero(np.logical_or.reduce([current[col] != self.state[col] for col in STOCK_VALUES]))
+
+        self.run_ids.append(run_ids.astype(np.int64))
+        for col in STOCK_VALUES:
+            self.run_values[col].append(current[col][run_ids])
+        self.runs.append({
+            "month": month, "kind": kind, "start": self.rows, "stop": self.rows + len(run_ids), "skus": len(snapshot),
+        })
+        self.rows += len(run_ids)
+        self.state = current
+        print(f"  {month}: {kind} run {len(run_ids):,}행 (스냅샷 SKU {len(snapshot):,}개)")
+
+    def write(self, path: Path) -> None:
+        """사전(정렬) + run 배열 + meta.json 저장"""
+        brands = sorted(self.keys["brand"].unique())
+        item_cats = sorted(self.keys["item_cat"].unique())
+        columns: Dict[str, np.ndarray] = {key: _encode(self.keys[key]) for key in SKU_KEYS}
+        columns["brand"] = pd.Categorical(self.keys["brand"], categories=brands).codes.astype(np.int16)
+        columns["item_cat"] = pd.Categorical(self.keys["item_cat"], categories=item_cats).codes.astype(np.int16)
+        columns["sku_id"] = np.arange(len(self.keys), dtype=np.int64)
+
+        order = np.lexsort((columns["item_cat"], columns["brand"], columns["size_cd"], columns["color_cd"], columns["prdt_cd"]))
+        columns = {name: values[order] for name, values in columns.items()}
+        columns["run_ids"] = np.concatenate(self.run_ids) if self.run_ids else np.zeros(0, dtype=np.int64)
+        for col in STOCK_VALUES:
+            columns[f"run_{col}"] = np.concatenate(self.run_values[col]) if self.run_values[col] else np.zeros(0)
+
+        meta = {
+            "category": self.category,
+            "skus": int(len(self.keys)),
+            "brands": brands,
+            "itemCategories": item_cats,
+            "keyframeInterval": self.keyframe_interval,
+            "runs": self.runs,
+        }
+        write_column_dir(path, columns, meta)
+        snapshot_rows = sum(run["skus"] for run in self.runs)
+        print(f"[DONE] 재고 이력 저장: {path} (SKU {meta['skus']:,}개, {len(self.runs)}개월, run {self.rows:,}행 / 전체 스냅샷 {snapshot_rows:,}행)")
+
+
+class StockHistory:
+    """메모리 맵 재고 이력 조회"""
+
+    def __init__(self, path: Path, meta: Dict, columns: Dict[str, np.ndarray]):
+        self.path = path
+        self.meta = meta
+        self.columns = columns
+        self.runs = meta["runs"]
+        self.months = [run["month"] for run in self.runs]
+        self._run_index = {month: i for i, month in enumerate(self.months)}
+
+    @classmethod
+    def open(cls, path: Path) -> "StockHistory":
+        with open(path / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        columns = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in meta["columns"]}
+        return cls(path, meta, columns)
+
+    def key_frame(self, rows) -> pd.DataFrame:
+        """사전 행 번호 → 키 컬럼 DataFrame"""
+        return pd.DataFrame({
+            "brand": np.asarray(self.meta["brands"], dtype=object)[self.columns["brand"][rows]],
+            "item_cat": np.asarray(self.meta["itemCategories"], dtype=object)[self.columns["item_cat"][rows]],
+            **{key: np.char.decode(self.columns[key][rows], "utf-8").astype(object) for key in SKU_KEYS},
+        })
+
+    def _run(self, i: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        run = self.runs[i]
+        rows = slice(run["start"], run["stop"])
+        return self.columns["run_ids"][rows], {col: self.columns[f"run_{col}"][rows] for col in STOCK_VALUES}
+
+    def month_values(self, month: str) -> Dict[str, np.ndarray]:
+        """월 1개 → sku_id 기준 밀집 배열 (가장 가까운 이전 base + 그 뒤 delta만 읽음)"""
+        if month not in self._run_index:
+            raise KeyError(f"이력에 없는 월입니다: {month}")
+        end = self._run_index[month]
+        start = max(i for i in range(end + 1) if self.runs[i]["kind"] == "base")
+        state = {col: np.zeros(self.meta["skus"]) for col in STOCK_VALUES}
+        for i in range(start, end + 1):
+            ids, values = self._run(i)
+            for col in STOCK_VALUES:
+                state[col][ids] = values[col]
+        return state
+
+    def month(self, month: str) -> pd.DataFrame:
+        """월 1개 전체 SKU 재고 (재고금액 또는 수량이 0이 아닌 SKU만)"""
+        state = self.month_values(month)
+        ids = np.asarray(self.columns["sku_id"])
+        present = np.flatnonzero(np.logical_or.reduce([state[col][ids] != 0 for col in STOCK_VALUES]))
+        frame = self.key_frame(present)
+        frame["month"] = month
+        for col in STOCK_VALUES:
+            frame[col] = state[col][ids[present]]
+        return frame
+
+    def history(self, rows: np.ndarray) -> pd.DataFrame:
+        """사전 행 번호들 → SKU × 월 재고 이력 (run마다 이진 탐색, 0인 월은 생략)"""
+        rows = np.asarray(rows)
+        sku_ids = np.asarray(self.columns["sku_id"][rows])
+        current = {col: np.zeros(len(rows)) for col in STOCK_VALUES}
+        frames = []
+        for i, month in enumerate(self.months):
+            ids, values = self._run(i)
+            if self.runs[i]["kind"] == "base":
+                current = {col: np.zeros(len(rows)) for col in STOCK_VALUES}
+            if len(ids):
+                pos = np.minimum(np.searchsorted(ids, sku_ids), len(ids) - 1)
+                hit = np.asarray(ids[pos]) == sku_ids
+                for col in STOCK_VALUES:
+                    current[col][hit] = values[col][pos[hit]]
+            present = np.logical_or.reduce([current[col] != 0 for col in STOCK_VALUES])
+            if present.any():
+                frame = pd.DataFrame({"row": rows[present], "month": month})
+                for col in STOCK_VALUES:
+                    frame[col] = current[col][present]
+                frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=KEY_COLUMNS + ["month"] + STOCK_VALUES)
+        result = pd.concat(frames, ignore_index=True).sort_values(["row", "month"], kind="stable")
+        keys = self.key_frame(result["row"].to_numpy())
+        return pd.concat([keys, result.drop(columns="row").reset_index(drop=True)], axis=1)
+
+    def _prefix_range(self, column: str, start: int, stop: int, value: str) -> Tuple[int, int]:
+        values = self.columns[column][start:stop]
+        key = value.encode("utf-8")
+        return start + int(np.searchsorted(values, key, "left")), start + int(np.searchsorted(values, key, "right"))
+
+    def sku(self, prdt_cd: str, color_cd: Optional[str] = None, size_cd: Optional[str] = None, brand: Optional[str] = None) -> pd.DataFrame:
+        """품번 (+ 컬러, 사이즈) 월별 재고 이력"""
+        start, stop = self._prefix_range("prdt_cd", 0, self.meta["skus"], prdt_cd)
+        if color_cd is not None:
+            start, stop = self._prefix_range("color_cd", start, stop, color_cd)
+            if size_cd is not None:
+                start, stop = self._prefix_range("size_cd", start, stop, size_cd)
+        rows = np.arange(start, stop)
+        if size_cd is not None and color_cd is None:
+            rows = rows[np.char.decode(self.columns["size_cd"][start:stop], "utf-8") == size_cd]
+        if brand is not None:
+            code = self.meta["brands"].index(brand) if brand in self.meta["brands"] else -1
+            rows = rows[np.asarray(self.columns["brand"][rows]) == code]
+        return self.history(rows)
+
+    def style(self, prdt_cd: str, brand: Optional[str] = None) -> pd.DataFrame:
+        """품번 1개의 컬러 × 사이즈 × 월 이력"""
+        return self.sku(prdt_cd, brand=brand)
+
+
+def stock_history_path(category: str = TARGET_CATEGORY) -> Path:
+    return STOCK_HISTORY_PATH / output_prefix(category)
+
+
+def _schema_check(months: List[str]) -> None:
+    abort_on_schema_drift(
+        [INVENTORY_DATA_PATH / f"{m}.csv" for m in months],
+        ["Channel 2", "产品品牌", "产品大分类", "产品中分类"] + list(SKU_COLUMNS) + ["预计库存金额", STOCK_QTY_COLUMN],
+        "utf-8-sig",
+    )
+
+
+def build(months: List[str], all_categories: bool = False, append: bool = False) -> None:
+    """
+    월 스냅샷 → 대분류별 재고 이력 저장소
+    append=True면 기존 저장소의 마지막 월 뒤에 months를 이어 붙임 (기존 run은 그대로)
+    """
+    _schema_check(months)
+    builders: Dict[str, HistoryBuilder] = {}
+    if append:
+        for path in (sorted(STOCK_HISTORY_PATH.iterdir()) if all_categories else [stock_history_path()]):
+            if (path / "meta.json").exists():
+                builder = HistoryBuilder.from_history(StockHistory.open(path))
+                builders[builder.category] = builder
+        if not builders:
+            print(f"[ERROR] 기존 재고 이력이 없습니다: {STOCK_HISTORY_PATH} (먼저 --append 없이 생성)")
+            return
+
+    for month in months:
+        file_path = INVENTORY_DATA_PATH / f"{month}.csv"
+        if not file_path.exists():
+            print(f"[WARNING] 파일이 존재하지 않습니다: {file_path}")
+            continue
+        print(f"처리 중 (재고 이력): {file_path}")
+        snapshot = scan_stock_month(file_path, month, all_categories)
+        categories = set(snapshot["category"]) | set(builders) if all_categories else {TARGET_CATEGORY}
+        for category in sorted(categories):
+            if category not in builders:
+                builders[category] = HistoryBuilder(category)
+            cat_snapshot = snapshot[snapshot["category"] == category].reset_index(drop=True)
+            builders[category].add_month(month, cat_snapshot)
+
+    STOCK_HISTORY_PATH.mkdir(parents=True, exist_ok=True)
+    for category, builder in sorted(builders.items()):
+        builder.write(stock_history_path(category))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SKU 재고 이력 저장소 (기준 스냅샷 + 월별 변경분)")
+    parser.add_argument("--months", nargs="+", default=ANALYSIS_MONTHS, metavar="YYYY.MM")
+    parser.add_argument("--append", nargs="+", metavar="YYYY.MM", help="기존 저장소 마지막 월 뒤에 추가")
+    parser.add_argument("--all-categories", action="store_true")
+    args = parser.parse_args()
+    if args.append:
+        build(args.append, args.all_categories, append=True)
+    else:
+        build(args.months, args.all_categories)
@@ -0,0 +1,352 @@
+"""
+웨어하우스 월별 추출 (수동 CSV 내보내기 대체)
+- 월마다 사용 컬럼만 조회해서 원천 CSV와 같은 형식으로 저장 (헤더 / 인코딩 / 경로 동일, 전처리 스크립트는 그대로)
+    판매: RETAIL_DATA_PATH/{월}.csv (utf-8), 재고: INVENTORY_DATA_PATH/{월}.csv (utf-8-sig)
+- 월 쿼리를 동시에 실행 (--pool-size 개 연결을 재사용하는 연결 풀, 실패한 연결은 버리고 새로 연결)
+- 결과는 fetchmany 단위로 임시 파일에 바로 쓰고 끝나면 교체 (메모리에 월 전체를 올리지 않음)
+    내용이 기존 파일과 같으면 교체하지 않음 → 수정 시각이 그대로라 pipeline.py 가 뒤 단계를 다시 실행하지 않음
+- 월 단위 재시도 (지수 백오프), 완료한 월은 data/extract/manifest.json 에 기록 → 중단 후 다시 실행하면 남은 월만 추출
+- 0행 결과는 실패로 처리 (기존 파일 유지, 완료 기록 없음), 빈 월이 정상이면 --allow-empty
+- 웨어하우스 접근은 Warehouse 인터페이스 뒤에 둠
+    SnowflakeWarehouse: lib/snowflake.ts 와 같은 SNOWFLAKE_* 환경 변수 (pip install snowflake-connector-python)
+    SQLiteWarehouse   : 로컬 SQLite 파일 (같은 이름의 테이블/컬럼을 만든 대역, 추출 검증용)
+
+사용법:
+    python scripts/warehouse_extract.py                                  # ANALYSIS_MONTHS 중 아직 추출하지 않은 월
+    python scripts/warehouse_extract.py --months 2025.11 --force         # 해당 월 다시 추출
+    python scripts/warehouse_extract.py --months 2025.12 --allow-empty   # 0행 월도 헤더만 있는 CSV로 저장
+    python scripts/warehouse_extract.py --sqlite standin.db --output D:\\data\\_standin
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from preprocess_common import SALES_QTY_COLUMN, SKU_COLUMNS, STOCK_QTY_COLUMN, STORE_COLUMN, write_atomic
+from sku_index import ANALYSIS_MONTHS, INVENTORY_DATA_PATH, RETAIL_DATA_PATH
+
+# ========== 설정 ==========
+EXTRACT_PATH = Path(__file__).parent.parent / "data" / "extract"
+MANIFEST_FILE = EXTRACT_PATH / "manifest.json"
+POOL_SIZE = 4  # 동시 연결 (= 동시 월 쿼리) 수
+FETCH_ROWS = 50_000  # fetchmany 1회 행 수
+MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 5.0  # 재시도 대기: 5초, 10초, ...
+
+# 공통 추출 컬럼 (전처리 / SKU 인덱스 / 스케치 / 정체재고 상위 K 가 읽는 컬럼 합집합)
+DIMENSION_COLUMNS = [
+    "Channel 2", "产品品牌", "产品大分类", "产品中分类", "运营基准", "产品季节", STORE_COLUMN
+] + list(SKU_COLUMNS)
+
+# 데이터셋별 원천 뷰 / 월 컬럼 (YYYYMM) / 값 컬럼 / 인코딩 / 저장 폴더
+# 원천 뷰는 수동 내보내기와 같은 컬럼 이름을 노출해야 함 (따옴표 식별자로 조회)
+EXTRACT_SOURCES: Dict[str, Dict] = {
+    "retail": {
+        "table": "RETAIL_EXPORT",
+        "month_column": "YYMM",
+        "columns": DIMENSION_COLUMNS + ["吊牌金额", SALES_QTY_COLUMN],
+        "encoding": "utf-8",
+        "path": RETAIL_DATA_PATH,
+    },
+    "inventory": {
+        "table": "INVENTORY_EXPORT",
+        "month_column": "YYMM",
+        "columns": DIMENSION_COLUMNS + ["预计库存金额", STOCK_QTY_COLUMN],
+        "encoding": "utf-8-sig",
+        "path": INVENTORY_DATA_PATH,
+    },
+}
+
+
+class EmptyExtractError(ValueError):
+    """조회 결과 0행 (월 데이터 미적재 / 월 컬럼 값 형식 불일치 등, 재시도하지 않음)"""
+
+
+class Warehouse(ABC):
+    """추출 대상 (DB-API 2.0 연결 생성), placeholder 는 드라이버 paramstyle 에 맞춤"""
+
+    placeholder = "?"
+
+    @abstractmethod
+    def connect(self):
+        """DB-API 2.0 연결 반환"""
+
+
+class SnowflakeWarehouse(Warehouse):
+    """lib/snowflake.ts 와 같은 환경 변수로 연결"""
+
+    placeholder = "%s"
+
+    def connect(self):
+        try:
+            import snowflake.connector
+        except ImportError:
+            raise ImportError("snowflake-connector-python 이 필요합니다 (pip install snowflake-connector-python)")
+        return snowflake.connector.connect(
+            account=os.environ["SNOWFLAKE_ACCOUNT"],
+            user=os.environ["SNOWFLAKE_USER"],
+            password=os.environ["SNOWFLAKE_PASSWORD"],
+            warehouse=os.environ["SNOWFLAKE_WAREHOUSE"],
+            database=os.environ["SNOWFLAKE_DATABASE"],
+            schema=os.environ["SNOWFLAKE_SCHEMA"],
+            role=os.environ["SNOWFLAKE_ROLE"],
+        )
+
+
+class SQLiteWarehouse(Warehouse):
+    """로컬 SQLite 대역 (EXTRACT_SOURCES 와 같은 테이블 / 컬럼 이름)"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+
+    def connect(self):
+        # 풀에서 다른 스레드로 넘겨 쓰므로 스레드 검사 끔 (연결 1개는 한 번에 한 스레드만 사용)
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+
+class ConnectionPool:
+    """최대 size 개 연결을 필요할 때 만들어서 재사용, 사용 중 예외가 난 연결은 닫고 버림"""
+
+    def __init__(self, warehouse: Warehouse, size: int = POOL_SIZE):
+        self.warehouse = warehouse
+        self.size = size
+        self.idle: queue.Queue = queue.Queue()
+        self.slots = threading.Semaphore(size)
+        self.lock = threading.Lock()
+        self.opened: List = []
+
+    @contextmanager
+    def connection(self):
+        self.slots.acquire()
+        try:
+            try:
+                con = self.idle.get_nowait()
+            except queue.Empty:
+                con = self.warehouse.connect()
+                with self.lock:
+                    self.opened.append(con)
+            try:
+                yield con
+            except Exception:
+                self._discard(con)
+                raise
+            self.idle.put(con)
+        finally:
+            self.slots.release()
+
+    def _discard(self, con) -> None:
+        with self.lock:
+            self.opened.remove(con)
+        try:
+            con.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        with self.lock:
+            for con in self.opened:
+                con.close()
+            self.opened.clear()
+
+
+def month_query(dataset: str, placeholder: str) -> str:
+    source = EXTRACT_SOURCES[dataset]
+    columns = ", ".join(f'"{column}"' for column in source["columns"])
+    return f'SELECT {columns} FROM {source["table"]} WHERE "{source["month_column"]}" = {placeholder}'
+
+
+def month_file(dataset: str, month: str, output: Optional[Path] = None) -> Path:
+    """저장 경로 (output 을 주면 output/{dataset}/{월}.csv)"""
+    base = output / dataset if output else EXTRACT_SOURCES[dataset]["path"]
+    return base / f"{month}.csv"
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_rows(cursor) -> Iterator[list]:
+    while True:
+        rows = cursor.fetchmany(FETCH_ROWS)
+        if not rows:
+            return
+        yield from rows
+
+
+def extract_month(
+    pool: ConnectionPool,
+    dataset: str,
+    month: str,
+    output: Optional[Path] = None,
+    allow_empty: bool = False
+) -> Dict:
+    """
+    월 1개 조회 → 임시 파일에 스트리밍 저장 → 내용이 바뀌었으면 교체
+    0행이면 allow_empty 가 아닌 한 EmptyExtractError (기존 파일을 헤더만 있는 파일로 덮어쓰지 않음)
+    """
+    source = EXTRACT_SOURCES[dataset]
+    target_file = month_file(dataset, month, output)
+    target_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target_file.with_name(f".{target_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    rows = 0
+    try:
+        with pool.connection() as con:
+            cursor = con.cursor()
+            try:
+                cursor.execute(month_query(dataset, pool.warehouse.placeholder), (month.replace(".", ""),))
+                with open(tmp_path, "w", encoding=source["encoding"], newline="") as f:
+                    writer = csv.writer(f, lineterminator="\n")
+                    writer.writerow(source["columns"])
+                    for row in iter_rows(cursor):
+                        writer.writerow(["" if value is None else value for value in row])
+                        rows += 1
+                    f.flush()
+                    os.fsync(f.fileno())
+            finally:
+                cursor.close()
+        if rows == 0 and not allow_empty:
+            raise EmptyExtractError(f"{dataset} {month}: 조회 결과 0행 (빈 월이 정상이면 --allow-empty)")
+        size = tmp_path.stat().st_size
+        digest = file_digest(tmp_path)
+        changed = not (target_file.exists() and target_file.stat().st_size == size and file_digest(target_file) == digest)
+        if changed:
+            os.replace(tmp_path, target_file)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return {"rows": rows, "bytes": size, "sha256": digest, "changed": changed}
+
+
+def extract_with_retry(
+    pool: ConnectionPool,
+    dataset: str,
+    month: str,
+    output: Optional[Path] = None,
+    allow_empty: bool = False
+) -> Dict:
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            return extract_month(pool, dataset, month, output, allow_empty)
+        except EmptyExtractError:
+            raise
+        except Exception as e:
+            if attempt == MAX_ATTEMPTS:
+                raise
+            wait = RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+            print(f"[WARNING] {dataset} {month} 추출 실패 ({attempt}/{MAX_ATTEMPTS}), {wait:.0f}초 후 재시도: {e}")
+            time.sleep(wait)
+
+
+def load_manifest(manifest_file: Path) -> Dict[str, Dict]:
+    if not manifest_file.exists():
+        return {}
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_done(manifest: Dict[str, Dict], dataset: str, month: str, output: Optional[Path]) -> bool:
+    """직전 추출이 같은 쿼리로 끝났고 파일이 그대로 있으면 완료"""
+    entry = manifest.get(f"{dataset}/{month}")
+    target_file = month_file(dataset, month, output)
+    return (
+        entry is not None
+        and entry["query"] == month_query(dataset, "?")
+        and target_file.exists()
+        and target_file.stat().st_size == entry["bytes"]
+    )
+
+
+def extract(
+    warehouse: Warehouse,
+    months: List[str],
+    datasets: List[str],
+    pool_size: int = POOL_SIZE,
+    force: bool = False,
+    output: Optional[Path] = None,
+    manifest_file: Path = MANIFEST_FILE,
+    allow_empty: bool = False
+) -> List[str]:
+    """
+    (데이터셋, 월) 작업을 연결 풀 크기만큼 동시에 추출
+    allow_empty: 0행 월도 헤더만 있는 CSV로 저장하고 완료 기록 (기본은 실패)
+
+    Returns:
+        실패한 작업 목록 ("dataset/month")
+    """
+    manifest = load_manifest(manifest_file)
+    tasks = [(d, m) for d in datasets for m in months if force or not is_done(manifest, d, m, output)]
+    skipped = len(datasets) * len(months) - len(tasks)
+    print(f"추출 대상: {len(tasks)}개 (완료되어 건너뜀 {skipped}개), 연결 {pool_size}개")
+
+    manifest_lock = threading.Lock()
+    failed: List[str] = []
+    pool = ConnectionPool(warehouse, pool_size)
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            futures = {executor.submit(extract_with_retry, pool, d, m, output, allow_empty): (d, m) for d, m in tasks}
+            for future in as_completed(futures):
+                dataset, month = futures[future]
+                key = f"{dataset}/{month}"
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed.append(key)
+                    print(f"[ERROR] {key} 추출 실패: {e}")
+                    continue
+                status = "저장" if result["changed"] else "변경 없음"
+                print(f"[DONE] {key}: {result['rows']:,}행, {result['bytes'] / 1024 ** 2:,.1f} MB ({status})")
+                with manifest_lock:
+                    manifest[key] = {
+                        "rows": result["rows"],
+                        "bytes": result["bytes"],
+                        "sha256": result["sha256"],
+                        "query": month_query(dataset, "?"),
+                        "extractedAt": datetime.now().isoformat(timespec="seconds"),
+                    }
+                    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+                    write_atomic(manifest_file, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    finally:
+        pool.close()
+    return sorted(failed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="웨어하우스 월별 추출 → 원천 CSV")
+    parser.add_argument("--months", nargs="+", default=ANALYSIS_MONTHS, metavar="YYYY.MM")
+    parser.add_argument("--datasets", nargs="+", choices=list(EXTRACT_SOURCES), default=list(EXTRACT_SOURCES))
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE)
+    parser.add_argument("--force", action="store_true", help="완료 기록을 무시하고 다시 추출")
+    parser.add_argument("--sqlite", type=Path, help="Snowflake 대신 로컬 SQLite 대역 사용")
+    parser.add_argument("--output", type=Path, help="저장 폴더 ({output}/{dataset}/{월}.csv, 기본값은 원천 CSV 경로)")
+    parser.add_argument("--allow-empty", action="store_true", help="0행 월을 실패로 보지 않고 헤더만 있는 CSV로 저장")
+    args = parser.parse_args()
+
+    warehouse = SQLiteWarehouse(args.sqlite) if args.sqlite else SnowflakeWarehouse()
+    manifest_file = args.output / "manifest.json" if args.output else MANIFEST_FILE
+    started = time.time()
+    failed = extract(warehouse, args.months, args.datasets, args.pool_size, args.force, args.output, manifest_file, args.allow_empty)
+    print(f"\n소요 시간: {time.time() - started:.1f}초")
+    if failed:
+        print(f"[ERROR] 실패 {len(failed)}개 (다시 실행하면 실패한 월만 추출): {failed}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+공유 폴더 작업 큐 (여러 배치 머신에서 전체 기간 재집계 분산 처리)
+- 작업 단위: 데이터셋(retail / inventory) × 월 → tasks/ 에 작업 파일 1개
+- 워커는 claims/ 에 lock 파일을 O_CREAT|O_EXCL 로 만들어서 작업을 가져감 (먼저 만든 워커만 성공)
+- 처리 중에는 lock 파일 mtime을 주기적으로 갱신, 오래 갱신되지 않은 lock은 죽은 워커로 보고 회수
+- 결과는 partials/ 에 partial 파일(scripts/partials.py)로 쓰고 done/ 에 완료 표시
+- 모든 작업이 끝나면 merge 단계에서 partial을 병합해서 기존과 같은 JSON 출력
+- compact: 마감된 연도의 월 partial을 연도 블록으로 압축 (scripts/compaction.py, merge는 블록 + 남은 월 partial을 읽음)
+
+큐 폴더 구조:
+    {queue}/tasks/retail_2025.11.json
+    {queue}/claims/retail_2025.11.lock
+    {queue}/partials/retail_2025.11.partial.json.gz
+    {queue}/partials/blocks/retail_2024.block.npz
+    {queue}/done/retail_2025.11.json
+    {queue}/failed/retail_2025.11.txt
+
+사용법:
+    python scripts/work_queue.py enqueue                      # ANALYSIS_MONTHS 전체 등록
+    python scripts/work_queue.py work --processes 4           # 머신마다 실행 (로컬 프로세스 4개)
+    python scripts/work_queue.py status
+    python scripts/work_queue.py merge                        # 모든 작업 완료 후 1회
+    python scripts/work_queue.py compact                      # 마감된 연도 압축 (merge 전후 언제든)
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from multiprocessing import Process
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import preprocess_sales as sales
+from output_layout import LAYOUTS
+from compaction import CompactedHistory, compact, drop_blocks, year_blocks, year_months
+from partials import partial_file_name, write_partial
+from preprocess_common import write_atomic
+from preprocess_inventory import scan_inventory_months
+
+# ========== 설정 ==========
+QUEUE_PATH = Path(r"D:\data\_queue")
+CLAIM_TIMEOUT_SECONDS = 30 * 60  # 이 시간 동안 lock이 갱신되지 않으면 회수
+HEARTBEAT_SECONDS = 60
+IDLE_POLL_SECONDS = 5  # 다른 워커가 처리 중인 작업만 남았을 때 대기 간격
+
+DATASETS = ["retail", "inventory"]
+QUEUE_SUBDIRS = ["tasks", "claims", "partials", "done", "failed"]
+
+
+def queue_dirs(queue_path: Path) -> Dict[str, Path]:
+    dirs = {name: queue_path / name for name in QUEUE_SUBDIRS}
+    for path in dirs.values():
+        path.mkdir(parents=True, exist_ok=True)
+    return dirs
+
+
+def task_name(dataset: str, month: str) -> str:
+    return f"{dataset}_{month}"
+
+
+def enqueue(
+    queue_path: Path,
+    months: List[str],
+    datasets: List[str],
+    all_categories: bool = False,
+    reset: bool = False
+) -> int:
+    """
+    작업 등록 (이미 등록된 작업은 건너뜀)
+    reset=True면 기존 claims/done/failed/partials 를 지우고 다시 처리
+    연도 블록으로 압축된 월은 경고와 함께 건너뜀
+    reset=True면 대신 해당 연도 블록을 지우고 지운 연도의 12개월을 함께 다시 등록
+    """
+    dirs = queue_dirs(queue_path)
+    data_paths = {"retail": sales.RETAIL_DATA_PATH, "inventory": sales.INVENTORY_DATA_PATH}
+
+    added = 0
+    for dataset in datasets:
+        blocked = year_blocks(dirs["partials"], dataset)
+        skipped = [month for month in months if int(month[:4]) in blocked]
+        dataset_months = list(months)
+        if skipped and reset:
+            dropped = drop_blocks(dirs["partials"], dataset, {int(month[:4]) for month in skipped})
+            dataset_months = sorted(set(months) | {month for year in dropped for month in year_months(year)})
+            print(f"[WARNING] {dataset} 연도 블록 삭제 {dropped} (요청 월 {skipped} 포함) → 해당 연도 12개월 다시 등록")
+        elif skipped:
+            dataset_months = [month for month in months if month not in skipped]
+            print(f"[WARNING] {dataset} 연도 블록으로 압축된 월은 등록하지 않음 (--reset 이면 해당 연도 블록 삭제 후 재등록): {skipped}")
+        for month in dataset_months:
+            name = task_name(dataset, month)
+            task_file = dirs["tasks"] / f"{name}.json"
+            if reset:
+                for stale in [
+                    dirs["claims"] / f"{name}.lock",
+                    dirs["done"] / f"{name}.json",
+                    dirs["failed"] / f"{name}.txt",
+                    dirs["partials"] / partial_file_name(dataset, month),
+                ]:
+                    if stale.exists():
+                        stale.unlink()
+            if task_file.exists() and not reset:
+                continue
+            task = {
+                "dataset": dataset,
+                "month": month,
+                "dataPath": str(data_paths[dataset]),
+                "allCategories": all_categories,
+            }
+            write_atomic(task_file, json.dumps(task, ensure_ascii=False, indent=2).encode("utf-8"))
+            added += 1
+    return added
+
+
+def try_claim(dirs: Dict[str, Path], name: str, worker_id: str) -> bool:
+    """
+    lock 파일 생성으로 작업 선점
+    오래된 lock(워커 비정상 종료)은 고유한 이름의 tombstone 으로 rename 한 뒤 한 번 더 시도
+    (rename 은 원자적이라 같은 lock 을 오래됐다고 본 워커가 여럿이어도 한 워커만 성공,
+     옮긴 파일이 stat 으로 본 오래된 lock 이 아니면 다른 워커의 새 lock 이므로 되돌려 놓고 물러남)
+    """
+    lock_file = dirs["claims"] / f"{name}.lock"
+    for _ in range(2):
+        try:
+            fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                stale = lock_file.stat()
+            except FileNotFoundError:
+                continue
+            age = time.time() - stale.st_mtime
+            if age < CLAIM_TIMEOUT_SECONDS:
+                return False
+            tombstone = dirs["claims"] / f"{name}.stale-{worker_id}-{time.time_ns()}"
+            try:
+                os.rename(lock_file, tombstone)
+            except FileNotFoundError:
+                return False
+            taken = tombstone.stat()
+            if (taken.st_ino, taken.st_mtime_ns) != (stale.st_ino, stale.st_mtime_ns):
+                # stat 이후 다른 워커가 회수하고 새 lock 을 만든 경우 → 되돌려 놓고 물러남
+                try:
+                    os.link(tombstone, lock_file)
+                except FileExistsError:
+                    pass
+                tombstone.unlink()
+                return False
+            print(f"[WARNING] 오래된 lock 회수: {name} ({age / 60:.0f}분 전 갱신)")
+            tombstone.unlink()
+            continue
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"worker": worker_id, "claimedAt": time.time()}, f)
+        return True
+    return False
+
+
+def release_claim(dirs: Dict[str, Path], name: str) -> None:
+    lock_file = dirs["claims"] / f"{name}.lock"
+    if lock_file.exists():
+        lock_file.unlink()
+
+
+def heartbeat(lock_file: Path, stop: threading.Event) -> None:
+    """처리 중 lock 파일 mtime 갱신 (오래된 lock 회수 대상이 되지 않도록)"""
+    while not stop.wait(HEARTBEAT_SECONDS):
+        try:
+            os.utime(lock_file)
+        except FileNotFoundError:
+            return
+
+
+def pending_tasks(dirs: Dict[str, Path]) -> List[str]:
+    """완료되지 않은 작업 이름 목록"""
+    done = {path.stem for path in dirs["done"].glob("*.json")}
+    return sorted(path.stem for path in dirs["tasks"].glob("*.json") if path.stem not in done)
+
+
+def run_task(dirs: Dict[str, Path], task: Dict, backend: str) -> None:
+    """
+    작업 1개 처리: 월 파일 1개 → 리프 큐브 → partial 파일
+    파일이 없거나 읽다가 실패하면 예외 → failed/ 에 기록 (빈 partial 을 쓰고 완료 처리하지 않음)
+    """
+    dataset, month = task["dataset"], task["month"]
+    data_path = Path(task["dataPath"])
+    file_path = data_path / f"{month}.csv"
+    if not file_path.exists():
+        raise FileNotFoundError(f"월 파일 없음: {file_path}")
+    scan = sales.scan_retail_months if dataset == "retail" else scan_inventory_months
+    leaf, unexpected = scan(data_path, [month], task["allCategories"], backend, strict=True)
+    write_partial(
+        dirs["partials"] / partial_file_name(dataset, month),
+        dataset, [month], leaf, unexpected, task["allCategories"]
+    )
+
+
+def work(queue_path: Path, worker_id: str, backend: str = "pandas") -> int:
+    """
+    남은 작업이 없을 때까지 작업을 가져와서 처리
+
+    Returns:
+        이 워커가 완료한 작업 수
+    """
+    dirs = queue_dirs(queue_path)
+    completed = 0
+
+    while True:
+        remaining = pending_tasks(dirs)
+        if not remaining:
+            break
+
+        claimed: Optional[str] = None
+        for name in remaining:
+            if (dirs["failed"] / f"{name}.txt").exists():
+                continue
+            if try_claim(dirs, name, worker_id):
+                claimed = name
+                break
+
+        if claimed is None:
+            # 남은 작업을 모두 다른 워커가 처리 중이거나 실패 상태
+            if all((dirs["failed"] / f"{name}.txt").exists() for name in remaining):
+                break
+            time.sleep(IDLE_POLL_SECONDS)
+            continue
+
+        # lock을 잡는 사이 다른 워커가 끝낸 작업이면 건너뜀
+        if (dirs["done"] / f"{claimed}.json").exists():
+            release_claim(dirs, claimed)
+            continue
+
+        task = json.loads((dirs["tasks"] / f"{claimed}.json").read_text(encoding="utf-8"))
+        print(f"[{worker_id}] 처리 시작: {claimed}")
+        stop = threading.Event()
+        beat = threading.Thread(target=heartbeat, args=(dirs["claims"] / f"{claimed}.lock", stop), daemon=True)
+        beat.start()
+        started = time.time()
+        try:
+            run_task(dirs, task, backend)
+            # 완료 표시를 쓴 뒤에 lock 해제 (사이에 다른 워커가 같은 작업을 다시 가져가지 않도록)
+            done = {"worker": worker_id, "seconds": round(time.time() - started, 2)}
+            write_atomic(dirs["done"] / f"{claimed}.json", json.dumps(done).encode("utf-8"))
+        except Exception:
+            write_atomic(dirs["failed"] / f"{claimed}.txt", f"[{worker_id}]\n{traceback.format_exc()}".encode("utf-8"))
+            print(f"[ERROR] [{worker_id}] 처리 실패: {claimed} (failed/{claimed}.txt)")
+            continue
+        finally:
+            stop.set()
+            beat.join()
+            release_claim(dirs, claimed)
+
+        completed += 1
+        print(f"[{worker_id}] 완료: {claimed} ({done['seconds']}초)")
+
+    return completed
+
+
+def _work_process(queue_path: Path, worker_id: str, backend: str) -> None:
+    work(queue_path, worker_id, backend)
+
+
+def work_local(queue_path: Path, processes: int, worker_id: str, backend: str = "pandas") -> None:
+    """로컬 프로세스 여러 개로 워커 실행 (머신 여러 대를 흉내낼 때도 사용)"""
+    if processes <= 1:
+        work(queue_path, worker_id, backend)
+        return
+    workers = [
+        Process(target=_work_process, args=(queue_path, f"{worker_id}-{i}", backend))
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def print_status(queue_path: Path) -> None:
+    dirs = queue_dirs(queue_path)
+    tasks = sorted(path.stem for path in dirs["tasks"].glob("*.json"))
+    done = {path.stem for path in dirs["done"].glob("*.json")}
+    claimed = {path.stem for path in dirs["claims"].glob("*.lock")}
+    failed = {path.stem for path in dirs["failed"].glob("*.txt")}
+
+    print(f"큐: {queue_path}")
+    print(f"작업 {len(tasks)}개 / 완료 {len(done & set(tasks))} / 처리 중 {len(claimed - done)} / 실패 {len(failed - done)}")
+    for name in tasks:
+        if name in done:
+            continue
+        state = "실패" if name in failed else "처리 중" if name in claimed else "대기"
+        print(f"   - {name}: {state}")
+
+
+def merge(
+    queue_path: Path,
+    all_categories: bool = False,
+    brand_total: bool = False,
+    season_breakdown: bool = False,
+    layout: str = "single",
+    aging: bool = False
+) -> None:
+    """
+    모든 partial 병합 → 전체 실행과 같은 JSON 출력
+    완료되지 않은 작업이 있거나 partial / 블록이 없는 분석 월이 있으면 게시하지 않고 종료
+    """
+    dirs = queue_dirs(queue_path)
+    remaining = pending_tasks(dirs)
+    if remaining:
+        print(f"[ERROR] 완료되지 않은 작업이 있습니다 ({len(remaining)}개): {remaining[:10]}")
+        sys.exit(1)
+
+    sales_history = CompactedHistory(dirs["partials"], "retail", all_categories)
+    inv_history = CompactedHistory(dirs["partials"], "inventory", all_categories)
+    for history in [sales_history, inv_history]:
+        print(f"{history.dataset}: 연도 블록 {len(history.blocks)}개 + 월 partial {len(history.partials)}개 병합 중...")
+    (sales_leaf, sales_unexpected), sales_months = sales_history.leaf()
+    (inv_leaf, inv_unexpected), inv_months = inv_history.leaf()
+
+    missing = sorted(set(sales.ANALYSIS_MONTHS) - set(sales_months) | set(sales.ANALYSIS_MONTHS) - set(inv_months))
+    if missing:
+        print(f"[ERROR] partial이 없는 분석 월이 있습니다 (enqueue 후 work 로 처리): {missing}")
+        sys.exit(1)
+
+    sales.OUTPUT_PATH.mkdir(parents=True, exist_ok=True)
+    sales.write_outputs(
+        sales_leaf, sales_unexpected, inv_leaf, inv_unexpected,
+        all_categories=all_categories, brand_total=brand_total, season_breakdown=season_breakdown,
+        layout=layout, aging=aging
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="공유 폴더 작업 큐 (분산 전처리)")
+    parser.add_argument("--queue", type=Path, default=QUEUE_PATH, help="공유 큐 폴더")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_enqueue = sub.add_parser("enqueue", help="월별 작업 등록")
+    p_enqueue.add_argument("--months", nargs="+", default=sales.ANALYSIS_MONTHS, metavar="YYYY.MM")
+    p_enqueue.add_argument("--datasets", nargs="+", choices=DATASETS, default=DATASETS)
+    p_enqueue.add_argument("--all-categories", action="store_true")
+    p_enqueue.add_argument("--reset", action="store_true", help="기존 결과를 지우고 다시 등록 (압축된 연도는 그 연도부터 이후 블록 삭제)")
+
+    p_work = sub.add_parser("work", help="작업 처리")
+    p_work.add_argument("--processes", type=int, default=1)
+    p_work.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    p_work.add_argument("--backend", choices=["pandas", "prefilter", "duckdb"], default="pandas")
+
+    sub.add_parser("status", help="진행 상황")
+
+    p_merge = sub.add_parser("merge", help="partial 병합 → JSON 출력")
+    p_merge.add_argument("--all-categories", action="store_true")
+    p_merge.add_argument("--brand-total", action="store_true")
+    p_merge.add_argument("--season-breakdown", action="store_true")
+    p_merge.add_argument("--aging", action="store_true")
+    p_merge.add_argument("--layout", choices=LAYOUTS, default="single")
+
+    p_compact = sub.add_parser("compact", help="마감된 연도의 월 partial → 연도 블록")
+    p_compact.add_argument("--datasets", nargs="+", choices=DATASETS, default=DATASETS)
+    p_compact.add_argument("--all-categories", action="store_true")
+
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        added = enqueue(args.queue, args.months, args.datasets, args.all_categories, args.reset)
+        print(f"[DONE] 작업 {added}개 등록: {args.queue}")
+    elif args.command == "work":
+        work_local(args.queue, args.processes, args.worker_id, args.backend)
+    elif args.command == "status":
+        print_status(args.queue)
+    elif args.command == "merge":
+        merge(args.queue, args.all_categories, args.brand_total, args.season_breakdown, args.layout, args.aging)
+    elif args.command == "compact":
+        for dataset in args.datasets:
+            built = compact(queue_dirs(args.queue)["partials"], dataset, args.all_categories)
+            print(f"[DONE] {dataset}: 새 연도 블록 {built if built else '없음'}")
+
+
+if __name__ == "__main__":
+    main()